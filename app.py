@@ -17,7 +17,10 @@ from config.cf_players import CF_PLAYERS
 # local modules
 from modules.PG_window import PG_Window
 from modules.PG_map import PG_Map
+from modules.PG_map_preloader import PG_Map_Preloader
 from modules.PG_timer import PG_Timer
+from modules.PG_common import format_asset_report, release_assets, set_texture_atlas
+from modules.PG_texture_atlas import load_texture_atlas
 from modules.PG_ui_containers import (
     UI_Container_Wrapper,
     UI_Single_Centered_Container,
@@ -84,6 +87,12 @@ class PG_App:
         self.window = PG_Window(self.cf_global, self.cf_window)
         ''' object containing main surface window and bounds '''
 
+        # pre-decoded images, if baked. Kept open for the lifetime of the app
+        self.texture_atlas = load_texture_atlas(self.cf_global['texture_atlas_dir'])
+        set_texture_atlas(self.texture_atlas)
+        if INFO_PRINT:
+            print(f'texture atlas: {self.texture_atlas}')
+
         # create the timer
         self.timer = PG_Timer(self.cf_global, self.cf_timer)
         ''' pygame specific timer object '''
@@ -105,6 +114,8 @@ class PG_App:
         self.map_loaded: bool = False
         self.selected_cf_player: str | None = None
         self.selected_cf_map: str| None = None
+        self.map_preloader: PG_Map_Preloader | None = None
+        ''' prepares the selected map in the background, until it is started '''
         self.post_map_looping = False
         self.post_map_menu_active = False
 
@@ -594,11 +605,17 @@ class PG_App:
     def btn_onclick_select_map(self, map_key: str | None):
         if (map_key == None):
             self.selected_cf_map = None
+            self.map_preloader = None
             self.swap_start_game_btn_state(False)
         else:
             self.selected_cf_map = self.cf_maps[map_key]
+            # start preparing the map right away, so that starting it is close to instant.
+            # preloads can not be cancelled, so selecting the same map again keeps the running one
+            if (self.map_preloader == None) or (self.map_preloader.cf_map is not self.selected_cf_map):
+                self.map_preloader = PG_Map_Preloader(self.cf_global, self.selected_cf_map, self.timer,
+                                                      self.window.map_surface, dirty_rects=self.window.dirty_rects)
             if INFO_PRINT:
-                print(f'selected map: cf_maps["{map_key}"]')
+                print(f'selected map: cf_maps["{map_key}"]. {self.map_preloader}')
             if self.selected_cf_player:
                 self.swap_start_game_btn_state(True)
 
@@ -626,7 +643,15 @@ class PG_App:
 
     def init_map(self):
         # create the map object as an attribute of self
-        self.map = PG_Map(self.cf_global, self.selected_cf_map, self.timer, self.window.map_surface)
+        if (self.map_preloader != None) and (self.map_preloader.cf_map is self.selected_cf_map):
+            # prepared in the background since the map was selected. waits for it, if not yet done
+            if INFO_PRINT:
+                print(f'> using {self.map_preloader}')
+            self.map = self.map_preloader.wait()
+        else:
+            self.map = PG_Map(self.cf_global, self.selected_cf_map, self.timer, self.window.map_surface,
+                              dirty_rects=self.window.dirty_rects)
+        self.map_preloader = None
 
         if INFO_PRINT:
             print(f'> Map object "{self.map.name}" created from config! Setting up map assets ...')
@@ -641,6 +666,10 @@ class PG_App:
         self.map_loaded = True
 
         self.map.spawn_player(self.selected_cf_player)
+        if (self.cf_global['input_log_dir'] != None) and (self.cf_global['fixed_timestep']):
+            INPUT_LOG_PATH = self.map.start_input_log(self.cf_global['input_log_dir'])
+            if INFO_PRINT:
+                print(f'> logging inputs to "{INPUT_LOG_PATH}"')
         self.map.start()
         self.timer.activate_duration_text()
 
@@ -652,6 +681,11 @@ class PG_App:
         self.selected_cf_map = None
         self.selected_cf_player = None
 
+        self.map.stop_input_log()
+
+        if INFO_PRINT and (self.map.profiler.n_stored > 0):
+            print(f'[exit_map]: {self.map.profiler}\n{self.map.profiler.format_stats()}')
+
         if INFO_PRINT:
             print(f'[exit_map]: Cleaning up all map sprites ... ')
 
@@ -659,15 +693,19 @@ class PG_App:
             elem.kill()
             del elem
 
-        for projectile in self.map.global_projectile_group.sprites():
-            projectile.kill()
-            del projectile
+        if INFO_PRINT:
+            print(f'[exit_map]: {self.map.projectile_field}')
+        self.map.projectile_field.clear()
 
         if INFO_PRINT:
             print(f'All sprites deleted. Deleting "{self.map.name}"')
 
         del self.map
 
+        # cached images are kept for the whole session, so the next map reuses those it shares with this one
+        if INFO_PRINT:
+            print(f'[exit_map]: Cached assets:\n{format_asset_report()}')
+
         self.swap_to_main_menu()
 
     def reset_map(self):
@@ -719,6 +757,7 @@ class PG_App:
 
         self.selected_cf_map = None
         self.selected_cf_player = None
+        self.map_preloader = None
 
         for btn in self.BUTTON_LIST:
             btn.toggle_state_active = False
@@ -770,8 +809,7 @@ class PG_App:
                 self.map.check_events()
                 self.map.ui_container_group.update(self.map.surface)
                 pg.display.update()
-                self.map.coin_group.update()
-                self.map.player_group.update()
+                self.map.simulate_death_frame()
                 if (self.map.quit_called):
                     self.looping = False
             else:
@@ -825,6 +863,12 @@ class PG_App:
                 # main menu is loaded without any map. Clear the entire surface.
                 self.window.fill_surface()
 
+        if (self.map_loaded):
+            # complete the input log of a map quit mid session
+            self.map.stop_input_log()
+
+        release_assets()
+
         if INFO_PRINT:
             print('[APP][loop] App exiting through main loop')
 
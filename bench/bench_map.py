@@ -0,0 +1,261 @@
+''' Headless, deterministic benchmark of the PG_Map hot loop.
+
+    Runs a map under the SDL dummy video driver, with a fixed RNG seed, a deterministic input stream
+    and an uncapped clock. The frame-locked loop is run, so every frame simulates exactly one tick, regardless of speed.
+    The interval events (player image cycle, terrain update) are applied on tick intervals, as in PG_Map_Env,
+    rather than by wall-clock timers. Same seed and inputs => same final state.
+    If the map ends, i.e. the player dies, the map is reset and the run continues.
+    Frames are timed by the map profiler, see PG_Map.set_profiling.
+    Reports frames per second, frame time percentiles and a per-phase breakdown as JSON.
+
+    Usage, from the repository root:
+    >python bench/bench_map.py --map map_2 --player fighter --frames 2000 --seed 1
+    >python bench/bench_map.py --input my_inputs.json --out results.json
+
+    By default, the player hovers between waypoints within the map, see get_hover_inputs.
+    An input script is a JSON list of [frame, "down" | "up", control],
+    where control is one of the keys of the players 'controls' config, i.e. "thrust" or "steer_left".
+    The run fails if the player ends up outside the map.
+'''
+import os
+import sys
+import json
+import random
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import perf_counter
+
+# must be set before pygame is initialized
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# assets are loaded through paths relative to the repository root
+os.chdir(REPO_ROOT)
+
+import numpy as np
+import pygame as pg
+
+from config.cf_global import CF_GLOBAL
+from config.cf_window import CF_WINDOW
+from config.cf_timer import CF_TIMER
+from config.cf_maps import CF_MAPS
+from config.cf_players import CF_PLAYERS
+
+from modules.PG_window import PG_Window
+from modules.PG_timer import PG_Timer
+from modules.PG_map import PG_Map, PROFILER_PHASES
+from modules.input_log import Map_Input
+
+
+HOVER_WAYPOINTS = ((0.3, 0.35), (0.7, 0.35), (0.7, 0.65), (0.3, 0.65))
+''' default input: points the player hovers towards in turn, as fractions of the map size '''
+HOVER_WAYPOINT_FRAMES = 400
+''' frames spent hovering towards each waypoint '''
+HOVER_LOOKAHEAD_TICKS = 40
+''' the player steers by where it will be after this many ticks at its current velocity '''
+HOVER_DEADZONE = 30.0
+
+
+def load_input_script(path: str) -> dict[int, list[tuple[str, str]]]:
+    ''' get the input script as frame => [(action, control), ...] '''
+    script: dict[int, list[tuple[str, str]]] = {}
+    with open(path, 'r') as f:
+        for frame, action, control in json.load(f):
+            script.setdefault(int(frame), []).append((action, control))
+    return script
+
+
+def get_hover_inputs(M: PG_Map, frame: int, held: set[str]) -> list[tuple[str, str]]:
+    ''' default input: steer and thrust towards the current waypoint, as a player would.
+        * decided from the map state only, so the inputs are as deterministic as a script.
+            unlike a fixed script, this keeps the player within the map, where the collision work happens
+        * held: the controls held down. Updated with the returned inputs
+    '''
+    W, H = M.rect.size
+    WAYPOINT_X, WAYPOINT_Y = HOVER_WAYPOINTS[(frame // HOVER_WAYPOINT_FRAMES) % len(HOVER_WAYPOINTS)]
+    PLAYER = M.player
+    # > 0 => the player will be right of/below the waypoint
+    DX = (PLAYER.position.x + (PLAYER.velocity.x * HOVER_LOOKAHEAD_TICKS) - (WAYPOINT_X * W))
+    DY = (PLAYER.position.y + (PLAYER.velocity.y * HOVER_LOOKAHEAD_TICKS) - (WAYPOINT_Y * H))
+
+    wanted: set[str] = set()
+    if (DX > HOVER_DEADZONE):
+        wanted.add('steer_left')
+    elif (DX < -HOVER_DEADZONE):
+        wanted.add('steer_right')
+    if (DY > HOVER_DEADZONE):
+        wanted.update(('steer_up', 'thrust'))
+    elif (DY < -HOVER_DEADZONE):
+        wanted.add('steer_down')
+
+    inputs = [('up', control) for control in sorted(held - wanted)]
+    inputs += [('down', control) for control in sorted(wanted - held)]
+    held.clear()
+    held.update(wanted)
+    return inputs
+
+
+def post_scripted_input(inputs: list[tuple[str, str]], controls: dict):
+    ''' post the inputs as key events, to be handled by PG_Map.check_events '''
+    for action, control in inputs:
+        if (action == 'down'):
+            event_type = pg.KEYDOWN
+        elif (action == 'up'):
+            event_type = pg.KEYUP
+        else:
+            raise ValueError(f'unknown input action "{action}", expected "down" or "up"')
+        pg.event.post(pg.event.Event(event_type, key=int(controls[control])))
+
+
+def percentiles_ms(samples: np.ndarray) -> dict:
+    ''' summarize samples in seconds as milliseconds '''
+    if (samples.size == 0):
+        return {}
+    P50, P95, P99 = np.percentile(samples, (50, 95, 99))
+    return {
+        'mean': float(samples.mean() * 1000),
+        'p50': float(P50 * 1000),
+        'p95': float(P95 * 1000),
+        'p99': float(P99 * 1000),
+        'max': float(samples.max() * 1000),
+    }
+
+
+def run_benchmark(map_key: str, player_key: str, n_frames: int, seed: int,
+                  input_path: str | None = None, dirty_rects: bool = False, warmup: int = 30) -> dict:
+    ''' set up the map with a seeded RNG and run n_frames, timing each phase.
+        * the first warmup frames are run, but not measured. i.e. lazily created rotations
+        * if the map ends, it is reset, unmeasured. Held keys are released, the input script continues
+        * raises RuntimeError if the player left the map, as the frames would then skip most of the collision work
+    '''
+    pg.init()
+    random.seed(seed)
+
+    # one tick per frame. the profiler keeps every measured frame
+    cf_global = dict(CF_GLOBAL, fixed_timestep=False, profiler_frames=n_frames)
+    window = PG_Window(cf_global, CF_WINDOW)
+    timer = PG_Timer(cf_global, CF_TIMER)
+    # uncapped; only tick to keep track of time
+    timer.tick_func = timer.clock.tick
+
+    cf_player = CF_PLAYERS[player_key]
+    map_setup_start = perf_counter()
+    # keep setup info prints out of the JSON result
+    with redirect_stdout(sys.stderr):
+        # the seed decides the layout. no layout cache, so that setup time includes generation
+        cf_map = dict(CF_MAPS[map_key], seed=seed, layout_cache_dir=None)
+        M = PG_Map(cf_global, cf_map, timer, window.map_surface, dirty_rects=dirty_rects)
+        M.set_up_all()
+        M.spawn_player(cf_player)
+        # as PG_Map.start, without the wall-clock event timers
+        M.looping = True
+        M.full_redraw_pending = True
+        timer.new_segment(M.name, False)
+    map_setup_time = (perf_counter() - map_setup_start)
+
+    FPS = cf_global['fps_limit']
+    TERRAIN_UPDATE_TICKS = max(1, round(cf_map['upd_intervals']['terrain'] * FPS / 1000))
+    PLAYER_IMG_CYCLE_TICKS = max(1, round(cf_map['upd_intervals']['player_img_cycle'] * FPS / 1000))
+
+    script = load_input_script(input_path) if (input_path) else None
+    held: set[str] = set()
+    CONTROLS = cf_player['controls']
+
+    frame = 0
+    n_resets = 0
+    while (M.profiler.n_total < n_frames):
+        if (frame == warmup):
+            M.set_profiling(True)
+            # time the map, not the overlay
+            M.profiler_overlay.kill()
+
+        if not (M.looping):
+            with redirect_stdout(sys.stderr):
+                M.reset()
+            # the reset released all keys
+            held.clear()
+            n_resets += 1
+
+        if (script == None):
+            inputs = get_hover_inputs(M, frame, held)
+        else:
+            inputs = script.get(frame)
+        if (inputs):
+            post_scripted_input(inputs, CONTROLS)
+        # the interval events of PG_Map.check_events, handled before the tick as in PG_Map_Env.step_tick
+        if (M.n_ticks % PLAYER_IMG_CYCLE_TICKS == 0):
+            M.apply_input(Map_Input.PLAYER_IMG_CYCLE)
+        if (M.n_ticks % TERRAIN_UPDATE_TICKS == 0):
+            M.apply_input(Map_Input.UPDATE_TERRAIN)
+
+        M.FRAME_FUNC()
+        frame += 1
+
+    if not (M.rect.collidepoint(M.player.position)):
+        raise RuntimeError(f'the player left the map at {tuple(M.player.position)}. '
+                           'the measured frames do not reflect the collision work; use an input script that stays on the map')
+
+    # nanoseconds => seconds
+    phase_times = (M.profiler.get_samples() / 1e9)
+    frame_times = phase_times.sum(axis=1)
+    total_time = float(frame_times.sum())
+    measured = len(phase_times)
+
+    result = {
+        'map': map_key,
+        'player': player_key,
+        'seed': seed,
+        'dirty_rects': dirty_rects,
+        'frames': measured,
+        'warmup_frames': warmup,
+        'map_setup_s': map_setup_time,
+        'total_s': total_time,
+        'fps': (measured / total_time) if (total_time) else 0.0,
+        'frame_time_ms': percentiles_ms(frame_times),
+        'phases_ms': {PHASE: percentiles_ms(phase_times[:, i]) for i, PHASE in enumerate(PROFILER_PHASES)},
+        'phase_share': {PHASE: (float(phase_times[:, i].sum() / total_time) if (total_time) else 0.0)
+                        for i, PHASE in enumerate(PROFILER_PHASES)},
+        'counters': M.profiler.get_counter_stats(),
+        'map_resets': n_resets,
+        'projectile_pool': M.projectile_field.get_pool_info(),
+        # same seed and inputs => same final state. differences indicate a behavioural change
+        'final_state': {
+            'ticks': M.n_ticks,
+            'player_position': [round(M.player.position.x, 3), round(M.player.position.y, 3)],
+            'player_health': M.player.health,
+            'coins_collected': len(M.collected_coins),
+            'projectiles': len(M.projectile_field),
+        },
+    }
+    pg.quit()
+    return result
+
+
+def main():
+    parser = ArgumentParser(description='headless, deterministic benchmark of the PG_Map loop')
+    parser.add_argument('--map', default='map_2', choices=list(CF_MAPS.keys()))
+    parser.add_argument('--player', default='fighter', choices=list(CF_PLAYERS.keys()))
+    parser.add_argument('--frames', type=int, default=2000, help='measured frames')
+    parser.add_argument('--warmup', type=int, default=30, help='frames run before measuring')
+    parser.add_argument('--seed', type=int, default=1, help='map layout seed')
+    parser.add_argument('--input', default=None, help='JSON input script. default: hover between waypoints')
+    parser.add_argument('--dirty-rects', action='store_true', help='use dirty rect rendering')
+    parser.add_argument('--out', default=None, help='write the JSON result to this file, rather than stdout')
+    args = parser.parse_args()
+
+    result = run_benchmark(args.map, args.player, args.frames, args.seed,
+                           args.input, args.dirty_rects, args.warmup)
+    RESULT_JSON = json.dumps(result, indent=2)
+
+    if (args.out):
+        with open(args.out, 'w') as f:
+            f.write(RESULT_JSON)
+    else:
+        print(RESULT_JSON)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+CF_ENV = {
+    # max_steps:
+    #   episodes are truncated after this many simulation ticks. None => only end on success or death.
+    #   at the default fps_limit of 125, 7500 ticks is one minute of game time
+    'max_steps': int(7500),
+    # cache_layouts:
+    #   store the layout of every seed an episode is reset to, like maps with a seed set through the config.
+    #   speeds up repeated resets to the same seeds, at a small file per seed. Nothing removes the files,
+    #   so only enable it for a fixed set of seeds; training on random seeds would grow the cache without bound
+    'cache_layouts': False,
+    # reward:
+    #   reward per step is the weighted sum of the changes during that step.
+    #   success/death are given once, on the step the episode terminates
+    'reward': {
+        'coin':    float(1.0),      # per collected coin
+        'health':  float(0.01),     # per point of health gained (negative when lost)
+        'fuel':    float(0.01),     # per unit of fuel gained (negative when used)
+        'success': float(10.0),     # all coins collected
+        'death':   float(-10.0),    # player died
+    },
+}
+''' settings for PG_Map_Env, the headless training environment '''
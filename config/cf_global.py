@@ -1,5 +1,6 @@
 from .colors import RGB, RGBA
 import pygame as pg
+from os.path import join as os_path_join
 
 CF_GLOBAL = {
     # req_pygame_version:
@@ -29,6 +30,32 @@ CF_GLOBAL = {
     #   (i'm not entirely sure why this happens, but it's not really an issue.)
     #   fps limit must be set to a value for sprites to behave properly
     'fps_limit': int(125),      # default: 125
+    # fixed_timestep:
+    #   decouple the map simulation from the render rate. the simulation steps at exactly fps_limit
+    #   ticks per second of real time, running several ticks per rendered frame if rendering falls behind.
+    #   slow machines then drop frames rather than slowing down the game.
+    #   if false, the map simulates one tick per rendered frame
+    'fixed_timestep': True,     # default: True
+    # max_ticks_per_frame:
+    #   fixed timestep only. cap on ticks to catch up per rendered frame.
+    #   if exceeded (i.e. after a long stall), the game slows down rather than freezing to catch up
+    'max_ticks_per_frame': int(5),
+    # texture_atlas_dir:
+    #   directory of the pre-decoded texture atlas, baked by tools/bake_atlas.py. None => always decode images.
+    #   images missing from the atlas, or changed since it was baked, are decoded from their source files
+    'texture_atlas_dir': os_path_join('cache', 'atlas'),
+    # profiler_frames:
+    #   frames kept by the frame profiler of a map, which times each phase of a frame while enabled.
+    #   its statistics are rolling over this many frames
+    'profiler_frames': int(250),
+    # profiler_key:
+    #   toggles the frame profiler while a map is running. Statistics are printed on map exit
+    'profiler_key': pg.K_F3,
+    # input_log_dir:
+    #   directory to log the seed and inputs of every map session to, for replay by tools/replay_session.py.
+    #   a few bytes per input, but a new file per session, and nothing removes them. set it to reproduce a bug,
+    #   i.e. os_path_join('cache', 'input_logs'). None => no logs. fixed timestep only; ignored if fixed_timestep is false
+    'input_log_dir': None,      # default: None
     # blocked_events are a list of pg.event.type that will be blocked from the event queue
     # improves performance slightly by not needing to iterate over events that are unused
     'blocked_events': [
@@ -8,6 +8,23 @@ MAP_UPDATE_INTERVALS = {
     'player_img_cycle': int(30)
 }
 
+# cell size (px) of the uniform grid of blocks. narrows down the blocks within an area: the blocks
+# the player collides with, to highlight them, and the blocks overlapping a block re-baked into the static layer.
+# projectiles hit terrain through the block occupancy grid instead.
+# should be around the size of the player, and small relative to the map
+COLLISION_GRID_CELL_SIZE = int(64)
+
+# max. projectiles alive at once. shots fired while the pool is full are dropped.
+# tune using the high water mark reported by the projectile field at map exit
+PROJECTILE_POOL_SIZE = int(512)
+
+# cell size (px) of the occupancy grid used to place obstacles and coins without rejection sampling.
+# positions within a cell of occupied space are never picked, so keep it small relative to the spacing settings
+PLACEMENT_GRID_CELL_SIZE = int(8)
+
+# generated layouts of maps with a set seed are stored here, and reused on later loads. None => no caching
+LAYOUT_CACHE_DIR = os_path_join('cache', 'layouts')
+
 CF_MAPS = {
     # a map is a setup config for the active part of the game surface
     'map_1': {
@@ -17,6 +34,9 @@ CF_MAPS = {
         'overlap_color':   RGB['white'],  # used for visualizing overlapping masks / misc
         # 'gravity_c':       float(0),     # every frame gravitational incrementor
         'gravity_c':       float(0.003),     # every frame gravitational incrementor
+        # seed for terrain, turret and coin placement. None => new random layout every load.
+        # set an int to get the same layout every time. the layout is then cached to disk after the first load
+        'seed':            None,
         'cf_spawning': {
             # map-specific sprite settings and parameters related to their spawning process
             'coins': {
@@ -82,6 +102,10 @@ CF_MAPS = {
             }
         },
         'upd_intervals': MAP_UPDATE_INTERVALS,
+        'collision_grid_cell_size': COLLISION_GRID_CELL_SIZE,
+        'projectile_pool_size':     PROJECTILE_POOL_SIZE,
+        'placement_grid_cell_size': PLACEMENT_GRID_CELL_SIZE,
+        'layout_cache_dir':         LAYOUT_CACHE_DIR,
         # time between sprite updates, per type. Values are millisecs between updates
         # these values will typically have an applied variance of 0.5%
     },
@@ -92,6 +116,8 @@ CF_MAPS = {
         'overlap_color':   RGB['white'],  # used for visualizing overlapping masks / misc
         # 'gravity_c':       float(0),     # every frame gravitational incrementor
         'gravity_c':       float(0.0015),     # every frame gravitational incrementor
+        # seed for terrain, turret and coin placement. None => new random layout every load
+        'seed':            None,
         # nested configs; sets the config dicts of "children". can be shared or unique
         'cf_spawning': {
             # map-specific sprite settings and parameters related to their spawning process
@@ -159,6 +185,10 @@ CF_MAPS = {
             }
         },
         'upd_intervals': MAP_UPDATE_INTERVALS,
+        'collision_grid_cell_size': COLLISION_GRID_CELL_SIZE,
+        'projectile_pool_size':     PROJECTILE_POOL_SIZE,
+        'placement_grid_cell_size': PLACEMENT_GRID_CELL_SIZE,
+        'layout_cache_dir':         LAYOUT_CACHE_DIR,
         # time between sprite updates, per type. Values are millisecs between updates
         # these values will typically have an applied variance of 0.5%
     }
@@ -27,6 +27,7 @@ CF_PLAYERS = {
         'description': str("Tanky, with great Fuel Capacity. Large and Heavy."),
         'spritesheets': {
             'image_scalar': float(0.4),
+            'rotation_step': float(2.0),  # degrees between cached rotations. lower => smoother, more memory
             'idle': {
                 'path': os_path_join('assets','spritesheets','spaceships','Corvette','Idle.png'),
                 'n_images': int(1),
@@ -89,6 +90,7 @@ CF_PLAYERS = {
         'description': str("All-Rounder, Balanced and Versatile."),
         'spritesheets': {
             'image_scalar': float(0.5),
+            'rotation_step': float(2.0),  # degrees between cached rotations. lower => smoother, more memory
             'idle': {
                 'path': os_path_join('assets','spritesheets','spaceships','Bomber','Idle.png'),
                 'n_images': int(1),
@@ -151,6 +153,7 @@ CF_PLAYERS = {
         'description': str("Light, Agile and Fast. Low Health and Fuel Capacity."),
         'spritesheets': {
             'image_scalar': float(0.5),
+            'rotation_step': float(2.0),  # degrees between cached rotations. lower => smoother, more memory
             'idle': {
                 'path': os_path_join('assets','spritesheets','spaceships','Fighter','Idle.png'),
                 'n_images': int(1),
@@ -1,5 +1,6 @@
 from .cf_window import MAP_TOPRIGHT_POS
 from .fonts import cf_font
+from .rect_styles import CF_FILLED_RECT
 
 text_box_container_width = int(200)
 text_box_container_height = int(200)
@@ -11,9 +12,12 @@ text_box_container_pos_y = int(MAP_TOPRIGHT_POS[1] + 8)
 CF_TIMER = {
     # accurate_timing:
     #   how strict the time tick function should be.
-    #   Uses more resources if set to true
-    #   docref: https://www.pygame.org/docs/ref/time.html#pygame.time.Clock.tick_busy_loop
-    'accurate_timing':           True,                # default: True
+    #   True: busy loop for the whole frame. Accurate, but keeps a core at 100%
+    #       docref: https://www.pygame.org/docs/ref/time.html#pygame.time.Clock.tick_busy_loop
+    #   'hybrid': sleep for most of the frame, then busy loop for the last fraction of a ms.
+    #       close to the accuracy of True, at a fraction of the CPU use
+    #   False: sleep only. Least accurate
+    'accurate_timing':           'hybrid',            # default: 'hybrid'
     'display_fps_text':          True,
     'display_segment_time_text': True,
     'fps_text_style':            cf_font('large', 'green', 'bold', None),
@@ -31,5 +35,22 @@ CF_TIMER = {
         'child_align_y':   str("bottom"),
         'child_padding_x': int(0),
         'child_padding_y': int(14)
+    },
+    # profiler_overlay:
+    #   frame profiler statistics of the running map, shown in the text box container while profiling.
+    #   toggled along with the profiler, through 'profiler_key' in cf_global
+    'profiler_overlay': {
+        'ref_id':          ["PROFILER", "OVERLAY", "TEMP"],
+        'font':            cf_font(13, 'dutchwhite', 'regular', None),
+        'cf_bar': {
+            'bg': CF_FILLED_RECT['offblack_on_offblack'],
+            'bar': CF_FILLED_RECT['green_on_green'],
+            'internal_padding_x': int(1),
+            'internal_padding_y': int(1),
+        },
+        'bar_size':        (int(90), int(12)),
+        'label_width':     int(240),    # width of the text left of the bars
+        'row_height':      int(16),
+        'refresh_frames':  int(10),     # frames between each re-render. text rendering is slow
     }
 }
@@ -36,6 +36,9 @@ CF_WINDOW = {
     'fill_color': RGB['gray_100'],
     'vsync':      int(0), # bool, 0/1
     'fullscreen': False,  # warning: it works, but not great. big fps losses, also
+    # dirty_rects: if True, maps only restore and push the areas sprites were drawn at,
+    #   instead of redrawing and updating the entire window every frame
+    'dirty_rects': False,
     'width':      window_width,
     'height':     window_height,
     'map_rect_info': MAP_RECT_INFO
@@ -84,6 +84,7 @@ CF_PROJECTILES = {
         },
         'img_cycle_frequency': int(0),
         'image_scalar': float(1.0),
+        'rotation_step': float(1.0),    # degrees between cached rotations. shared between all spawners
         'damage': float(10)
     }
 }
@@ -115,6 +116,7 @@ CF_TURRETS = {
         'cf_projectile_spawner': CF_PROJECTILE_SPAWNERS['missile_x1'],
         'rotation_rate': float(-0.15),
         'image_scalar': float(0.25),
+        'rotation_step': float(1.0),  # degrees between pre-rendered rotations. shared between turrets of the same config
         'delay_before_shooting': int(0),
         'delay_after_shooting': int(0),
         'projectile_magnitude': float(1.0),
@@ -128,6 +130,7 @@ CF_TURRETS = {
         'cf_projectile_spawner': CF_PROJECTILE_SPAWNERS['missile_x2'],
         'rotation_rate': float(-0.1),
         'image_scalar': float(0.25),
+        'rotation_step': float(1.0),  # degrees between pre-rendered rotations. shared between turrets of the same config
         'delay_before_shooting': int(5),
         'delay_after_shooting': int(3),
         'projectile_magnitude': float(1.0),
@@ -141,6 +144,7 @@ CF_TURRETS = {
         'cf_projectile_spawner': CF_PROJECTILE_SPAWNERS['missile_x4'],
         'rotation_rate': float(0.18),
         'image_scalar': float(0.25),
+        'rotation_step': float(1.0),  # degrees between pre-rendered rotations. shared between turrets of the same config
         'delay_before_shooting': int(0),
         'delay_after_shooting': int(0),
         'projectile_magnitude': float(0.5),
@@ -1,15 +1,24 @@
-from random import randint, uniform
+from random import Random
 
 from pygame import Surface, mask
+from pygame.mask import Mask
 from pygame.sprite import Sprite
 
+from .PG_common import register_asset_cache, get_cache_counter
+
+
+COIN_MASKS: dict[tuple[Surface, ...], tuple[Mask, ...]] = register_asset_cache('coin masks', {})
+''' mask of each coin image, keyed by the image tuple. Shared between all coins using the same images '''
+COIN_MASKS_COUNTER = get_cache_counter('coin masks')
+
 
 class Coin(Sprite):
     def __init__(self,
             cf_coin: dict,
             cf_global: dict,
             IMAGES: tuple[Surface, ...],
-            position: tuple[int, int]
+            position: tuple[int, int],
+            rng: Random
         ):
 
         Sprite.__init__(self)
@@ -18,15 +27,23 @@ class Coin(Sprite):
         self.cf_global = cf_global
         self.position = position
 
-        rand_rate = uniform(self.cf_coin['min_img_iter_frequency'], self.cf_coin['max_img_iter_frequency'])
+        rand_rate = rng.uniform(self.cf_coin['min_img_iter_frequency'], self.cf_coin['max_img_iter_frequency'])
         self.img_iteration_rate = round(cf_global['fps_limit'] * rand_rate)
         self.img_iteration_rate = 14
         self.time_since_update = 0
 
-        self.curr_image_index = randint(0, self.IMAGES[1])
+        self.MASKS = COIN_MASKS.get(self.IMAGES[0])
+        if (self.MASKS == None):
+            COIN_MASKS_COUNTER[1] += 1
+            self.MASKS = tuple(mask.from_surface(IMG) for IMG in self.IMAGES[0])
+            COIN_MASKS[self.IMAGES[0]] = self.MASKS
+        else:
+            COIN_MASKS_COUNTER[0] += 1
+
+        self.curr_image_index = rng.randint(0, self.IMAGES[1])
         self.image = self.IMAGES[0][self.curr_image_index]
         self.rect = self.image.get_rect(center=position)
-        self.mask = mask.from_surface(self.image)
+        self.mask = self.MASKS[self.curr_image_index]
 
     def update(self):
         self.time_since_update += 1
@@ -37,10 +54,5 @@ class Coin(Sprite):
             else:
                 self.curr_image_index += 1
             self.image = self.IMAGES[0][self.curr_image_index]
-
-            # TODONE - look into how costly mask generation is. could pre-make a list of masks
-            # ncalls  tottime  percall  cumtime  percall filename:lineno(function)
-            #     1    0.000    0.000   31.657   31.657 <string>:1(<module>)
-            #  7262    0.047    0.000    0.047    0.000 {built-in method pygame.mask.from_surface}
-            # --> from_surface seems extremely optimized, not worth looking into
-            self.mask = mask.from_surface(self.image)
+            # masks are made once per image, see COIN_MASKS. from_surface is fast, but runs for every coin
+            self.mask = self.MASKS[self.curr_image_index]
@@ -1,4 +1,24 @@
-from pygame import Surface, SRCALPHA, transform, Rect, image
+from threading import Lock
+
+from pygame import Surface, SRCALPHA, transform, Rect, image, display
+
+
+ASSETS: dict[tuple[str, int, float, float | None], list] = {}
+''' loaded images, keyed by (path, n_images, scalar, angle).
+    * values are [frames, converted]. Once converted to the display format, the unconverted frames are dropped
+    * shared between every sprite using them. The surfaces must not be modified
+'''
+ASSETS_LOCK = Lock()
+''' held while inserting into ASSETS, which the map preload thread fills alongside the main thread '''
+
+DERIVED_ASSET_CACHES: dict[str, dict] = {}
+''' caches of images derived from ASSETS, i.e. pre-rendered rotations, by name. See register_asset_cache '''
+
+TEXTURE_ATLAS = None
+''' PG_Texture_Atlas of pre-decoded images, used rather than decoding the images it holds. See set_texture_atlas '''
+
+CACHE_COUNTERS: dict[str, list[int]] = {}
+''' [hits, misses] of lookups into ASSETS and the derived caches, by name. See get_cache_counter '''
 
 
 def partition_spritesheet(spritesheet: Surface, n_images: int, scalar: float, angle: None | float) -> tuple[Surface, ...]:
@@ -26,29 +46,149 @@ def partition_spritesheet(spritesheet: Surface, n_images: int, scalar: float, an
     # return list as a tuple
     return tuple(images)
 
-def load_image(path: str, scalar: float, angle: None | float):
-        IMG_SOURCE = image.load(path)
-        img_width = IMG_SOURCE.get_width()
-        img_height = IMG_SOURCE.get_height()
+def decode_image(path: str, scalar: float, angle: None | float) -> Surface:
+    ''' load, scale and rotate an image file, without caching or converting it '''
+    IMG_SOURCE = image.load(path)
+    img_width = IMG_SOURCE.get_width()
+    img_height = IMG_SOURCE.get_height()
 
-        SURF = Surface((img_width, img_height), flags=SRCALPHA)
-        SURF.blit(IMG_SOURCE, SURF.get_rect())
+    SURF = Surface((img_width, img_height), flags=SRCALPHA)
+    SURF.blit(IMG_SOURCE, SURF.get_rect())
 
-        if (angle == None):
-            return transform.scale_by(SURF, scalar)
-        else:
-            return transform.rotozoom(SURF, angle, scalar)
+    if (angle == None):
+        return transform.scale_by(SURF, scalar)
+    else:
+        return transform.rotozoom(SURF, angle, scalar)
+
+def get_asset_key(path: str, n_images: int, scalar: float, angle: None | float) -> tuple[str, int, float, float | None]:
+    ''' key of an asset in ASSETS and the texture atlas '''
+    return (str(path), int(n_images), float(scalar), (None if (angle == None) else float(angle)))
+
+def decode_frames(path: str, n_images: int, scalar: float, angle: None | float) -> tuple[Surface, ...]:
+    ''' load, scale and rotate the frames of a horizontal spritesheet, without caching or converting them '''
+    if (n_images == 1):
+        return (decode_image(path, scalar, angle), )
+    return partition_spritesheet(image.load(path), n_images, scalar, angle)
+
+def load_frames(path: str, n_images: int, scalar: float, angle: None | float, convert: bool = True) -> tuple[Surface, ...]:
+    ''' get the frames of a horizontal spritesheet through the asset cache. Each combination of args is decoded once.
+        * convert: get the frames converted to the display format, which blit faster.
+            Converted once, on the first call that asks for it. Ignored if no display mode is set.
+            Without convert, the frames may or may not be converted already
+        * decoding needs no display, and may run on any thread. Only convert on the main thread.
+            threads decoding the same key at once keep whichever entry was inserted first, so a converted entry is never replaced
+        * frames held by the texture atlas, if set, are read from it rather than decoded
+    '''
+    KEY = get_asset_key(path, n_images, scalar, angle)
+    entry = ASSETS.get(KEY)
+    if (entry == None):
+        ASSETS_COUNTER[1] += 1
+        FRAMES = None
+        if (TEXTURE_ATLAS != None):
+            FRAMES = TEXTURE_ATLAS.get_frames(KEY)
+        if (FRAMES == None):
+            FRAMES = decode_frames(path, n_images, scalar, angle)
+        # decoded without the lock, so that a slow decode does not block other threads
+        with ASSETS_LOCK:
+            entry = ASSETS.setdefault(KEY, [FRAMES, False])
+    else:
+        ASSETS_COUNTER[0] += 1
+
+    if (convert) and not (entry[1]) and (display.get_surface() != None):
+        # the frames are rotated/scaled with an alpha channel, so always keep it
+        entry[0] = tuple(IMG.convert_alpha() for IMG in entry[0])
+        entry[1] = True
+    return entry[0]
 
-def load_sprites_tuple(path: str, n_images: int, scalar: float, angle: None | float) -> tuple[tuple[Surface, ...], int]:
-    ''' returns a tuple:
+def load_image(path: str, scalar: float, angle: None | float, convert: bool = True) -> Surface:
+    ''' get a single image through the asset cache. See load_frames '''
+    return load_frames(path, 1, scalar, angle, convert)[0]
+
+def load_sprites_tuple(path: str, n_images: int, scalar: float, angle: None | float,
+                       convert: bool = True) -> tuple[tuple[Surface, ...], int]:
+    ''' returns a tuple, loaded through the asset cache. See load_frames
         tuple[0] => tuple[images, ...]
         tuple[1] => max index of tuple[0] (len-1)
     '''
+    return (load_frames(path, n_images, scalar, angle, convert), int(n_images - 1))
 
-    if (n_images == 1):
-        IMG = (load_image(path, scalar, angle), )
-        return (IMG, int(n_images - 1))
-    else:
-        SHEET = image.load(path)
-        IMAGES = partition_spritesheet(SHEET, n_images, scalar, angle)
-        return (IMAGES, int(n_images - 1))
+def set_texture_atlas(atlas):
+    ''' set the PG_Texture_Atlas to load assets from, or None to always decode them.
+        * only affects assets not yet in ASSETS. See PG_texture_atlas
+    '''
+    global TEXTURE_ATLAS
+    TEXTURE_ATLAS = atlas
+
+def register_asset_cache(name: str, cache: dict) -> dict:
+    ''' register a module level cache of derived images, to be reported and released along with ASSETS.
+        returns the cache, for use as a module level assignment
+    '''
+    DERIVED_ASSET_CACHES[name] = cache
+    return cache
+
+def get_cache_counter(name: str) -> list[int]:
+    ''' the [hits, misses] counter of a cache, created on first call. Caches count their own lookups into it.
+        * counts are reset by release_assets, along with the caches
+    '''
+    counter = CACHE_COUNTERS.get(name)
+    if (counter == None):
+        counter = [0, 0]
+        CACHE_COUNTERS[name] = counter
+    return counter
+
+def get_cache_hit_rates() -> dict[str, float | None]:
+    ''' fraction of lookups that hit, per cache. None for caches without lookups '''
+    return {
+        name: ((HITS / (HITS + MISSES)) if (HITS + MISSES) else None)
+        for name, (HITS, MISSES) in CACHE_COUNTERS.items()
+    }
+
+def get_surface_bytes(obj) -> int:
+    ''' pixel memory of every surface within obj; a surface, or nested tuples/lists/dicts of them '''
+    if isinstance(obj, Surface):
+        return int(obj.get_pitch() * obj.get_height())
+    if isinstance(obj, dict):
+        return sum(get_surface_bytes(value) for value in obj.values())
+    if isinstance(obj, (tuple, list)):
+        return sum(get_surface_bytes(value) for value in obj)
+    return 0
+
+def get_asset_report() -> list[dict]:
+    ''' pixel memory held by each cached asset and each derived cache, largest first '''
+    report = []
+    for (path, n_images, scalar, angle), (FRAMES, CONVERTED) in ASSETS.items():
+        report.append({
+            'asset': f'{path} (n={n_images}, scalar={scalar}, angle={angle})',
+            'converted': CONVERTED,
+            'bytes': get_surface_bytes(FRAMES),
+        })
+    for name, cache in DERIVED_ASSET_CACHES.items():
+        report.append({
+            'asset': f'{name} ({len(cache)} entries)',
+            'converted': None,
+            'bytes': get_surface_bytes(cache),
+        })
+    report.sort(key=lambda row: row['bytes'], reverse=True)
+    return report
+
+def format_asset_report() -> str:
+    REPORT = get_asset_report()
+    lines = [f'  {(row["bytes"] / 1024):10.1f} KiB  {row["asset"]}' for row in REPORT]
+    total = sum(row['bytes'] for row in REPORT)
+    lines.append(f'  {(total / 1024):10.1f} KiB  total, {len(ASSETS)} assets')
+    return '\n'.join(lines)
+
+def release_assets():
+    ''' drop all cached assets and derived caches. Sprites still referencing them keep their surfaces alive.
+        * called on app exit. Maps share the caches, so they are kept between maps. The next load decodes again
+    '''
+    with ASSETS_LOCK:
+        ASSETS.clear()
+    for cache in DERIVED_ASSET_CACHES.values():
+        cache.clear()
+    for counter in CACHE_COUNTERS.values():
+        counter[0] = 0
+        counter[1] = 0
+
+
+ASSETS_COUNTER = get_cache_counter('assets')
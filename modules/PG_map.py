@@ -1,11 +1,15 @@
-from random import randint
+from random import Random, randrange
+from os import makedirs
+from os.path import join as os_path_join
+from datetime import datetime
+from time import perf_counter, perf_counter_ns
 from typing import Callable
 # installed library imports
 import pygame as pg
-from pygame import Color, Surface, Rect, display, SRCALPHA
+from pygame import Color, Surface, Rect, display, surfarray, SRCALPHA
 from pygame.math import Vector2 as Vec2
 from pygame.draw import line as draw_line, lines as draw_lines, rect as draw_rect
-from pygame.sprite import Sprite, Group, GroupSingle, spritecollide, spritecollideany, collide_mask, groupcollide
+from pygame.sprite import Sprite, Group, GroupSingle, spritecollide, spritecollideany, collide_mask
 from pygame.mask import Mask
 
 # from pygame.image import save as image_save
@@ -19,22 +23,43 @@ from .PG_block import Block
 from .PG_player import Player
 from .PG_coin import Coin
 from .PG_turret import PG_Missile_Turret
+from .PG_projectiles import PG_Projectile_Field
 from .PG_ui_containers import UI_Sprite_Container
 from .PG_ui_bars import UI_Auto_Icon_Bar_Horizontal
-from .PG_common import partition_spritesheet
+from .PG_ui_profiler import UI_Profiler_Overlay
+from .PG_common import load_image, load_sprites_tuple, get_cache_hit_rates
+from .PG_spatial_grid import PG_Spatial_Grid
+from .PG_placement_grid import PG_Placement_Grid
+from .map_layout import Map_Layout, get_layout_cache_key, load_cached_layout, save_cached_layout
+from .input_log import Map_Input, Input_Log_Writer, get_config_digest, INPUT_LOG_EXTENSION
+from .frame_profiler import Frame_Profiler
 
 SPAWN_INFO_PRINT = True
 DEBUG_PLAYER_VISUALS = False
 DEBUG_CHEAT_MODE = True
 
+PROFILER_PHASES = ('events', 'sprites', 'terrain', 'coins', 'projectiles', 'draw', 'ui', 'display', 'timer')
+''' phases of a frame timed while profiling. See PG_Map.set_profiling.
+    * sprites: sprite and projectile updates. terrain/coins/projectiles: the collision checks of the player
+    * display: pushing the frame to the display. timer: includes the wait to hold fps_limit
+'''
+(PHASE_EVENTS, PHASE_SPRITES, PHASE_TERRAIN, PHASE_COINS, PHASE_PROJECTILES,
+ PHASE_DRAW, PHASE_UI, PHASE_DISPLAY, PHASE_TIMER) = range(len(PROFILER_PHASES))
+PROFILER_COUNTERS = ('ticks', 'mask_tests')
+''' per-frame counts while profiling: simulation ticks, and mask overlap checks of all collision checks '''
+COUNTER_TICKS, COUNTER_MASK_TESTS = range(len(PROFILER_COUNTERS))
+
 class PG_Map:
-    def __init__(self, cf_global: dict, cf_map: dict, timer: PG_Timer, surface: Surface):
+    def __init__(self, cf_global: dict, cf_map: dict, timer: PG_Timer, surface: Surface,
+                 dirty_rects: bool = False):
         self.cf_global  = cf_global
         self.cf_map     = cf_map
         self.surface    = surface
         ''' map-designated display subsurface '''
         self.timer      = timer
         ''' reference to the app timer '''
+        self.DIRTY_RECTS = bool(dirty_rects)
+        ''' if set, only restore/push the areas sprites are drawn at. See clear_dirty_rects '''
 
         ### CONSTANTS ####
         self.cf_ui_sprites: dict    = cf_map['ui_sprites']
@@ -45,6 +70,12 @@ class PG_Map:
 
         # globals
         self.LOOP_LIMIT      = int(self.cf_global['loop_limit'])
+        self.FIXED_TIMESTEP  = bool(self.cf_global['fixed_timestep'])
+        self.TICK_TIME       = float(1.0 / self.cf_global['fps_limit'])
+        ''' fixed timestep: seconds of real time per simulation tick '''
+        self.MAX_TICKS_PER_FRAME = int(self.cf_global['max_ticks_per_frame'])
+        self.MAX_ACCUMULATED = float(self.MAX_TICKS_PER_FRAME * self.TICK_TIME)
+        ''' fixed timestep: cap on real time to catch up per rendered frame, in seconds '''
         self.DEBUG_COLOR     = Color(self.cf_global['debug_color'])
         self.DEBUG_COLOR_2   = Color(self.cf_global['debug_color_2'])
 
@@ -54,40 +85,29 @@ class PG_Map:
         self.fill_color      = Color(cf_map['fill_color'])
         self.overlap_color   = Color(cf_map['overlap_color'])
         self.N_COINS         = int(self.cf_spawning['coins']['n_coins'])
-
-        if (cf_map['bg_image'] != None):
-            RAW_IMG = pg.image.load(str(cf_map['bg_image'])).convert_alpha()
-
-            raw_img_width = RAW_IMG.get_width()
-            raw_img_height = RAW_IMG.get_height()
-            w_diff = int(self.rect.w - raw_img_width)
-            h_diff = int(self.rect.h - raw_img_height)
-
-            # scale image to the surface size without distorting it
-            if (w_diff > 0) or (h_diff > 0):
-                # image is too small
-                w_scalar = float(self.rect.w / raw_img_width)
-                h_scalar = float(self.rect.h / raw_img_height)
-
-                if (w_scalar > h_scalar):
-                    self.BG_IMAGE = pg.transform.scale_by(RAW_IMG, w_scalar)
-                else:
-                    self.BG_IMAGE = pg.transform.scale_by(RAW_IMG, h_scalar)
-            elif (w_diff != 0) and (h_diff != 0):
-                # do the same if image is too large
-                w_scalar = float(self.rect.w / raw_img_width)
-                h_scalar = float(self.rect.h / raw_img_height)
-                if (w_scalar > h_scalar):
-                    self.BG_IMAGE = pg.transform.scale_by(RAW_IMG, w_scalar)
-                else:
-                    self.BG_IMAGE = pg.transform.scale_by(RAW_IMG, h_scalar)
-            else:
-                # image is exactly the right format
-                self.BG_IMAGE = RAW_IMG
-
-            self.BG_CLEAR_FUNC = self.clear_surf_with_image
+        self.GRID_CELL_SIZE  = int(cf_map['collision_grid_cell_size'])
+        self.PROJECTILE_POOL_SIZE = int(cf_map['projectile_pool_size'])
+        self.PLACEMENT_CELL_SIZE  = int(cf_map['placement_grid_cell_size'])
+        self.LAYOUT_CACHE_DIR: str | None = cf_map['layout_cache_dir']
+
+        # all map generation draws from a single seeded generator, so a seed always gives the same layout
+        if (cf_map['seed'] != None):
+            self.SEED = int(cf_map['seed'])
+            self.SEED_FROM_CONFIG = True
         else:
-            self.BG_CLEAR_FUNC = self.clear_surf_with_fill
+            self.SEED = randrange(2**32)
+            self.SEED_FROM_CONFIG = False
+        self.rng = Random(self.SEED)
+        self.layout = Map_Layout(self.SEED)
+        ''' description of the generated layout. Cached on disk for seeds set through the config '''
+        self.layout_from_cache = False
+
+        self.prepared = False
+        ''' set once prepare has run. See prepare '''
+        self.COIN_IMAGES: tuple[tuple[Surface, ...], int] = ((), 0)
+        ''' (images, max index) shared between all coins. Set by prepare, converted by set_up_all '''
+        self.BG_IMAGE: Surface | None = None
+        ''' background image scaled to the map, if set. Baked into STATIC_LAYER '''
 
         #### SPRITE GROUPS & LISTS ####
         self.ALL_SPRITES: list[Sprite] = []
@@ -104,7 +124,7 @@ class PG_Map:
 
         # main groups
         self.block_update_group = Group()
-        ''' group containing blocks to be updated, if any '''
+        ''' group containing highlighted blocks to be updated, if any '''
         self.player_group = GroupSingle()
         ''' player sprite group. If a new sprite is added, the old is removed. '''
         self.block_group = Group()
@@ -115,60 +135,299 @@ class PG_Map:
         self.turret_group = Group()
         self.ui_container_group = Group()
 
-        self.projectile_collide_group = Group()
-        self.global_projectile_group = Group()
+        self.projectile_field = PG_Projectile_Field(self.rect, self.PROJECTILE_POOL_SIZE)
+        ''' bounded pool of every projectile on the map, stored and simulated as NumPy arrays rather than sprites '''
+
+        self.block_grid = PG_Spatial_Grid(self.rect, self.GRID_CELL_SIZE)
+        ''' index of block_group, used to find the specific blocks involved in a terrain collision '''
+        self.dynamic_terrain_group = Group()
+        ''' terrain that is not baked into TERRAIN_MASK, i.e. rotating turrets '''
 
         # create a list to hold all created bars. can be needed for search after .kill()
         self.STATUS_BARS: list[UI_Auto_Icon_Bar_Horizontal] = []
         
+        # create function pointers instead of checking the render mode every frame
+        if (self.DIRTY_RECTS):
+            self.CLEAR_FUNC: Callable = self.clear_dirty_rects
+            self.DISPLAY_UPDATE_FUNC: Callable = self.display_update_dirty_rects
+        else:
+            self.CLEAR_FUNC: Callable = self.clear_surf_with_static_layer
+            self.DISPLAY_UPDATE_FUNC: Callable = display.update
+
+        self.EVENT_UPDATE_TERRAIN: int = pg.NOEVENT
+        self.EVENT_PLAYER_IMG_CYCLE: int = pg.NOEVENT
+        ''' the interval event types, created by start. Until then no event matches them, see check_events '''
+
+        # the phases of a frame, as (PROFILER_PHASES index, method), in the order they run.
+        # the only definition of the frame sequence: the loops, simulate_tick and the profiler all run these
+        self.TICK_PHASES_PRE_INPUT: tuple[tuple[int, Callable], ...] = (
+            (PHASE_SPRITES, self.update_turrets_and_projectiles),
+            (PHASE_TERRAIN, self.check_player_terrain_collision),
+            (PHASE_COINS, self.check_player_coin_collision),
+            (PHASE_PROJECTILES, self.check_projectile_collision),
+        )
+        self.TICK_PHASES_POST_INPUT: tuple[tuple[int, Callable], ...] = (
+            (PHASE_SPRITES, self.update_player_and_coins),
+        )
+        ''' the player reads the held input in its update. The frame-locked loop handles events in between '''
+        self.TICK_PHASES = (self.TICK_PHASES_PRE_INPUT + self.TICK_PHASES_POST_INPUT)
+        self.EVENT_PHASES: tuple[tuple[int, Callable], ...] = ((PHASE_EVENTS, self.check_events), )
+        self.RENDER_PHASES: tuple[tuple[int, Callable], ...] = (
+            (PHASE_DRAW, self.draw_frame),
+            (PHASE_UI, self.update_ui),
+            (PHASE_DISPLAY, self.DISPLAY_UPDATE_FUNC),
+            (PHASE_TIMER, self.update_timer),
+        )
+        self.LOCKED_FRAME_PHASES: tuple[tuple[int, Callable], ...] = (
+            ((PHASE_DRAW, self.draw_frame), ) + self.TICK_PHASES_PRE_INPUT + self.EVENT_PHASES
+            + ((PHASE_UI, self.update_ui), (PHASE_DISPLAY, self.DISPLAY_UPDATE_FUNC))
+            + self.TICK_PHASES_POST_INPUT + ((PHASE_TIMER, self.update_timer), )
+        )
+        ''' run_frame_locked: draw, then a single tick, with input read mid-tick '''
+        self.RUN_PHASES: Callable = self.run_phases
+        ''' runs a tuple of phases. Swapped for run_phases_profiled by set_profiling '''
+
+        if (self.FIXED_TIMESTEP):
+            self.LOOP_FUNC: Callable = self.loop_fixed_timestep
+            self.BASE_FRAME_FUNC: Callable = self.run_frame_fixed_timestep
+        else:
+            self.LOOP_FUNC: Callable = self.loop_frame_locked
+            self.BASE_FRAME_FUNC: Callable = self.run_frame_locked
+        self.FRAME_FUNC: Callable = self.BASE_FRAME_FUNC
+        ''' runs a single frame of the loop. Swapped for run_frame_profiled by set_profiling '''
+        self.profiler = Frame_Profiler(PROFILER_PHASES, self.cf_global['profiler_frames'], PROFILER_COUNTERS)
+        ''' per-phase frame times, collected while profiling is set '''
+        self.profiling = False
+        self.profiler_overlay: UI_Profiler_Overlay | None = None
+        ''' shown in the timer text container while profiling. Created on first use '''
+        self.profiler_overlay_stats: tuple[dict, dict, dict] = ({}, {}, {})
+        ''' (phase stats, counter stats, cache hit rates) as of the last overlay refresh '''
+        self.PROFILER_KEY = int(self.cf_global['profiler_key'])
+
+        self.INPUT_FUNC: Callable[[int], None] = self.apply_input
+        ''' handles every Map_Input. apply_input, or record_input while an input log is written '''
+        self.input_log: Input_Log_Writer | None = None
+
+        self.SURFACE_OFFSET = self.surface.get_abs_offset()
+        ''' offset of the map subsurface within the window. display.update expects window positions '''
+
         #### VARIABLES ####
+        self.prev_drawn_rects: list[Rect] = []
+        ''' dirty rects mode: areas sprites were drawn at in the previous frame '''
+        self.restored_rects: list[Rect] = []
+        ''' dirty rects mode: areas restored from STATIC_LAYER during the current frame '''
+        self.rebaked_rects: list[Rect] = []
+        ''' dirty rects mode: areas of STATIC_LAYER re-baked since the last restore '''
+        self.full_redraw_pending = True
+        ''' dirty rects mode: redraw and push the entire surface next frame '''
         self.collected_coins = []
         self.looping     = False
         self.paused      = False
         self.map_success   = None
         self.quit_called = False
         self.death_frames_left = int(0)
+        self.tick_accumulator = float(0)
+        ''' fixed timestep: real time not yet simulated, in seconds '''
+        self.n_ticks = int(0)
+        ''' simulation ticks since the map was created '''
+        self.n_mask_tests = int(0)
+        ''' mask overlap checks of the player collision checks. Read and reset by the profiled frames '''
 
         self.player_death_source: str = ''
 
     #### NON-RECURRING SETUP METHODS // HELPER FUNCTIONS ####
 
+    def prepare(self):
+        ''' the part of the map setup that does not need the display: decode the background, coin and turret
+            images into the asset cache, then load the cached layout, or generate and cache a new one.
+            * creates no sprites and converts no surfaces, so it may run on a worker thread. See PG_Map_Preloader
+            * the map must not be used by any other thread until it returns
+            * called by set_up_all, unless already done
+        '''
+        self.load_bg_image(convert=False)
+        self.COIN_IMAGES = self.load_coin_images(convert=False)
+        for cf_turret in self.cf_spawning['turrets']['cf_turrets']:
+            load_image(cf_turret['spritesheet']['path'], cf_turret['image_scalar'], -90.0, convert=False)
+
+        # only layouts from a configured seed are cached. random seeds would rarely be reused
+        cached_layout: Map_Layout | None = None
+        CACHING = (self.SEED_FROM_CONFIG) and (self.LAYOUT_CACHE_DIR != None)
+        if (CACHING):
+            LAYOUT_KEY = get_layout_cache_key(self.cf_map, self.rect.size, self.SEED)
+            cached_layout = load_cached_layout(self.LAYOUT_CACHE_DIR, LAYOUT_KEY)
+
+        if (cached_layout != None):
+            self.layout = cached_layout
+            self.layout_from_cache = True
+        else:
+            self.generate_layout()
+            if (CACHING):
+                save_cached_layout(self.LAYOUT_CACHE_DIR, LAYOUT_KEY, self.layout)
+
+        if (SPAWN_INFO_PRINT):
+            print(f'[prepare]: {self.layout}, from_cache={self.layout_from_cache}')
+        self.prepared = True
+
     def set_up_all(self):
         ''' bundle of function calls to set up the map terrain/npcs '''
-        self.set_update_intervals()
+        if not (self.prepared):
+            self.prepare()
+
+        # the decoded images are cached by prepare, and only converted here, on the main thread
+        self.BG_IMAGE = self.load_bg_image()
+        self.COIN_IMAGES = self.load_coin_images()
+
         self.set_up_ui_containers()
 
         # sprite creation
-        self.spawn_turrets()
-        self.spawn_terrain_blocks()
-
+        self.spawn_layout_terrain(self.layout)
         self.terrain_group.add(self.block_group, self.turret_group)
         # self.terrain_group.add(self.turret_group)
         self.spawn_collide_group.add(self.block_group, self.turret_group)
         # self.spawn_collide_group.add(self.turret_group)
+        self.spawn_layout_coins(self.layout)
 
-        self.spawn_coins()
+        self.block_grid.insert_all(self.block_group)
+        self.bake_terrain_masks()
+        self.bake_static_layer()
         self.ALL_SPRITES.extend(self.block_group.sprites() + self.coin_group.sprites() + self.turret_group.sprites())
 
+    def load_bg_image(self, convert: bool = True) -> Surface | None:
+        ''' load the background image through the asset cache, scaled to cover the map without distorting it.
+            None if not set. See PG_common.load_frames for convert
+        '''
+        if (self.cf_map['bg_image'] == None):
+            return None
+
+        PATH = str(self.cf_map['bg_image'])
+        raw_img_width, raw_img_height = load_image(PATH, 1.0, None, convert=False).get_size()
+        w_diff = int(self.rect.w - raw_img_width)
+        h_diff = int(self.rect.h - raw_img_height)
+
+        # scale image to the surface size without distorting it
+        scalar = 1.0
+        if ((w_diff > 0) or (h_diff > 0)) or ((w_diff != 0) and (h_diff != 0)):
+            # image is too small, or too large
+            w_scalar = float(self.rect.w / raw_img_width)
+            h_scalar = float(self.rect.h / raw_img_height)
+            scalar = max(w_scalar, h_scalar)
+
+        return load_image(PATH, scalar, None, convert)
+
+    def bake_terrain_masks(self):
+        ''' combine the masks of all static terrain into map-sized masks
+            * BLOCK_MASK: blocks only. used for projectiles, which would otherwise hit their own turret
+            * BLOCK_OCCUPANCY: BLOCK_MASK as a NumPy bool array, indexed [x, y]. used for point-sampling projectiles
+            * TERRAIN_MASK: blocks and non-rotating turrets. used for the player
+            * rotating turrets change their mask every frame, and are added to dynamic_terrain_group instead
+        '''
+        self.BLOCK_MASK = Mask(self.rect.size)
+        for block in self.block_group:
+            self.BLOCK_MASK.draw(block.mask, block.rect.topleft)
+        BLOCK_MASK_SURF = self.BLOCK_MASK.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 255))
+        self.BLOCK_OCCUPANCY = (surfarray.array_red(BLOCK_MASK_SURF) > 0)
+
+        self.TERRAIN_MASK = self.BLOCK_MASK.copy()
+        for turret in self.turret_group:
+            if (turret.ROTATION_RATE):
+                self.dynamic_terrain_group.add(turret)
+            else:
+                self.TERRAIN_MASK.draw(turret.mask, turret.rect.topleft)
+
+    def bake_static_layer(self):
+        ''' pre-composite the background and all blocks onto a single opaque surface
+            * the map loop starts each frame by blitting this, rather than drawing bg + blocks
+            * blocks that change image must be re-baked through bake_static_layer_area
+        '''
+        self.STATIC_LAYER = Surface(self.rect.size).convert()
+        self.draw_background(self.STATIC_LAYER, None)
+        self.block_group.draw(self.STATIC_LAYER)
+
+        self.BLOCK_DRAW_ORDER: dict[Block, int] = {block: i for i, block in enumerate(self.block_group)}
+        ''' order blocks were drawn in when baking. Blocks may overlap, so re-bakes must respect it. '''
+
+    def bake_static_layer_area(self, block: Block):
+        ''' re-bake the static layer within the rect of the given block, after it swapped image '''
+        AREA = block.rect
+        overlapping = [other for other in self.block_grid.query(AREA) if AREA.colliderect(other.rect)]
+        overlapping.sort(key=self.BLOCK_DRAW_ORDER.__getitem__)
+
+        self.STATIC_LAYER.set_clip(AREA)
+        self.draw_background(self.STATIC_LAYER, AREA)
+        for other in overlapping:
+            self.STATIC_LAYER.blit(other.image, other.rect)
+        self.STATIC_LAYER.set_clip(None)
+
+        if (self.DIRTY_RECTS):
+            self.rebaked_rects.append(AREA.copy())
+
+    def get_colliding_blocks(self, sprite: Sprite) -> list[Block]:
+        ''' get the blocks whose masks overlap the masks of the given sprite '''
+        return [block for block in self.block_grid.query(sprite.rect) if collide_mask(sprite, block)]
+
+    def get_block_kind_configs(self) -> dict[str, dict]:
+        ''' cf_block used for each Map_Layout block kind '''
+        return {
+            'map_outline': self.cf_spawning['map_outline_blocks']['cf_block'],
+            'obstacle': self.cf_spawning['obstacle_blocks']['cf_block'],
+            'obstacle_outline': self.cf_spawning['obstacle_blocks']['outline_blocks']['cf_block'],
+        }
+
+    def spawn_layout_terrain(self, layout: Map_Layout):
+        ''' create the turrets and blocks of a stored layout, rather than generating them '''
+        cf_turrets: list = self.cf_spawning['turrets']['cf_turrets']
+        for cf_index, x, y in layout.turrets:
+            TURRET = PG_Missile_Turret(cf_turrets[cf_index], self.turret_group, self.projectile_field, (x, y), float(0))
+            self.TURRETS.append(TURRET)
+
+        KIND_CONFIGS = self.get_block_kind_configs()
+        BLOCK_UPDATE_INTERVAL = int(self.cf_map['upd_intervals']['terrain'])
+        for kind, x, y, w, h, color in layout.blocks:
+            BLOCK = Block(KIND_CONFIGS[kind], self.cf_global, (w, h), (x, y),
+                          update_interval=BLOCK_UPDATE_INTERVAL,
+                          override_color=color)
+            if (kind == 'map_outline'):
+                self.map_edge_block_group.add(BLOCK)
+            else:
+                self.obstacle_group.add(BLOCK)
+            self.block_group.add(BLOCK)
+
+    def spawn_layout_coins(self, layout: Map_Layout):
+        cf_coin = self.cf_spawning['coins']['cf_coin']
+        # coins pick their animation offsets from the map RNG, as their masks change with the animation
+        self.rng.seed(f'{self.SEED}/coins')
+        for position in layout.coins:
+            self.coin_group.add(Coin(cf_coin, self.cf_global, self.COIN_IMAGES, tuple(position), self.rng))
+        self.spawn_collide_group.add(self.coin_group)
+
+    def get_rand_block_color(self, cf_block: dict) -> Color:
+        ''' pick a color from the blocks color pool through the map RNG '''
+        return Color(self.rng.choice(cf_block['color_pool']))
+
     def spawn_player(self, cf_player: dict):
+        self.cf_player = cf_player
         self.player = Player(cf_player, self.cf_map, self.cf_global)
-        offset_x = int(self.cf_spawning['player']['min_terrain_offset_x'])
-        offset_y = int(self.cf_spawning['player']['min_terrain_offset_y'])
-
-        bounds_re = self.player.get_idle_bounds()
-        spawn_pos = self.get_rand_pos_no_collide(bounds_re, offset_x, offset_y, self.spawn_collide_group)
+        spawn_pos = self.get_player_spawn_pos(self.player.get_idle_bounds(), self.spawn_collide_group)
         self.player.spawn(spawn_pos)
         self.player_group.add(self.player)
 
         self.set_up_ui_status_bars()
         self.store_player_controls(cf_player)
-
-        self.projectile_collide_group.add(self.block_group)
-        self.projectile_collide_group.add(self.player)
         self.ALL_SPRITES.append(self.player)
 
+    def get_player_spawn_pos(self, idle_bounds: Rect, collidelist: Group | list) -> tuple[int, int]:
+        ''' topleft spawn position of a player with the given idle bounds, clear of the collidelist sprites or rects '''
+        # reseed, so that the spawn position of a seed does not depend on whether the layout was cached
+        self.rng.seed(f'{self.SEED}/player')
+        offset_x = int(self.cf_spawning['player']['min_terrain_offset_x'])
+        offset_y = int(self.cf_spawning['player']['min_terrain_offset_y'])
+        return self.get_rand_pos_no_collide(idle_bounds, offset_x, offset_y, collidelist)
+
     def start(self):
+        ''' start the map loop. Creates the wall-clock event timers, which headless drivers never need '''
+        self.set_update_intervals()
         self.looping = True
+        self.full_redraw_pending = True
         self.timer.new_segment(self.name, False)
 
     def set_up_ui_containers(self):
@@ -203,50 +462,54 @@ class PG_Map:
         self.STEER_RIGHT = int(cf_player['controls']['steer_right'])
         self.THRUST      = int(cf_player['controls']['thrust'])
 
-    def spawn_terrain_blocks(self):
-        ''' specialized function for the creating the map terrain '''
+    def generate_layout(self) -> list[Rect]:
+        ''' generate a new self.layout from the map RNG
+            * only rects and colors are generated. Sprites are created from the layout by set_up_all
+            * creates no surfaces, so it may run on a worker thread. See prepare
+            * returns the rects of all generated terrain; blocks and turrets
+        '''
+        self.layout = Map_Layout(self.SEED)
+        self.layout_from_cache = False
 
-        # outline the entire game bounds with terrain_blocks:
+        turret_rects = self.generate_turrets()
+        block_rects = self.generate_terrain(turret_rects)
 
-        # spawn the map edge blocks
-        self.spawn_outline_blocks(
-            self.cf_spawning['map_outline_blocks'],
-            self.map_edge_block_group,
-            self.rect
-        )
+        # prevent coins from spawning below the status bars
+        self.generate_coins(block_rects + turret_rects + [self.get_bar_container_rect()])
+        return (block_rects + turret_rects)
 
-        # add map bounds outline blocks to the general map group
-        self.block_group.add(self.map_edge_block_group)
+    def get_bar_container_rect(self) -> Rect:
+        ''' rect of STATUS_BAR_CONTAINER, available before it is created. See set_up_ui_containers '''
+        cf_bar_container = self.cf_ui_containers['bar_container']
+        return Rect(cf_bar_container['position'], cf_bar_container['size'])
 
-        # place obstacle_blocks within the game area
-        self.spawn_obstacle_blocks(self.obstacle_group)
+    def generate_terrain(self, turret_rects: list[Rect]) -> list[Rect]:
+        ''' specialized function for generating the map terrain. Adds the blocks to self.layout, in draw order.
+            * returns the rects of all generated blocks
+        '''
+        cf_obstacle_outline = self.cf_spawning['obstacle_blocks']['outline_blocks']
 
-        # remove from temp placement groups after blocks are placed
-        for turret in self.TURRETS:
-            turret.kill()
+        # outline the entire game bounds with terrain_blocks:
+        edge_rects = self.generate_outline('map_outline', self.cf_spawning['map_outline_blocks'], self.rect)
 
-        # re-add turrets to their appropriate group
-        self.turret_group.add(self.TURRETS)
+        # place obstacle_blocks within the game area, avoiding the edges and turrets
+        obstacles = self.generate_obstacles(edge_rects + turret_rects)
+        block_rects = edge_rects + [rect for rect, _ in obstacles]
 
         # outline the obstacles with smaller rects to create more jagged terrain
-        for block in self.obstacle_group:
-            # for each block in obstacle_group, outline the block rect
-            self.spawn_outline_blocks(
-                self.cf_spawning['obstacle_blocks']['outline_blocks'],
-                self.obstacle_group,
-                block.rect, 
-                specific_color=block.color
-            )
+        for rect, color in obstacles:
+            # for each obstacle, outline the block rect using its color
+            block_rects.extend(self.generate_outline('obstacle_outline', cf_obstacle_outline, rect, specific_color=color))
 
-        # add obstacle blocks and their outline blocks to the general map group
-        self.block_group.add(self.obstacle_group)
+        return block_rects
 
-    def spawn_outline_blocks(self, cf_spawn_outline_block: dict, group: Group, bounds: Rect,
-                            specific_color: None | tuple | Color = None):
+    def generate_outline(self, kind: str, cf_spawn_outline_block: dict, bounds: Rect,
+                         specific_color: None | tuple | Color = None) -> list[Rect]:
 
-        ''' encapsulate the given rects' bounds with blocks
-            * if alt_pallette is None, the block will use the cf_block color list at random
-            * otherwise, choose the given color pallette for all blocks
+        ''' encapsulate the given rects' bounds with blocks. Adds the blocks to self.layout as the given kind
+            * if specific_color is None, the block will use the cf_block color list at random
+            * otherwise, choose the given color for all blocks
+            * returns the rects of the placed blocks
 
             * facing decides the alignment of the blocks relative to the bounds axis':
             * -1 => inwards
@@ -262,7 +525,7 @@ class PG_Map:
         MIN_Y = bounds.top
         MAX_Y = bounds.bottom
 
-        # block min/max 
+        # block min/max
         MIN_WIDTH = int(cf_spawn_outline_block['min_width'])
         MAX_WIDTH = int(cf_spawn_outline_block['max_width'])
         MIN_HEIGHT = int(cf_spawn_outline_block['min_height'])
@@ -271,8 +534,11 @@ class PG_Map:
         PADDING = int(cf_spawn_outline_block['padding'])
         FACING = int(cf_spawn_outline_block['facing'])
 
-        BLOCK_UPDATE_INTERVAL = int(self.cf_map['upd_intervals']['terrain'])
         CF_BLOCK = cf_spawn_outline_block['cf_block']
+        # if no color is given, pick one for each block
+        PICK_COLOR = (specific_color == None)
+
+        placed_rects: list[Rect] = []
 
         # below are four loops that together will outline the entire bounds
         # the loop places blocks in a clockwise path, following each axis
@@ -281,15 +547,15 @@ class PG_Map:
         # are not, and are also slightly condensed. The logic is allround similar.
         # (they are way too specific to create a working generalized loop function, however)
 
-        # last_block is for storing the last block placed when swapping axis'
-        last_block: Block | None = None
+        # last_rect is for storing the last block placed when swapping axis'
+        last_rect: Rect | None = None
 
         # 1) topleft --> topright
         curr_pos_x = MIN_X
         while curr_pos_x < MAX_X:
             # set random height/width from within the ranges
-            width = randint(MIN_WIDTH, MAX_WIDTH)
-            height = randint(MIN_HEIGHT, MAX_HEIGHT)
+            width = self.rng.randint(MIN_WIDTH, MAX_WIDTH)
+            height = self.rng.randint(MIN_HEIGHT, MAX_HEIGHT)
 
             # create a tuple to contain the position of the block
             position = (curr_pos_x, int(0))
@@ -299,106 +565,107 @@ class PG_Map:
                 # if the block will be last, adjust size before creating
                 width = (MAX_X - curr_pos_x)
 
-            # assemble the block
-            BLOCK = Block(CF_BLOCK, self.cf_global, (width, height), position, 
-                          update_interval=BLOCK_UPDATE_INTERVAL,
-                          override_color=specific_color)
+            # assemble the block rect
+            RECT = Rect(position, (width, height))
+            COLOR = (self.get_rand_block_color(CF_BLOCK) if PICK_COLOR else Color(specific_color))
 
             # adjust position according to facing
             match (FACING):
                 case (-1):
-                    BLOCK.rect.top = MIN_Y
+                    RECT.top = MIN_Y
                 case (0):
-                    BLOCK.rect.centery = MIN_Y
+                    RECT.centery = MIN_Y
                 case (1):
-                    BLOCK.rect.bottom = MIN_Y
+                    RECT.bottom = MIN_Y
 
-            # add to the given group and update last block
-            group.add(BLOCK)
-            last_block = BLOCK
+            # add to the layout and update last block
+            self.layout.add_block(kind, RECT, COLOR)
+            placed_rects.append(RECT)
+            last_rect = RECT
 
             # increment position for placing the next block
-            curr_pos_x = (BLOCK.rect.right + PADDING)
+            curr_pos_x = (RECT.right + PADDING)
 
         # 2) topright --> bottomright
-        curr_pos_y = last_block.rect.bottom
+        curr_pos_y = last_rect.bottom
         while curr_pos_y < MAX_Y:
-            width = randint(MIN_WIDTH, MAX_WIDTH)
-            height = randint(MIN_HEIGHT, MAX_HEIGHT)
+            width = self.rng.randint(MIN_WIDTH, MAX_WIDTH)
+            height = self.rng.randint(MIN_HEIGHT, MAX_HEIGHT)
             position = (int(0), curr_pos_y)
             if (curr_pos_y + height) > MAX_Y:
                 height = MAX_Y - curr_pos_y
 
-            BLOCK = Block(CF_BLOCK, self.cf_global, (width, height), position, 
-                          update_interval=BLOCK_UPDATE_INTERVAL,
-                          override_color=specific_color)
+            RECT = Rect(position, (width, height))
+            COLOR = (self.get_rand_block_color(CF_BLOCK) if PICK_COLOR else Color(specific_color))
 
             match (FACING):
                 case (-1):
-                    BLOCK.rect.right = MAX_X
+                    RECT.right = MAX_X
                 case (0):
-                    BLOCK.rect.centerx = MAX_X
+                    RECT.centerx = MAX_X
                 case (1):
-                    BLOCK.rect.left = MAX_X
-            last_block = BLOCK
-            group.add(BLOCK)
-            curr_pos_y = (BLOCK.rect.bottom + PADDING)
+                    RECT.left = MAX_X
+            self.layout.add_block(kind, RECT, COLOR)
+            placed_rects.append(RECT)
+            last_rect = RECT
+            curr_pos_y = (RECT.bottom + PADDING)
 
         # 3) bottomright --> bottomleft
-        curr_pos_x = last_block.rect.left
+        curr_pos_x = last_rect.left
         while curr_pos_x > MIN_X:
-            width = randint(MIN_WIDTH, MAX_WIDTH)
-            height = randint(MIN_HEIGHT, MAX_HEIGHT)
-            position = (int(0), int(0))
+            width = self.rng.randint(MIN_WIDTH, MAX_WIDTH)
+            height = self.rng.randint(MIN_HEIGHT, MAX_HEIGHT)
             if (curr_pos_x - width) < MIN_X:
                 width = abs(MIN_X - curr_pos_x)
 
-            BLOCK = Block(CF_BLOCK, self.cf_global, (width, height), position, 
-                          update_interval=BLOCK_UPDATE_INTERVAL,
-                          override_color=specific_color)
+            RECT = Rect((0, 0), (width, height))
+            COLOR = (self.get_rand_block_color(CF_BLOCK) if PICK_COLOR else Color(specific_color))
 
-            BLOCK.rect.right = curr_pos_x
+            RECT.right = curr_pos_x
 
             match (FACING):
                 case (-1):
-                    BLOCK.rect.bottom = MAX_Y
+                    RECT.bottom = MAX_Y
                 case (0):
-                    BLOCK.rect.centery = MAX_Y
+                    RECT.centery = MAX_Y
                 case (1):
-                    BLOCK.rect.top = MAX_Y
-            last_block = BLOCK
-            group.add(BLOCK)
-            curr_pos_x = (BLOCK.rect.left - PADDING)
+                    RECT.top = MAX_Y
+            self.layout.add_block(kind, RECT, COLOR)
+            placed_rects.append(RECT)
+            last_rect = RECT
+            curr_pos_x = (RECT.left - PADDING)
 
         # 4) bottomleft --> topright
-        curr_pos_y = last_block.rect.top
+        curr_pos_y = last_rect.top
         while curr_pos_y > MIN_Y:
-            width = randint(MIN_WIDTH, MAX_WIDTH)
-            height = randint(MIN_HEIGHT, MAX_HEIGHT)
-            position = (int(0), int(0))
+            width = self.rng.randint(MIN_WIDTH, MAX_WIDTH)
+            height = self.rng.randint(MIN_HEIGHT, MAX_HEIGHT)
             if (curr_pos_y - height) < MIN_Y:
                 height = abs(MIN_Y - curr_pos_y)
 
-            BLOCK = Block(CF_BLOCK, self.cf_global, (width, height), position, 
-                          update_interval=BLOCK_UPDATE_INTERVAL,
-                          override_color=specific_color)
+            RECT = Rect((0, 0), (width, height))
+            COLOR = (self.get_rand_block_color(CF_BLOCK) if PICK_COLOR else Color(specific_color))
 
-            BLOCK.rect.bottom = curr_pos_y
+            RECT.bottom = curr_pos_y
 
             match (FACING):
                 case (-1):
-                    BLOCK.rect.left = MIN_X
+                    RECT.left = MIN_X
                 case (0):
-                    BLOCK.rect.centerx = MIN_X
+                    RECT.centerx = MIN_X
                 case (1):
-                    BLOCK.rect.right = MIN_X
-            last_block = BLOCK
-            group.add(BLOCK)
-            curr_pos_y = (BLOCK.rect.top - PADDING)
-
-    def spawn_obstacle_blocks(self, group: Group):
-        ''' specialized obstacle spawning algorithm
-            * checks for collision with the passed group and self.block_group before placing
+                    RECT.right = MIN_X
+            self.layout.add_block(kind, RECT, COLOR)
+            placed_rects.append(RECT)
+            last_rect = RECT
+            curr_pos_y = (RECT.top - PADDING)
+
+        return placed_rects
+
+    def generate_obstacles(self, occupied_rects: list[Rect]) -> list[tuple[Rect, Color]]:
+        ''' specialized obstacle placement algorithm. Adds the obstacles to self.layout
+            * obstacles keep their padding to the occupied rects, and to each other
+            * returns (rect, color) of each placed obstacle
         '''
 
         CF_BLOCK = self.cf_spawning['obstacle_blocks']['cf_block']
@@ -413,44 +680,28 @@ class PG_Map:
         MIN_HEIGHT = int(self.cf_spawning['obstacle_blocks']['min_height'])
         MAX_HEIGHT = int(self.cf_spawning['obstacle_blocks']['max_height'])
 
-        BLOCK_UPDATE_INTERVAL = int(self.cf_map['upd_intervals']['terrain'])
+        # mark all terrain/turrets placed so far. each obstacle is marked once placed
+        placement_grid = PG_Placement_Grid(self.rect, self.PLACEMENT_CELL_SIZE)
+        placement_grid.mark_all(occupied_rects)
 
         # initiate the loop
-        placed_blocks = 0
+        obstacles: list[tuple[Rect, Color]] = []
         failed_attempts = 0
-        while placed_blocks < N_OBSTACLES:
+        while len(obstacles) < N_OBSTACLES:
             # set random height/width from within the ranges
-            width = randint(MIN_HEIGHT, MAX_HEIGHT)
-            height = randint(MIN_WIDTH, MAX_WIDTH)
-
-            # get a random position within the map
-            position = self.get_rand_pos(width, height)
-
-            # assemble the block
-            BLOCK = Block(CF_BLOCK, self.cf_global, (width, height), position,
-                          update_interval=BLOCK_UPDATE_INTERVAL)
-
-            # the block is now created, but there's 2 potential problems:
-            # 1) the block might overlap other blocks
-            # 2) we don't want to lock the player in by bad rng
-
-            # solution: create a copy of the rect and inflate it using the player size + set padding
-            inflated_rect = BLOCK.rect.copy().inflate(W_PADDING, H_PADDING)
-
-            # temporarily swap the rect with the one of the block, while saving the original
-            # this is to allow for easy and fast spritecollide checking
-            original_rect = BLOCK.rect.copy()
-            BLOCK.rect = inflated_rect
-
-            # if the block + player rect doesn't collide with any terrain, add it to the group
-            if not (spritecollideany(BLOCK, self.block_group) or (spritecollideany(BLOCK, group))):
-                # block doesn't collide with anything, swap rect back and add block
-                BLOCK.rect = original_rect
-                group.add(BLOCK)
-                placed_blocks += 1
-            else:
-                # otherwise, delete the sprite and try again
-                del BLOCK
+            width = self.rng.randint(MIN_HEIGHT, MAX_HEIGHT)
+            height = self.rng.randint(MIN_WIDTH, MAX_WIDTH)
+
+            # to not lock the player in by bad rng, the block + padding must be free.
+            # +2 covers the rounding of Rect.inflate
+            FOOTPRINT = ((width + W_PADDING + 2), (height + H_PADDING + 2))
+            # same topleft range as get_rand_pos(width, height), as center positions
+            MIN_POS = ((self.rect.left + width + (width // 2)), (self.rect.top + height + (height // 2)))
+            MAX_POS = ((self.rect.right - width + (width // 2)), (self.rect.bottom - height + (height // 2)))
+
+            center = placement_grid.find_center(self.rng, FOOTPRINT, MIN_POS, MAX_POS)
+            if (center == None):
+                # no free space left for a block of this size; try another size
                 failed_attempts += 1
                 # check if attempt limit is reached
                 if (failed_attempts > self.LOOP_LIMIT):
@@ -458,17 +709,20 @@ class PG_Map:
                         Fail limit of {self.LOOP_LIMIT} attempts reached.\
                         Too many or too large obstacles.\n\
                         block padding set too high can also be the cause.\
-                        Current obstacle count: {placed_blocks} / {N_OBSTACLES}'
+                        Current obstacle count: {len(obstacles)} / {N_OBSTACLES}'
                     raise ConfigError(msg, CF_BLOCK)
+                continue
 
-            # make sure the copied temp rect is not saved in memory
-            del inflated_rect
-        
-        if (failed_attempts >= (0.5 * self.LOOP_LIMIT)) or (SPAWN_INFO_PRINT):
-            if (failed_attempts > placed_blocks):
-                msg = '[failed_attempts / allowed] while placing '
-                msg += f'obstacle_blocks: [{failed_attempts} / {self.LOOP_LIMIT}]'
-                print(msg)
+            RECT = Rect(((center[0] - (width // 2)), (center[1] - (height // 2))), (width, height))
+            COLOR = self.get_rand_block_color(CF_BLOCK)
+            self.layout.add_block('obstacle', RECT, COLOR)
+            placement_grid.mark(RECT)
+            obstacles.append((RECT, COLOR))
+
+        if (SPAWN_INFO_PRINT) and (failed_attempts > 0):
+            print(f'[generate_obstacles]: {failed_attempts} block sizes did not fit')
+
+        return obstacles
 
     def set_up_ui_status_bars(self):
         for bar in self.STATUS_BARS:
@@ -508,16 +762,17 @@ class PG_Map:
         # auto add all const bars
         self.STATUS_BAR_CONTAINER.add_children_by_ref_id("CONST", self.STATUS_BARS)
 
-    def spawn_coins(self):
-        ''' create and position the coin sprite various places around the screen '''
+    def load_coin_images(self, convert: bool = True) -> tuple[tuple[Surface, ...], int]:
+        ''' load the coin spritesheet as (images, max index) through the asset cache. shared between all coins '''
         cf_coin = self.cf_spawning['coins']['cf_coin']
+        return load_sprites_tuple(cf_coin['spritesheet_path'], int(cf_coin['image_variants']),
+                                  float(cf_coin['image_scalar']), None, convert)
 
-        n_spritesheet_images = int(cf_coin['image_variants'])
-        scalar = float(cf_coin['image_scalar'])
-
-        # all the coins share a single tuple containing their images
-        COIN_SPRITESHEET_IMG = pg.image.load(cf_coin['spritesheet_path'])
-        IMAGES = partition_spritesheet(COIN_SPRITESHEET_IMG, n_spritesheet_images, scalar, None)
+    def generate_coins(self, occupied_rects: list[Rect]):
+        ''' position the coins various places around the map, keeping clear of the occupied rects.
+            Adds the coins to self.layout
+        '''
+        IMAGES = self.COIN_IMAGES[0]
 
         # place the coins according to settings
         min_terrain_offset = int(self.cf_spawning['coins']['min_terrain_offset'])
@@ -525,53 +780,34 @@ class PG_Map:
         
         COIN_RECT = IMAGES[0].get_rect()
 
-        # create two rects for placement collision purposes
-        offset_rect = COIN_RECT.copy().inflate(min_terrain_offset, min_terrain_offset)
-        spread_rect = COIN_RECT.copy().inflate(min_spread, min_spread)
+        # sizes that must be free around a coin center, to terrain and to other coins
+        OFFSET_SIZE = COIN_RECT.inflate(min_terrain_offset, min_terrain_offset).size
+        SPREAD_SIZE = COIN_RECT.inflate(min_spread, min_spread).size
 
-        # coin positioning procedure
-        placed_coins = 0
-        failed_attempts = 0
-        while (placed_coins != self.N_COINS):
-            rand_pos = self.get_rand_pos(min_terrain_offset, min_terrain_offset)
-            offset_rect.center = rand_pos
-            spread_rect.center = rand_pos
+        # same range as get_rand_pos(min_terrain_offset, min_terrain_offset)
+        MIN_POS = ((self.rect.left + min_terrain_offset), (self.rect.top + min_terrain_offset))
+        MAX_POS = ((self.rect.right - min_terrain_offset), (self.rect.bottom - min_terrain_offset))
 
-            terrain_collision = False
-            coin_collision = False
+        terrain_grid = PG_Placement_Grid(self.rect, self.PLACEMENT_CELL_SIZE)
+        terrain_grid.mark_all(occupied_rects)
+        # terrain does not change while placing coins
+        VALID_TERRAIN = terrain_grid.get_free_centers(OFFSET_SIZE) & terrain_grid.get_range_cells(MIN_POS, MAX_POS)
 
-            # check terrain collision
-            for obj in self.spawn_collide_group:
-                if (offset_rect.colliderect(obj.rect)):
-                    terrain_collision = True
-                    break
+        coin_grid = PG_Placement_Grid(self.rect, self.PLACEMENT_CELL_SIZE)
 
-            # check coin collision if terrain collision is ok
-            if not (terrain_collision):
-                for coin in self.coin_group:
-                    if (spread_rect.colliderect(coin.rect)):
-                        coin_collision = True
-                        break
-
-                if not (coin_collision):
-                    TUP_IMAGES = (IMAGES, int(n_spritesheet_images - 1))
-                    self.coin_group.add(Coin(cf_coin, self.cf_global, TUP_IMAGES, rand_pos))
-                    placed_coins += 1
+        # coin positioning procedure
+        placed_coins = 0
+        while (placed_coins != self.N_COINS):
+            valid_cells = VALID_TERRAIN & coin_grid.get_free_centers(SPREAD_SIZE)
+            rand_pos = coin_grid.pick_center(self.rng, valid_cells, MIN_POS, MAX_POS)
+            if (rand_pos == None):
+                msg = 'cannot place coins using the corring config'
+                raise LoopError(msg, placed_coins, self.N_COINS, self.LOOP_LIMIT)
 
-            if coin_collision or terrain_collision:
-                failed_attempts += 1
-                # print(f'failed_attempts = {failed_attempts}')
-                if (failed_attempts >= self.LOOP_LIMIT):
-                    msg = 'cannot place coins using the corring config'
-                    raise LoopError(msg, placed_coins, self.N_COINS, self.LOOP_LIMIT)
-        
-        if (failed_attempts >= (0.5 * self.LOOP_LIMIT)) or (SPAWN_INFO_PRINT):
-            if (failed_attempts > placed_coins):
-                msg = '[failed_attempts / allowed] while placing '
-                msg += f'coins: [{failed_attempts} / {self.LOOP_LIMIT}]'
-                print(msg)
-        
-        self.spawn_collide_group.add(self.coin_group)
+            self.layout.add_coin(rand_pos)
+            COIN_RECT.center = rand_pos
+            coin_grid.mark(COIN_RECT)
+            placed_coins += 1
 
     #### RECURRING METHODS ####
 
@@ -591,34 +827,45 @@ class PG_Map:
         self.timer.unpause()
         self.paused = False
         self.looping = True
+        self.full_redraw_pending = True
 
     def reset(self):
+        ''' restart the map with the same layout. Logged as an input, see apply_reset '''
+        self.INPUT_FUNC(Map_Input.RESET)
+
+    def simulate_death_frame(self):
+        ''' animate the coins and player for a frame of the post-map death animation. Logged as an input '''
+        self.INPUT_FUNC(Map_Input.DEATH_FRAME)
+
+    def apply_reset(self):
         self.player_death_source = ''
         self.map_success = None
         self.death_frames_left = int(0)
 
-        for block in self.block_group:
+        for block in self.block_update_group:
             block.alt_surf_timeleft = 0
+            block.image = block.MAIN_IMAGE
+            self.bake_static_layer_area(block)
 
-        for projectile in self.global_projectile_group.sprites():
-            projectile.kill()
-            del projectile
+        self.projectile_field.clear()
 
         self.block_update_group.empty()
         self.coin_group.add(self.collected_coins)
         self.collected_coins = []
         self.timer.new_segment(self.name, False)
         self.looping = True
+        self.full_redraw_pending = True
         self.player.reset_all_attributes()
 
         # make sure all masks are cleared
-        self.surface.fill(self.fill_color)
-        self.turret_group.update(self.surface)
+        self.clear_surf_with_static_layer()
+        self.turret_group.update()
+        self.projectile_field.draw(self.surface)
+        self.projectile_field.update()
         self.turret_group.draw(self.surface)
         self.coin_group.update()
         self.player_group.update()
         self.player_group.draw(self.surface)
-        self.block_group.draw(self.surface)
         self.coin_group.draw(self.surface)
         display.update()
 
@@ -635,41 +882,52 @@ class PG_Map:
             if (max_val):
                 BAR.max_val = float(max_val)
 
+    def player_collides_with_terrain(self) -> bool:
+        ''' one overlap check against the baked terrain mask, then sprite checks for dynamic terrain '''
+        self.n_mask_tests += 1
+        if (self.TERRAIN_MASK.overlap(self.player.mask, self.player.rect.topleft)):
+            return True
+        # rect check prior to mask check, see BENCHMARKS at the end of this file
+        if spritecollideany(self.player, self.dynamic_terrain_group):
+            # at most; the check stops at the first overlap
+            self.n_mask_tests += len(self.dynamic_terrain_group)
+            return bool(spritecollideany(self.player, self.dynamic_terrain_group, collided=collide_mask))
+        return False
+
     def check_player_terrain_collision(self):
         ''' since collision is based on image masks, call this after draw, but before update
             * if player collides with a block, init the recoil sequence for the player 
         '''
         # ignore collision if player has cooldown frames
         if self.player.collision_cooldown_frames_left:
-            # blit the visual overlap
-            self.blit_block_player_overlap()
+            # the visual overlap is drawn by draw_frame, once per rendered frame
             # collision cooldown frames co-occur with other frames, so check is done at map-level
             self.player.collision_cooldown_frames_left -= 1
             # check if its time to swap the player image back
             if (self.player.collision_cooldown_frames_left == 0):
                 if not self.player.key_thrusting:
                     self.player.set_idle_image_type()
-        elif spritecollideany(self.player, self.terrain_group):
-            # if player rect collides with any block rects, check detailed mask collision
-            collidelist = spritecollide(self.player, self.terrain_group, False, collided=collide_mask)
-            if collidelist:
-                # if masks collide, init player recoil phase and get the cd frame count for ghost bar
-                cd_frames = self.player.init_phase_collision_recoil()
-                if (cd_frames):
-                    self.activate_temp_bar('GHOST', 0, cd_frames)
-                else:
-                    self.player_death_source = 'Terrain'
-                    self.return_to_app(False)
-                # highlight blocks that player collided with
-                for sprite in collidelist:
-                    if (type(sprite) == Block):
-                        sprite.init_timed_highlight()
-                        self.block_update_group.add(sprite)
+        elif self.player_collides_with_terrain():
+            # masks collide; init player recoil phase and get the cd frame count for ghost bar
+            cd_frames = self.player.init_phase_collision_recoil()
+            if (cd_frames):
+                self.activate_temp_bar('GHOST', 0, cd_frames)
+            else:
+                self.player_death_source = 'Terrain'
+                self.return_to_app(False)
+            # highlight blocks that player collided with
+            for block in self.get_colliding_blocks(self.player):
+                if (block.ALT_IMAGE):
+                    block.init_timed_highlight()
+                    self.block_update_group.add(block)
+                    self.bake_static_layer_area(block)
 
     def check_player_coin_collision(self):
         # check rect collide
         if spritecollideany(self.player, self.coin_group):
             # if rect collide, check mask collide, get & kill collected coins, if any
+            # spritecollide tests the mask of every coin, not only those colliding by rect
+            self.n_mask_tests += len(self.coin_group)
             collidelist = spritecollide(self.player, self.coin_group, True, collided=collide_mask)
             if (collidelist):
                 self.collected_coins.extend(collidelist)
@@ -683,43 +941,40 @@ class PG_Map:
             # check if the event type matches any relevant types
             match (event.type):
                 case self.EVENT_PLAYER_IMG_CYCLE:
-                    if (self.player.special_image_active):
-                        self.player.cycle_active_image()
+                    self.INPUT_FUNC(Map_Input.PLAYER_IMG_CYCLE)
                 case self.EVENT_UPDATE_TERRAIN:
-                    # update blocks, swapping back if highlighted and timer is up
-                    self.block_update_group.update()
+                    self.INPUT_FUNC(Map_Input.UPDATE_TERRAIN)
                 case pg.KEYDOWN:
                     match (event.key):
                         case self.STEER_UP:
-                            self.player.key_direction.y -= 1.0
+                            self.INPUT_FUNC(Map_Input.STEER_UP_PRESS)
                         case self.STEER_DOWN:
-                            self.player.key_direction.y += 1.0
+                            self.INPUT_FUNC(Map_Input.STEER_DOWN_PRESS)
                         case self.STEER_LEFT:
-                            self.player.key_direction.x -= 1.0
+                            self.INPUT_FUNC(Map_Input.STEER_LEFT_PRESS)
                         case self.STEER_RIGHT:
-                            self.player.key_direction.x += 1.0
+                            self.INPUT_FUNC(Map_Input.STEER_RIGHT_PRESS)
                         case self.THRUST:
-                            if (self.player.health > 0):
-                                self.player.init_phase_thrust_begin()
+                            self.INPUT_FUNC(Map_Input.THRUST_PRESS)
                         case pg.K_ESCAPE:
                             print("pause called")
                             self.pause()
+                        case self.PROFILER_KEY:
+                            self.set_profiling(not (self.profiling))
                         case _:
                             pass
                 case pg.KEYUP:
-                    # essentially reverts actions upon key up
                     match (event.key):
                         case self.STEER_UP:
-                            self.player.key_direction.y += 1.0
+                            self.INPUT_FUNC(Map_Input.STEER_UP_RELEASE)
                         case self.STEER_DOWN:
-                            self.player.key_direction.y -= 1.0
+                            self.INPUT_FUNC(Map_Input.STEER_DOWN_RELEASE)
                         case self.STEER_LEFT:
-                            self.player.key_direction.x += 1.0
+                            self.INPUT_FUNC(Map_Input.STEER_LEFT_RELEASE)
                         case self.STEER_RIGHT:
-                            self.player.key_direction.x -= 1.0
+                            self.INPUT_FUNC(Map_Input.STEER_RIGHT_RELEASE)
                         case self.THRUST:
-                            if (self.player.health > 0):
-                                self.player.init_phase_thrust_end()
+                            self.INPUT_FUNC(Map_Input.THRUST_RELEASE)
                         case _:
                             pass
                 case pg.QUIT:
@@ -730,7 +985,81 @@ class PG_Map:
                 case _:
                     pass
 
-    def spawn_turrets(self):
+    def apply_input(self, code: int):
+        ''' apply a single Map_Input. Every change to the map state outside of simulate_tick goes through here,
+            so that a session replays from its seed and inputs alone. See modules/input_log.py
+        '''
+        match (code):
+            case Map_Input.PLAYER_IMG_CYCLE:
+                if (self.player.special_image_active):
+                    self.player.cycle_active_image()
+            case Map_Input.UPDATE_TERRAIN:
+                # update blocks, swapping back if highlighted and timer is up
+                self.update_highlighted_blocks()
+            case Map_Input.STEER_UP_PRESS:
+                self.player.key_direction.y -= 1.0
+            case Map_Input.STEER_DOWN_PRESS:
+                self.player.key_direction.y += 1.0
+            case Map_Input.STEER_LEFT_PRESS:
+                self.player.key_direction.x -= 1.0
+            case Map_Input.STEER_RIGHT_PRESS:
+                self.player.key_direction.x += 1.0
+            case Map_Input.THRUST_PRESS:
+                if (self.player.health > 0):
+                    self.player.init_phase_thrust_begin()
+            # essentially reverts actions upon key up
+            case Map_Input.STEER_UP_RELEASE:
+                self.player.key_direction.y += 1.0
+            case Map_Input.STEER_DOWN_RELEASE:
+                self.player.key_direction.y -= 1.0
+            case Map_Input.STEER_LEFT_RELEASE:
+                self.player.key_direction.x += 1.0
+            case Map_Input.STEER_RIGHT_RELEASE:
+                self.player.key_direction.x -= 1.0
+            case Map_Input.THRUST_RELEASE:
+                if (self.player.health > 0):
+                    self.player.init_phase_thrust_end()
+            case Map_Input.DEATH_FRAME:
+                self.coin_group.update()
+                self.player_group.update()
+            case Map_Input.RESET:
+                self.apply_reset()
+            case _:
+                pass
+
+    def record_input(self, code: int):
+        ''' apply the input, logging it at the current tick '''
+        self.input_log.write(self.n_ticks, code)
+        self.apply_input(code)
+
+    def start_input_log(self, log_dir: str) -> str:
+        ''' log every input from here on to a new file in log_dir, until stop_input_log. Returns the path.
+            * the player must be spawned. Only fixed timestep sessions replay exactly, as the frame locked loop
+                handles input between the updates of a tick
+        '''
+        makedirs(log_dir, exist_ok=True)
+        STAMP = datetime.now().strftime('%Y%m%d_%H%M%S')
+        FILE_NAME = f'{STAMP}_{self.name.replace(" ", "_")}_{self.SEED}{INPUT_LOG_EXTENSION}'
+        PATH = os_path_join(log_dir, FILE_NAME)
+        self.input_log = Input_Log_Writer(
+            PATH, self.SEED, self.rect.size, self.cf_global['fps_limit'],
+            get_config_digest(self.cf_global, self.cf_map, self.cf_player),
+            self.cf_map['name'], self.cf_player['name']
+        )
+        self.INPUT_FUNC = self.record_input
+        return PATH
+
+    def stop_input_log(self):
+        ''' end and close the input log, if any '''
+        if (self.input_log != None):
+            self.input_log.close(self.n_ticks)
+            self.input_log = None
+        self.INPUT_FUNC = self.apply_input
+
+    def generate_turrets(self) -> list[Rect]:
+        ''' place the turrets, keeping their spacing. Adds the turrets to self.layout
+            * returns the rects of the placed turrets
+        '''
         cf_turrets: list = self.cf_spawning['turrets']['cf_turrets']
         max_cf_index = (len(cf_turrets) - 1)
 
@@ -742,10 +1071,14 @@ class PG_Map:
 
         placement_re = Rect((0, 0), (2*min_spacing_x, 2*min_spacing_y))
 
+        turret_rects: list[Rect] = []
+        turret_sizes: dict[int, tuple[int, int]] = {}
+        ''' image size of each used cf_turret. see PG_Missile_Turret '''
+
         for i in range(n_turrets):
             selected_cf_index = i
             if (selected_cf_index > max_cf_index):
-                selected_cf_index = randint(0, max_cf_index)
+                selected_cf_index = self.rng.randint(0, max_cf_index)
             cf_turret = cf_turrets[selected_cf_index]
 
             failed_attempts = 0
@@ -756,10 +1089,10 @@ class PG_Map:
                 placement_re.center = rand_pos
 
                 placement_ok = True
-                for other_turret in self.turret_group.sprites():
-                    if (other_turret.rect.colliderect(placement_re)):
+                for other_rect in turret_rects:
+                    if (other_rect.colliderect(placement_re)):
                         placement_ok = False
-                
+
                 if (placement_ok):
                     placement_pos = rand_pos
                     break
@@ -767,87 +1100,293 @@ class PG_Map:
                     failed_attempts += 1
                     if (failed_attempts == self.LOOP_LIMIT):
                         msg = 'failure placing missile turrets'
-                        raise LoopError(msg, len(self.turret_group.sprites()), n_turrets, self.LOOP_LIMIT)
-            
+                        raise LoopError(msg, len(turret_rects), n_turrets, self.LOOP_LIMIT)
+
             if (failed_attempts >= (0.5 * self.LOOP_LIMIT)) or (SPAWN_INFO_PRINT):
                 if (failed_attempts > n_turrets):
                     msg = '[failed_attempts / allowed] while placing '
                     msg += f'turret #{i}: [{failed_attempts} / {self.LOOP_LIMIT}]'
                     print(msg)
 
-            TURRET = PG_Missile_Turret(
-                cf_turret,
-                self.turret_group,
-                self.global_projectile_group,
-                placement_pos,
-                float(0)
-            )
-            self.TURRETS.append(TURRET)
+            if (selected_cf_index not in turret_sizes):
+                IMG = load_image(cf_turret['spritesheet']['path'], cf_turret['image_scalar'], -90.0, convert=False)
+                turret_sizes[selected_cf_index] = IMG.get_size()
+
+            TURRET_RECT = Rect((0, 0), turret_sizes[selected_cf_index])
+            TURRET_RECT.center = placement_pos
+            turret_rects.append(TURRET_RECT)
+            self.layout.add_turret(selected_cf_index, placement_pos)
 
-            # temporary add to obstacle group, to avoid blocks being placed on the turrets
-            self.obstacle_group.add(TURRET)
+        return turret_rects
 
     def check_projectile_collision(self):
-        collide_dict = groupcollide(
-            self.projectile_collide_group,
-            self.global_projectile_group,
-            False,
-            True,
-            collided=collide_mask
-        )
-        # check if projectile hit player, if it hit anything
-        if self.player in collide_dict.keys():
-            for projectile in collide_dict[self.player]:
-                self.player.health -= projectile.damage
-                if (self.player.health <= 0):
-                    self.return_to_app(False)
-                    self.player_death_source = 'Projectile'
+        ''' check every projectile against the player and the baked terrain
+            * terrain is point-sampled for all projectiles at once through BLOCK_OCCUPANCY
+            * the player moves, and is therefore checked by mask, after a rect check
+            * projectiles that hit anything are killed
+        '''
+        FIELD = self.projectile_field
+        player_hits = FIELD.collide_rect_mask(self.player.mask, self.player.rect)
+        if (player_hits):
+            self.player.health -= FIELD.get_damage(player_hits)
+            FIELD.kill(player_hits)
+            if (self.player.health <= 0):
+                self.return_to_app(False)
+                self.player_death_source = 'Projectile'
+
+        FIELD.kill(FIELD.collide_occupancy(self.BLOCK_OCCUPANCY))
+
+    def update_highlighted_blocks(self):
+        ''' update highlighted blocks. Blocks that swapped back are re-baked and stop being updated '''
+        for block in self.block_update_group.sprites():
+            block.update()
+            if (block.image is block.MAIN_IMAGE):
+                self.bake_static_layer_area(block)
+                self.block_update_group.remove(block)
+
+    def draw_background(self, surface: Surface, area: Rect | None):
+        ''' draw the background image, or fill color if there is none. Area of None => entire surface '''
+        if (self.BG_IMAGE):
+            if (area):
+                surface.blit(self.BG_IMAGE, area, area)
+            else:
+                surface.blit(self.BG_IMAGE, (0, 0))
+        else:
+            surface.fill(self.fill_color, area)
 
-        for projectile in collide_dict:
-            del projectile
+    def clear_surf_with_static_layer(self):
+        self.surface.blit(self.STATIC_LAYER, (0, 0))
 
-    def clear_surf_with_image(self):
-        self.surface.blit(self.BG_IMAGE, (0, 0))
+    def clear_dirty_rects(self):
+        ''' dirty rects alternative to clear_surf_with_static_layer.
+            restores the areas drawn at last frame, and areas re-baked since, from STATIC_LAYER.
+        '''
+        if (self.full_redraw_pending):
+            self.clear_surf_with_static_layer()
+            self.restored_rects = []
+        else:
+            self.restored_rects = self.prev_drawn_rects + self.rebaked_rects
+            self.surface.blits([(self.STATIC_LAYER, RE, RE) for RE in self.restored_rects], False)
+        self.rebaked_rects = []
+
+    def get_drawn_rects(self) -> list[Rect]:
+        ''' get the areas that sprites were drawn at this frame.
+            * Group.draw stores the drawn area of each sprite in the groups spritedict.
+                sprites killed after being drawn, i.e. by collision, move their area to lostsprites.
+            * the debug visuals of DEBUG_PLAYER_VISUALS may be drawn outside of these areas
+        '''
+        groups: list[Group] = [self.player_group, self.coin_group, self.turret_group]
+
+        # projectiles are not sprites, the field stores its own drawn areas
+        drawn_rects: list[Rect] = list(self.projectile_field.drawn_rects)
+        # ui containers draw their children through Group.draw as well
+        for container in (self.ui_container_group.sprites() + self.timer.container_group.sprites()):
+            if (container.bg_color) or (container.border_width):
+                drawn_rects.append(container.rect.copy())
+            groups.append(container.children)
+
+        for group in groups:
+            drawn_rects.extend(group.spritedict.values())
+            drawn_rects.extend(group.lostsprites)
+
+        # sprites that were added but never drawn have a drawn area of 0
+        return [RE for RE in drawn_rects if RE]
+
+    def display_update_dirty_rects(self):
+        ''' dirty rects alternative to display.update(). push the restored and drawn areas only. '''
+        drawn_rects = self.get_drawn_rects()
+
+        if (self.full_redraw_pending):
+            self.full_redraw_pending = False
+            display.update()
+        else:
+            OFFSET = self.SURFACE_OFFSET
+            display.update([RE.move(OFFSET) for RE in (self.restored_rects + drawn_rects)])
 
-    def clear_surf_with_fill(self):
-        self.surface.fill(self.fill_color)
+        self.prev_drawn_rects = drawn_rects
 
     def draw_external(self):
-        self.BG_CLEAR_FUNC()
+        self.clear_surf_with_static_layer()
         self.player_group.draw(self.surface)
-        self.block_group.draw(self.surface)
         self.coin_group.draw(self.surface)
         self.turret_group.draw(self.surface)
 
     def loop(self):
         self.paused = False
-
         # if a map was initiated by the menu, launch the main loop
+        self.LOOP_FUNC()
+
+    def simulate_tick(self):
+        ''' advance the simulation by a single tick. Nothing is drawn.
+            * all frame based values in configs, i.e. cooldowns and rates, count these ticks
+        '''
+        self.RUN_PHASES(self.TICK_PHASES)
+        self.n_ticks += 1
+
+    def run_phases(self, PHASES: tuple[tuple[int, Callable], ...]):
+        for _, PHASE_FUNC in PHASES:
+            PHASE_FUNC()
+
+    def update_turrets_and_projectiles(self):
+        ''' let turrets aim and fire, and move all projectiles by a single tick '''
+        self.turret_group.update()
+        self.projectile_field.update()
+
+    def update_player_and_coins(self):
+        ''' move/animate the player and coins by a single tick. Runs after the collision checks of the tick '''
+        self.coin_group.update()
+        self.player_group.update()
+
+    def draw_frame(self):
+        ''' clear the map surface, then draw all sprites and projectiles '''
+        self.CLEAR_FUNC()
+
+        if (DEBUG_PLAYER_VISUALS):
+            self.debug__draw_player_all_info()
+        else:
+            self.player_group.draw(self.surface)
+        self.coin_group.draw(self.surface)
+        self.projectile_field.draw(self.surface)
+        self.turret_group.draw(self.surface)
+        self.draw_collision_overlap()
+
+    def draw_collision_overlap(self):
+        ''' while the player has collision cooldown, blit the visual overlap of the player and blocks '''
+        if (self.player.collision_cooldown_frames_left):
+            self.blit_block_player_overlap()
+
+    def update_ui(self):
+        ''' update and draw the timer text and the status bars '''
+        self.timer.draw_ui(self.surface)
+        self.ui_container_group.update(self.surface)
+
+    def update_timer(self):
+        ''' tick the clock, limiting the frame rate, and advance the timer segment '''
+        self.timer.update()
+
+    def loop_fixed_timestep(self):
+        ''' simulate in fixed ticks of TICK_TIME real time, independent of the render rate.
+            * input is read once per rendered frame, before catching up the simulation
+            * the timer limits rendering to fps_limit, so a fast machine simulates one tick per frame
+        '''
+        # time spent outside the loop (menus, pause) is not simulated
+        self.tick_accumulator = float(0)
+        self.prev_frame_time = perf_counter()
         while (self.looping):
-            self.BG_CLEAR_FUNC()
+            self.FRAME_FUNC()
 
-            if (DEBUG_PLAYER_VISUALS):
-                self.debug__draw_player_all_info()
-            else:
-                self.player_group.draw(self.surface)
-            self.block_group.draw(self.surface)
-            self.coin_group.draw(self.surface)
-            self.turret_group.update(self.surface)
-            self.turret_group.draw(self.surface)
-            self.timer.draw_ui(self.surface)
-
-            # collision checks
-            self.check_player_terrain_collision()
-            self.check_player_coin_collision()
-            self.check_projectile_collision()
-            self.check_events()
-            self.ui_container_group.update(self.surface)
+    def run_frame_fixed_timestep(self):
+        ''' a single frame of loop_fixed_timestep '''
+        self.RUN_PHASES(self.EVENT_PHASES)
 
-            display.update()
+        now = perf_counter()
+        self.tick_accumulator = min((self.tick_accumulator + (now - self.prev_frame_time)), self.MAX_ACCUMULATED)
+        self.prev_frame_time = now
+
+        while (self.tick_accumulator >= self.TICK_TIME) and (self.looping):
+            self.simulate_tick()
+            self.tick_accumulator -= self.TICK_TIME
 
-            self.coin_group.update()
-            self.player_group.update()
-            self.timer.update()
+        self.RUN_PHASES(self.RENDER_PHASES)
+
+    def loop_frame_locked(self):
+        ''' simulate exactly one tick per rendered frame. Game speed depends on reaching fps_limit. '''
+        while (self.looping):
+            self.FRAME_FUNC()
+
+    def run_frame_locked(self):
+        ''' a single frame of loop_frame_locked. See LOCKED_FRAME_PHASES '''
+        self.RUN_PHASES(self.LOCKED_FRAME_PHASES)
+        self.n_ticks += 1
+
+    #### PROFILING ####
+
+    def set_profiling(self, enabled: bool):
+        ''' start or stop timing each phase of every frame into self.profiler. Takes effect from the next frame.
+            * swaps FRAME_FUNC and RUN_PHASES, so the unprofiled loop runs without any timing calls.
+                the profiled frame runs the same frame function, only timing each phase
+            * starting clears the profiler. Stopping keeps the collected frames
+        '''
+        enabled = bool(enabled)
+        if (enabled) and not (self.profiling):
+            self.profiler.clear()
+            # mask tests are counted while not profiling as well
+            self.n_mask_tests = 0
+            self.projectile_field.n_mask_tests = 0
+        self.profiling = enabled
+        self.FRAME_FUNC = self.run_frame_profiled if (enabled) else self.BASE_FRAME_FUNC
+        self.RUN_PHASES = self.run_phases_profiled if (enabled) else self.run_phases
+
+        # headless maps have no timer to show the overlay in
+        if (self.timer == None):
+            return
+        if (enabled):
+            if (self.profiler_overlay == None):
+                self.set_up_profiler_overlay()
+            self.timer.TEXT_CONTAINER.add_child(self.profiler_overlay)
+        elif (self.profiler_overlay != None):
+            self.profiler_overlay.kill()
+
+    def set_up_profiler_overlay(self):
+        ''' create the overlay rows: frame time per phase, projectiles, sprites per group,
+            mask tests per frame and cache hit rates
+        '''
+        FRAME_BUDGET_MS = (1000.0 / self.cf_global['fps_limit'])
+
+        def phase_getter(phase: str) -> Callable:
+            return lambda: self.profiler_overlay_stats[0].get(phase, {}).get('mean')
+
+        def counter_getter(counter: str) -> Callable:
+            return lambda: self.profiler_overlay_stats[1].get(counter, {}).get('mean')
+
+        def cache_getter(name: str) -> Callable:
+            return lambda: self.profiler_overlay_stats[2].get(name)
+
+        rows = [(PHASE, phase_getter(PHASE), FRAME_BUDGET_MS, '{:.2f} ms') for PHASE in PROFILER_PHASES]
+        # p95 of the whole frame; the frame budget is blown when this bar is full
+        rows.append(('frame p95', lambda: self.profiler_overlay_stats[0].get('frame', {}).get('p95'),
+                     FRAME_BUDGET_MS, '{:.2f} ms'))
+        rows.append(('projectiles', lambda: self.projectile_field.n, self.PROJECTILE_POOL_SIZE, '{:.0f}'))
+        for name, group in (('coins', self.coin_group), ('blocks', self.block_group),
+                            ('turrets', self.turret_group), ('highlighted', self.block_update_group)):
+            rows.append((name, (lambda group=group: len(group)), None, '{:.0f}'))
+        rows.append(('ticks/frame', counter_getter('ticks'), self.MAX_TICKS_PER_FRAME, '{:.2f}'))
+        rows.append(('mask tests', counter_getter('mask_tests'), None, '{:.1f}'))
+        for name in get_cache_hit_rates().keys():
+            rows.append((f'hits {name}', cache_getter(name), 1.0, '{:.0%}'))
+
+        self.profiler_overlay = UI_Profiler_Overlay(
+            self.timer.cf_timer['profiler_overlay'], self.cf_global, rows, self.refresh_profiler_overlay_stats,
+            self.timer.TEXT_CONTAINER.rect.topleft
+        )
+        self.ALL_SPRITES.append(self.profiler_overlay)
+
+    def refresh_profiler_overlay_stats(self):
+        self.profiler_overlay_stats = (self.profiler.get_stats(), self.profiler.get_counter_stats(),
+                                       get_cache_hit_rates())
+
+    def get_profiler_stats(self) -> dict[str, dict[str, float]]:
+        ''' rolling mean/p95/max frame time per phase, in ms. See PROFILER_PHASES and Frame_Profiler.get_stats '''
+        return self.profiler.get_stats()
+
+    def run_phases_profiled(self, PHASES: tuple[tuple[int, Callable], ...]):
+        ''' run_phases, adding the time of each phase to the current profiler frame '''
+        TIMES = self.profiler.frame
+        for PHASE, PHASE_FUNC in PHASES:
+            T0 = perf_counter_ns()
+            PHASE_FUNC()
+            TIMES[PHASE] += (perf_counter_ns() - T0)
+
+    def run_frame_profiled(self):
+        ''' BASE_FRAME_FUNC, with RUN_PHASES timing each phase. Then stores the frame in the profiler '''
+        START_TICK = self.n_ticks
+        self.BASE_FRAME_FUNC()
+        COUNTS = self.profiler.frame_counts
+        COUNTS[COUNTER_TICKS] += (self.n_ticks - START_TICK)
+        COUNTS[COUNTER_MASK_TESTS] += (self.n_mask_tests + self.projectile_field.n_mask_tests)
+        self.n_mask_tests = 0
+        self.projectile_field.n_mask_tests = 0
+        self.profiler.end_frame()
 
     #### MASK RELATED METHODS ####
 
@@ -903,65 +1442,54 @@ class PG_Map:
         self.surface.blit(MASK_SURF, dest_pos)
 
     def blit_block_player_overlap(self):
-        # before checking masks, perform a simple collision check using rects
-        if (spritecollideany(self.player, self.block_group)):
-            # get list of colliding masks
-            collidelist = spritecollide(self.player, self.block_group, False, collided=collide_mask)
-            for BLOCK in collidelist:
-                self.blit_overlap_mask(self.player, BLOCK)
+        # the block grid narrows the mask checks down to blocks near the player
+        for BLOCK in self.get_colliding_blocks(self.player):
+            self.blit_overlap_mask(self.player, BLOCK)
 
     #### MISC GETTERS ####
 
     def get_rand_x(self, padding: int):
         ''' get random x-value within map left/right. Padding may be negative. '''
-        return randint((self.rect.left + padding), (self.rect.right - padding))
+        return self.rng.randint((self.rect.left + padding), (self.rect.right - padding))
 
     def get_rand_y(self, padding: int):
         ''' get random y-value within map top/bottom. Padding may be negative. '''
-        return randint((self.rect.top + padding), (self.rect.bottom - padding))
+        return self.rng.randint((self.rect.top + padding), (self.rect.bottom - padding))
 
     def get_rand_pos(self, padding_x: int, padding_y: int):
         ''' get a random position(x,y) within the map. Padding may be negative. '''
         return (self.get_rand_x(padding_x), self.get_rand_y(padding_y))
 
-    def get_rand_pos_no_collide(self, rect: Rect, pad_x: int, pad_y: int, collidelist: Group | list | Rect):
-        ''' get a random position within the map, where the given rect won't collide with the given group.
+    def get_rand_pos_no_collide(self, rect: Rect, pad_x: int, pad_y: int, collidelist: Group | list):
+        ''' get a random position within the map, where the given rect won't collide with the given group or rects.
             x/y padding is added to both rect axis before checks (the original rect will remain unaltered)
             * returns the topleft position of where the rect should be placed.
         '''
         
-        # should absolutely have written this before doing placement of blocks/coins.
-        # might update them to use this method to conserve a bit of space, but the logic would be the same.
-
         C_RECT = rect.copy()
         if (pad_x > 0) or (pad_y > 0):
             C_RECT.inflate_ip((2*pad_x), (2*pad_y))
+        W, H = C_RECT.size
 
-        failed_attempts = 0
-        while (failed_attempts < self.LOOP_LIMIT):
-            rand_pos = self.get_rand_pos(C_RECT.width, C_RECT.height)
-            C_RECT.topleft = rand_pos
-
-            collision_ok = True
-            for obj in collidelist:
-                if C_RECT.colliderect(obj.rect):
-                    collision_ok = False
-                    break
+        placement_grid = PG_Placement_Grid(self.rect, self.PLACEMENT_CELL_SIZE)
+        placement_grid.mark_all(collidelist)
 
-            if collision_ok:
-                adjusted_pos = ((rand_pos[0]+pad_x), (rand_pos[1]+pad_y))
-                del C_RECT
-                return adjusted_pos
-            else:
-                failed_attempts += 1
+        # same topleft range as get_rand_pos(W, H), as center positions
+        MIN_POS = ((self.rect.left + W + (W // 2)), (self.rect.top + H + (H // 2)))
+        MAX_POS = ((self.rect.right - W + (W // 2)), (self.rect.bottom - H + (H // 2)))
+
+        center = placement_grid.find_center(self.rng, (W, H), MIN_POS, MAX_POS)
+        if (center == None):
+            msg = f'cannot find a pos without collision between {rect} and {collidelist}'
+            raise LoopError(msg, 0, 1, self.LOOP_LIMIT)
 
-        # loop didnt return -> no solution was found
-        msg = f'cannot find a pos without collision between {rect} and {collidelist}'
-        raise LoopError(msg, 0, 1, self.LOOP_LIMIT)
+        return ((center[0] - (W // 2) + pad_x), (center[1] - (H // 2) + pad_y))
 
     #### DEBUGGING METHODS ####
 
     def debug__draw_player_all_info(self):
+        # rotated player images are cached, so draw the debug info on a copy
+        self.player.image = self.player.image.copy()
         # mask debug draws apply to the sprites' temp image, so call before blitting that image
         self.debug__draw_mask_center_mass(self.player)
         self.debug__draw_mask_bounds(self.player)
@@ -1027,7 +1555,7 @@ class PG_Map:
         draw_line(self.player.image, self.DEBUG_COLOR_2, line_4_p1, line_4_p2, width=1)
 
     def __str__(self):
-        return f'PG_Map with name="{self.name}, Rect={self.rect}'
+        return f'PG_Map with name="{self.name}, Rect={self.rect}, seed={self.SEED}'
 
 
 ''' BENCHMARKS
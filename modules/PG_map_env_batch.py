@@ -0,0 +1,294 @@
+''' Lockstep simulation of many headless maps across worker processes, for scoring balance changes.
+
+    PG_Map_Env_Batch holds N PG_Map_Env instances, split across a set of worker processes.
+    Each step, every env applies its row of the action array and simulates a single tick,
+    and the observations, rewards and done flags of all envs are written to stacked arrays.
+
+    * the arrays live in a single shared memory block. Only short commands pass through the worker pipes,
+        so a step costs no pickling regardless of the batch size
+    * every env has its own seed, cf_map and cf_player, to compare configs against each other over many runs
+    * workers are spawned, not forked, so they never inherit the display of the calling process.
+        All envs of a worker share one window on the SDL dummy video driver
+    * envs that terminate or truncate are no longer stepped, and give zero reward until the next reset.
+        Step until all_done, then reset to the next set of seeds
+'''
+
+import os
+import sys
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from traceback import format_exc
+
+import numpy as np
+
+from .PG_map_env import PG_Map_Env, ACTIONS, OBS_SIZE
+
+
+ACTION_TABLE = np.array(ACTIONS, dtype=np.float32)
+''' ACTIONS as an array, to look up a batch of discrete actions at once '''
+
+
+def get_batch_layout(n_envs: int) -> tuple[dict[str, tuple[int, tuple[int, ...], type]], int]:
+    ''' layout of the shared arrays of a batch of n_envs.
+        returns ({name: (byte offset, shape, dtype)}, total bytes)
+    '''
+    FIELDS = (
+        ('action',      (n_envs, 3),        np.float32),    # (steer_x, steer_y, thrust) per env. See PG_Map_Env.apply_action
+        ('obs',         (n_envs, OBS_SIZE), np.float32),    # see PG_map_env.OBS_FIELDS
+        ('reward',      (n_envs, ),         np.float32),
+        ('terminated',  (n_envs, ),         np.bool_),
+        ('truncated',   (n_envs, ),         np.bool_),
+        ('coins',       (n_envs, ),         np.int32),      # coins collected this episode
+        ('ticks',       (n_envs, ),         np.int32),      # ticks simulated this episode
+        ('success',     (n_envs, ),         np.int8),       # 1: all coins collected, 0: died or truncated, -1: running
+    )
+    layout = {}
+    offset = 0
+    for name, shape, dtype in FIELDS:
+        # keep every array 8-byte aligned
+        offset = (offset + 7) & ~7
+        layout[name] = (offset, shape, dtype)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return (layout, max(1, offset))
+
+
+def get_batch_arrays(buffer, n_envs: int) -> dict[str, np.ndarray]:
+    ''' views of the shared arrays within buffer. See get_batch_layout '''
+    LAYOUT, _ = get_batch_layout(n_envs)
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        for name, (offset, shape, dtype) in LAYOUT.items()
+    }
+
+
+def _run_worker(conn, shm_name: str, n_envs: int, indices: list[int],
+                cf_global: dict, cf_window: dict, cf_env: dict, cf_maps: list[dict], cf_players: list[dict]):
+    ''' worker process loop. Owns the envs of the given batch indices, and runs the commands sent through conn:
+        * ('reset', [seed per index]) / ('step', None) / ('close', None)
+        * replies True when done, or ('error', traceback) if the command raised
+    '''
+    # map setup info prints go to stderr, keeping stdout of the calling process clean for results
+    sys.stdout = sys.stderr
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    SHM = SharedMemory(name=shm_name)
+    ARRAYS = get_batch_arrays(SHM.buf, n_envs)
+    envs: list[PG_Map_Env] = []
+    try:
+        FIRST = PG_Map_Env(cf_global, cf_window, cf_maps[indices[0]], cf_players[indices[0]], cf_env)
+        envs.append(FIRST)
+        for i in indices[1:]:
+            envs.append(PG_Map_Env(cf_global, cf_window, cf_maps[i], cf_players[i], cf_env, FIRST.window))
+        conn.send(True)
+    except Exception:
+        conn.send(('error', format_exc()))
+        envs.clear()
+
+    ACTION = ARRAYS['action']
+    OBS = ARRAYS['obs']
+    REWARD = ARRAYS['reward']
+    TERMINATED = ARRAYS['terminated']
+    TRUNCATED = ARRAYS['truncated']
+    COINS = ARRAYS['coins']
+    TICKS = ARRAYS['ticks']
+    SUCCESS = ARRAYS['success']
+
+    while (envs):
+        cmd, arg = conn.recv()
+        if (cmd == 'close'):
+            break
+        try:
+            if (cmd == 'reset'):
+                for i, env, seed in zip(indices, envs, arg):
+                    env.reset(seed)
+                    env.write_observation(OBS[i])
+                    REWARD[i] = 0.0
+                    TERMINATED[i] = False
+                    TRUNCATED[i] = False
+                    COINS[i] = 0
+                    TICKS[i] = 0
+                    SUCCESS[i] = -1
+            elif (cmd == 'step'):
+                for i, env in zip(indices, envs):
+                    if (TERMINATED[i]) or (TRUNCATED[i]):
+                        REWARD[i] = 0.0
+                        continue
+                    REWARD[i], TERMINATED[i], TRUNCATED[i] = env.step_tick(ACTION[i])
+                    env.write_observation(OBS[i])
+                    M = env.map
+                    COINS[i] = len(M.collected_coins)
+                    TICKS[i] = M.n_ticks
+                    # map_success is None until the episode ends
+                    if (TERMINATED[i]):
+                        SUCCESS[i] = bool(M.map_success)
+                    elif (TRUNCATED[i]):
+                        SUCCESS[i] = 0
+            conn.send(True)
+        except Exception:
+            conn.send(('error', format_exc()))
+
+    # drop the views before closing, as the block can not be closed while exported
+    del ACTION, OBS, REWARD, TERMINATED, TRUNCATED, COINS, TICKS, SUCCESS, ARRAYS
+    # the first env owns the shared window, so it is closed last
+    for env in reversed(envs):
+        env.close()
+    SHM.close()
+    conn.close()
+
+
+class PG_Map_Env_Batch:
+    ''' N headless maps stepped in lockstep across worker processes. See the module docstring.
+
+        Parameters
+        ---
+        cf_global, cf_window, cf_env: as for PG_Map_Env, shared by every env
+        cf_maps, cf_players: per env, a list of N configs. A single dict is used for every env
+        seeds: first seed of each env. The length decides N
+        processes: worker processes. None => one per CPU, never more than N
+    '''
+
+    def __init__(self, cf_global: dict, cf_window: dict, cf_env: dict,
+                 cf_maps: dict | list[dict], cf_players: dict | list[dict], seeds,
+                 processes: int | None = None):
+        self.seeds = [int(seed) for seed in seeds]
+        self.n_envs = len(self.seeds)
+        if (self.n_envs == 0):
+            raise ValueError('PG_Map_Env_Batch needs at least one seed')
+        self.cf_maps = [cf_maps] * self.n_envs if isinstance(cf_maps, dict) else list(cf_maps)
+        self.cf_players = [cf_players] * self.n_envs if isinstance(cf_players, dict) else list(cf_players)
+        if (len(self.cf_maps) != self.n_envs) or (len(self.cf_players) != self.n_envs):
+            raise ValueError(f'expected one cf_map and cf_player per seed ({self.n_envs})')
+
+        self.n_processes = min(self.n_envs, (processes or mp.cpu_count()))
+        _, SIZE = get_batch_layout(self.n_envs)
+        self.SHM = SharedMemory(create=True, size=SIZE)
+        self.arrays = get_batch_arrays(self.SHM.buf, self.n_envs)
+        self.action = self.arrays['action']
+        self.obs = self.arrays['obs']
+        ''' (N, OBS_SIZE). Overwritten every step and reset; copy to keep '''
+        self.reward = self.arrays['reward']
+        self.terminated = self.arrays['terminated']
+        self.truncated = self.arrays['truncated']
+        self.n_steps = int(0)
+
+        CTX = mp.get_context('spawn')
+        self.worker_indices: list[list[int]] = [
+            [int(i) for i in INDICES] for INDICES in np.array_split(np.arange(self.n_envs), self.n_processes)
+        ]
+        self.workers = []
+        self.conns = []
+        for INDICES in self.worker_indices:
+            parent_conn, child_conn = CTX.Pipe()
+            WORKER = CTX.Process(
+                target=_run_worker, daemon=True,
+                args=(child_conn, self.SHM.name, self.n_envs, INDICES,
+                      cf_global, cf_window, cf_env, self.cf_maps, self.cf_players)
+            )
+            WORKER.start()
+            child_conn.close()
+            self.workers.append(WORKER)
+            self.conns.append(parent_conn)
+        self.closed = False
+        self.wait_workers()
+
+    def wait_workers(self):
+        ''' wait for every worker to finish its command. Raises RuntimeError if any of them failed '''
+        errors = []
+        for n, conn in enumerate(self.conns):
+            try:
+                REPLY = conn.recv()
+            except EOFError:
+                REPLY = ('error', 'worker exited')
+            if (REPLY != True):
+                errors.append(f'worker {n}:\n{REPLY[1]}')
+        if (errors):
+            self.close()
+            raise RuntimeError('PG_Map_Env_Batch: ' + '\n'.join(errors))
+
+    def send_all(self, cmd: str, args: list | None = None):
+        for n, conn in enumerate(self.conns):
+            conn.send((cmd, (None if (args == None) else args[n])))
+        self.wait_workers()
+
+    def reset(self, seeds=None) -> np.ndarray:
+        ''' set up every env from its seed. Returns the obs array.
+            * seeds: a new seed per env, or None to repeat the current seeds
+        '''
+        if (seeds != None):
+            seeds = [int(seed) for seed in seeds]
+            if (len(seeds) != self.n_envs):
+                raise ValueError(f'expected {self.n_envs} seeds, got {len(seeds)}')
+            self.seeds = seeds
+        self.send_all('reset', [[self.seeds[i] for i in INDICES] for INDICES in self.worker_indices])
+        self.n_steps = int(0)
+        return self.obs
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        ''' every env that is not done applies its action and simulates a single tick.
+            * actions: (N, 3) array of (steer_x, steer_y, thrust), or (N, ) indices into ACTIONS
+            * returns (obs, reward, terminated, truncated). The arrays are shared, and overwritten every step
+        '''
+        ACTIONS_IN = np.asarray(actions)
+        if (ACTIONS_IN.ndim == 1):
+            np.take(ACTION_TABLE, ACTIONS_IN, axis=0, out=self.action)
+        else:
+            self.action[:] = ACTIONS_IN
+        self.send_all('step')
+        self.n_steps += 1
+        return (self.obs, self.reward, self.terminated, self.truncated)
+
+    @property
+    def done(self) -> np.ndarray:
+        return (self.terminated | self.truncated)
+
+    @property
+    def all_done(self) -> bool:
+        return bool(self.done.all())
+
+    def get_results(self) -> list[dict]:
+        ''' episode state of each env, in batch order. success is None while an episode is running '''
+        ARRAYS = self.arrays
+        return [
+            {
+                'seed': self.seeds[i],
+                'map': self.cf_maps[i]['name'],
+                'ticks': int(ARRAYS['ticks'][i]),
+                'coins': int(ARRAYS['coins'][i]),
+                'success': None if (ARRAYS['success'][i] == -1) else bool(ARRAYS['success'][i]),
+                'terminated': bool(ARRAYS['terminated'][i]),
+                'truncated': bool(ARRAYS['truncated'][i]),
+            }
+            for i in range(self.n_envs)
+        ]
+
+    def close(self):
+        ''' stop the workers and free the shared memory. Safe to call more than once '''
+        if (self.closed):
+            return
+        self.closed = True
+        for conn in self.conns:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for WORKER in self.workers:
+            WORKER.join(timeout=5.0)
+            if (WORKER.is_alive()):
+                WORKER.terminate()
+        for conn in self.conns:
+            conn.close()
+
+        self.arrays = {}
+        self.action = self.obs = self.reward = self.terminated = self.truncated = None
+        self.SHM.close()
+        self.SHM.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __str__(self):
+        return f'PG_Map_Env_Batch: envs={self.n_envs}, processes={self.n_processes}, steps={self.n_steps}'
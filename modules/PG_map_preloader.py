@@ -0,0 +1,50 @@
+from threading import Thread
+
+from pygame import Surface
+
+from .PG_timer import PG_Timer
+from .PG_map import PG_Map
+
+
+class PG_Map_Preloader:
+    ''' Prepares a map on a worker thread, i.e. while the menu is idle.
+        * the PG_Map object is created on the calling thread. Only PG_Map.prepare runs on the worker:
+            it loads the layout and background image, but creates no sprites and converts no surfaces
+        * wait returns the map, ready for set_up_all on the calling thread. set_up_all then skips prepare
+        * a preload can not be cancelled. A discarded preloader finishes in the background, and is dropped
+
+        Parameters
+        ---
+        see PG_Map
+    '''
+
+    def __init__(self, cf_global: dict, cf_map: dict, timer: PG_Timer, surface: Surface,
+                 dirty_rects: bool = False):
+        self.cf_map = cf_map
+        self.map = PG_Map(cf_global, cf_map, timer, surface, dirty_rects=dirty_rects)
+        self.error: Exception | None = None
+        ''' exception raised by the worker, if any. Re-raised by wait '''
+
+        # daemon, so that a preload never keeps the app from exiting
+        self.thread = Thread(target=self._prepare, name=f'preload "{self.map.name}"', daemon=True)
+        self.thread.start()
+
+    def _prepare(self):
+        try:
+            self.map.prepare()
+        except Exception as e:
+            self.error = e
+
+    def is_done(self) -> bool:
+        return not (self.thread.is_alive())
+
+    def wait(self) -> PG_Map:
+        ''' block until the map is prepared, then return it. Raises any exception from the worker '''
+        self.thread.join()
+        if (self.error != None):
+            raise self.error
+        return self.map
+
+    def __str__(self):
+        state = 'done' if (self.is_done()) else 'running'
+        return f'PG_Map_Preloader: map="{self.map.name}", seed={self.map.SEED}, {state}'
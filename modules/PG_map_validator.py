@@ -0,0 +1,157 @@
+''' Coin reachability validation of generated map layouts.
+
+    Nothing in the map generation guarantees that the obstacles leave every coin reachable.
+    A layout is rasterized into a coarse grid, which is dilated by the players idle bounds to get the
+    cells the player center can occupy without touching terrain. A BFS from the player spawn then finds
+    every reachable cell, and a coin is reachable if the player rect overlaps it from within a reachable cell.
+
+    * conservative: a cell is only free if the player fits when centered anywhere within it,
+        so narrow passages may be reported as blocked at a coarse cell size, never the other way around
+    * the player is treated as its unrotated idle bounds, moving in 4 directions. The idle bounds are
+        larger than the ship mask the game collides with, which adds to the conservative margin
+    * score_seeds generates and validates many seeds in parallel, without touching the display
+'''
+
+import sys
+import multiprocessing as mp
+from time import perf_counter
+
+import numpy as np
+from pygame import Surface, Rect
+
+from .PG_map import PG_Map
+from .PG_common import load_sprites_tuple
+from .PG_placement_grid import PG_Placement_Grid
+from .map_layout import Map_Layout
+
+
+VALIDATION_CELL_SIZE = int(8)
+''' default cell size of the validation grid, in pixels '''
+
+
+def get_player_idle_size(cf_player: dict) -> tuple[int, int]:
+    ''' size of the players idle bounds. See Player.get_idle_bounds '''
+    cf_spritesheets = cf_player['spritesheets']
+    cf_idle = cf_spritesheets['idle']
+    IMAGES = load_sprites_tuple(cf_idle['path'], cf_idle['n_images'], cf_spritesheets['image_scalar'], None,
+                                convert=False)[0]
+    return IMAGES[0].get_size()
+
+
+def bfs_reachable(free: np.ndarray, start: tuple[int, int]) -> tuple[np.ndarray, int]:
+    ''' level-synchronous BFS over the free cells of a [row, col] grid, 4-connected.
+        * start is a (row, col) cell, always reached
+        * returns (reached cells, number of BFS levels)
+    '''
+    reached = np.zeros_like(free)
+    reached[start] = True
+    frontier = reached.copy()
+    grown = np.zeros_like(free)
+    n_levels = 0
+    while (frontier.any()):
+        grown[:] = False
+        grown[1:, :] |= frontier[:-1, :]
+        grown[:-1, :] |= frontier[1:, :]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        frontier = grown & free & ~reached
+        reached |= frontier
+        n_levels += 1
+    return (reached, n_levels)
+
+
+def validate_layout(map_rect: Rect, terrain_rects: list[Rect], coin_rects: list[Rect],
+                    player_size: tuple[int, int], spawn_center: tuple[int, int],
+                    cell_size: int = VALIDATION_CELL_SIZE) -> dict:
+    ''' check which coins the player can reach from its spawn. See the module docstring.
+        * terrain_rects: everything the player can not pass through, i.e. blocks and turrets
+        * returns a dict of: valid, reachable_coins, n_coins, unreachable (coin indices), reachable_area, bfs_levels
+    '''
+    grid = PG_Placement_Grid(map_rect, cell_size)
+    grid.mark_all(terrain_rects)
+    # cells where the player center can be, without the idle bounds touching terrain
+    FREE = grid.get_free_centers(player_size)
+
+    def get_cell(position: tuple[int, int]) -> tuple[int, int]:
+        row = (position[1] - map_rect.top) // cell_size
+        col = (position[0] - map_rect.left) // cell_size
+        return (min(max(row, 0), (grid.N_ROWS - 1)), min(max(col, 0), (grid.N_COLS - 1)))
+
+    reached, n_levels = bfs_reachable(FREE, get_cell(spawn_center))
+
+    # the player touches a coin from every center where its rect overlaps the coin rect.
+    # any position within a reached cell is reachable, so one reached cell containing such a center is enough
+    W, H = player_size
+    unreachable = []
+    for i, RECT in enumerate(coin_rects):
+        MIN_POS = ((RECT.left - (W - (W // 2)) + 1), (RECT.top - (H - (H // 2)) + 1))
+        MAX_POS = ((RECT.right + (W // 2) - 1), (RECT.bottom + (H // 2) - 1))
+        if not ((reached & grid.get_range_cells(MIN_POS, MAX_POS)).any()):
+            unreachable.append(i)
+    n_free = int(np.count_nonzero(FREE))
+    return {
+        'valid': (len(unreachable) == 0),
+        'reachable_coins': (len(coin_rects) - len(unreachable)),
+        'n_coins': len(coin_rects),
+        'unreachable': unreachable,
+        'reachable_area': (float(np.count_nonzero(reached & FREE)) / n_free) if (n_free) else 0.0,
+        'bfs_levels': n_levels,
+    }
+
+
+def score_seed(cf_global: dict, cf_map: dict, cf_player: dict, map_size: tuple[int, int],
+               seed: int, cell_size: int = VALIDATION_CELL_SIZE) -> dict:
+    ''' generate the layout of the given seed exactly as PG_Map would, then validate it.
+        * needs no display, and no pygame.init. Safe to run in a worker process
+        * the layout cache is not used
+    '''
+    T0 = perf_counter()
+    SURF = Surface(map_size)
+    M = PG_Map(cf_global, dict(cf_map, seed=seed, layout_cache_dir=None), None, SURF)
+    M.COIN_IMAGES = M.load_coin_images(convert=False)
+    TERRAIN_RECTS = M.generate_layout()
+    layout: Map_Layout = M.layout
+
+    COIN_SIZE = M.COIN_IMAGES[0][0].get_size()
+    coin_rects = []
+    for position in layout.coins:
+        RECT = Rect((0, 0), COIN_SIZE)
+        RECT.center = position
+        coin_rects.append(RECT)
+
+    # same spawn as PG_Map.spawn_player; spawn_collide_group holds terrain, the status bars and coins
+    PLAYER_SIZE = get_player_idle_size(cf_player)
+    SPAWN_COLLIDE_RECTS = TERRAIN_RECTS + [M.get_bar_container_rect()] + coin_rects
+    spawn_pos = M.get_player_spawn_pos(Rect((0, 0), PLAYER_SIZE), SPAWN_COLLIDE_RECTS)
+    SPAWN_CENTER = Rect(spawn_pos, PLAYER_SIZE).center
+
+    result = validate_layout(M.rect, TERRAIN_RECTS, coin_rects, PLAYER_SIZE, SPAWN_CENTER, cell_size)
+    result['seed'] = int(seed)
+    result['spawn_pos'] = [int(spawn_pos[0]), int(spawn_pos[1])]
+    result['time_s'] = (perf_counter() - T0)
+    return result
+
+
+def _score_seed_star(args: tuple) -> dict:
+    return score_seed(*args)
+
+
+def _init_worker():
+    # generation info prints go to stderr, keeping stdout of the calling process clean for results
+    sys.stdout = sys.stderr
+
+
+def score_seeds(cf_global: dict, cf_map: dict, cf_player: dict, map_size: tuple[int, int],
+                seeds, processes: int | None = None, cell_size: int = VALIDATION_CELL_SIZE) -> list[dict]:
+    ''' score_seed for each seed, on a pool of worker processes. Results are in the order of seeds.
+        * processes: None => one per CPU. 1 => run in the calling process
+        * workers are spawned, not forked, so they never inherit the display of the calling process
+    '''
+    TASKS = [(cf_global, cf_map, cf_player, map_size, int(seed), cell_size) for seed in seeds]
+    if (processes == 1):
+        return [_score_seed_star(task) for task in TASKS]
+
+    # a few chunks per worker; small enough to balance, large enough to keep the pickling overhead low
+    CHUNKSIZE = max(1, len(TASKS) // (4 * (processes or mp.cpu_count())))
+    with mp.get_context('spawn').Pool(processes, initializer=_init_worker) as pool:
+        return pool.map(_score_seed_star, TASKS, chunksize=CHUNKSIZE)
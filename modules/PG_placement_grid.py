@@ -0,0 +1,124 @@
+from random import Random
+
+import numpy as np
+from pygame import Rect
+
+
+class PG_Placement_Grid:
+    ''' Free space occupancy grid, used to place sprites without rejection sampling.
+        * occupied areas are marked at cell resolution. A cell touched by any marked rect is occupied
+        * positions are only drawn from cells known to be valid, so a placement never has to be retried
+        * conservative: a position may be rejected if it is within a cell of an occupied area,
+            but a returned position never overlaps a marked rect
+        * the area outside of bounds is treated as occupied
+
+        Parameters
+        ---
+        bounds: Rect
+            area covered by the grid
+        cell_size: int
+            width and height of each cell, in pixels. Smaller is more precise, but slower to search
+    '''
+
+    def __init__(self, bounds: Rect, cell_size: int):
+        self.bounds = bounds.copy()
+        self.CELL_SIZE = int(cell_size)
+
+        # ceil division, so the last row/col covers any remainder
+        self.N_COLS = int(-(-self.bounds.w // self.CELL_SIZE))
+        self.N_ROWS = int(-(-self.bounds.h // self.CELL_SIZE))
+
+        self.occupied = np.zeros((self.N_ROWS, self.N_COLS), dtype=np.bool_)
+        ''' indexed [row, col] '''
+
+        # a partial last row/col reaches outside the bounds
+        if (self.bounds.w % self.CELL_SIZE):
+            self.occupied[:, -1] = True
+        if (self.bounds.h % self.CELL_SIZE):
+            self.occupied[-1, :] = True
+
+    def mark(self, rect: Rect):
+        ''' mark every cell the rect overlaps as occupied '''
+        CS = self.CELL_SIZE
+        left = max((rect.left - self.bounds.left) // CS, 0)
+        right = min((rect.right - 1 - self.bounds.left) // CS, self.N_COLS - 1)
+        top = max((rect.top - self.bounds.top) // CS, 0)
+        bottom = min((rect.bottom - 1 - self.bounds.top) // CS, self.N_ROWS - 1)
+        if (left <= right) and (top <= bottom):
+            self.occupied[top:(bottom + 1), left:(right + 1)] = True
+
+    def mark_all(self, sprites_or_rects):
+        for obj in sprites_or_rects:
+            self.mark(obj if isinstance(obj, Rect) else obj.rect)
+
+    def _window_offsets(self, length: int) -> tuple[int, int]:
+        ''' relative (first, last) cell covered by a rect of the given length,
+            centered anywhere within a cell. Follows the Rect.center convention.
+        '''
+        CS = self.CELL_SIZE
+        first = (-(length // 2)) // CS
+        last = ((CS - 1) - (length // 2) + (length - 1)) // CS
+        return (first, last)
+
+    def get_free_centers(self, size: tuple[int, int]) -> np.ndarray:
+        ''' bool array of cells where a rect of the given size, centered anywhere within the cell, is free '''
+        ROW_FIRST, ROW_LAST = self._window_offsets(size[1])
+        COL_FIRST, COL_LAST = self._window_offsets(size[0])
+
+        # pad with occupied cells, so windows reaching outside the bounds are never free
+        PAD_TOP, PAD_BOTTOM = max(-ROW_FIRST, 0), max(ROW_LAST, 0)
+        PAD_LEFT, PAD_RIGHT = max(-COL_FIRST, 0), max(COL_LAST, 0)
+        padded = np.pad(self.occupied, ((PAD_TOP, PAD_BOTTOM), (PAD_LEFT, PAD_RIGHT)), constant_values=True)
+
+        # summed area table, with a leading row/col of zeros
+        SAT = np.zeros(((padded.shape[0] + 1), (padded.shape[1] + 1)), dtype=np.int32)
+        np.cumsum(np.cumsum(padded, axis=0, dtype=np.int32), axis=1, out=SAT[1:, 1:])
+
+        # window of each cell, in padded coordinates
+        R0 = PAD_TOP + ROW_FIRST
+        R1 = PAD_TOP + ROW_LAST + 1
+        C0 = PAD_LEFT + COL_FIRST
+        C1 = PAD_LEFT + COL_LAST + 1
+        N_ROWS, N_COLS = self.N_ROWS, self.N_COLS
+        window_sums = (SAT[R1:(R1 + N_ROWS), C1:(C1 + N_COLS)] - SAT[R0:(R0 + N_ROWS), C1:(C1 + N_COLS)]
+                       - SAT[R1:(R1 + N_ROWS), C0:(C0 + N_COLS)] + SAT[R0:(R0 + N_ROWS), C0:(C0 + N_COLS)])
+        return (window_sums == 0)
+
+    def get_range_cells(self, min_pos: tuple[int, int], max_pos: tuple[int, int]) -> np.ndarray:
+        ''' bool array of cells containing at least one position within [min_pos, max_pos] '''
+        if (min_pos[0] > max_pos[0]) or (min_pos[1] > max_pos[1]):
+            return np.zeros((self.N_ROWS, self.N_COLS), dtype=np.bool_)
+        CS = self.CELL_SIZE
+        CELL_X = self.bounds.left + (np.arange(self.N_COLS) * CS)
+        CELL_Y = self.bounds.top + (np.arange(self.N_ROWS) * CS)
+        COLS_OK = (CELL_X <= max_pos[0]) & ((CELL_X + CS - 1) >= min_pos[0])
+        ROWS_OK = (CELL_Y <= max_pos[1]) & ((CELL_Y + CS - 1) >= min_pos[1])
+        return ROWS_OK[:, None] & COLS_OK[None, :]
+
+    def pick_center(self, rng: Random, valid_cells: np.ndarray,
+                    min_pos: tuple[int, int], max_pos: tuple[int, int]) -> tuple[int, int] | None:
+        ''' pick a random center position within a random valid cell, and within [min_pos, max_pos].
+            * valid_cells should already be limited through get_range_cells
+            * returns None if there are no valid cells
+        '''
+        CANDIDATES = np.flatnonzero(valid_cells)
+        if (CANDIDATES.size == 0):
+            return None
+        row, col = divmod(int(CANDIDATES[rng.randrange(CANDIDATES.size)]), self.N_COLS)
+
+        CS = self.CELL_SIZE
+        cell_x = self.bounds.left + (col * CS)
+        cell_y = self.bounds.top + (row * CS)
+        x = rng.randint(max(cell_x, min_pos[0]), min((cell_x + CS - 1), max_pos[0]))
+        y = rng.randint(max(cell_y, min_pos[1]), min((cell_y + CS - 1), max_pos[1]))
+        return (x, y)
+
+    def find_center(self, rng: Random, size: tuple[int, int],
+                    min_pos: tuple[int, int], max_pos: tuple[int, int]) -> tuple[int, int] | None:
+        ''' random center within [min_pos, max_pos] where a rect of the given size is free. None if there is none. '''
+        VALID = self.get_free_centers(size) & self.get_range_cells(min_pos, max_pos)
+        return self.pick_center(rng, VALID, min_pos, max_pos)
+
+    def __str__(self):
+        n_occupied = int(np.count_nonzero(self.occupied))
+        return f'PG_Placement_Grid: cells={self.N_COLS}x{self.N_ROWS}, cell_size={self.CELL_SIZE}, occupied={n_occupied}'
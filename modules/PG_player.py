@@ -1,8 +1,17 @@
-from pygame import Surface, transform, mask, math as pg_math
+from pygame import Surface, Rect, transform, mask, math as pg_math
+from pygame.mask import Mask
 from pygame.math import Vector2 as Vec2, lerp, clamp
 from pygame.sprite import Sprite
 
-from .PG_common import load_sprites_tuple
+from .PG_common import load_sprites_tuple, register_asset_cache, get_cache_counter
+
+
+PLAYER_ROTATIONS: dict[tuple[Surface, float, int], tuple[Surface, Mask, tuple[int, int]]] = register_asset_cache('player rotations', {})
+''' rotated (image, mask, size), keyed by (source frame, rotation_step, angle index). See Player.get_rotated_image
+    * the source frame surface identifies both the image type and the frame index
+    * filled lazily, and shared between all players, i.e. across map loads
+'''
+PLAYER_ROTATIONS_COUNTER = get_cache_counter('player rotations')
 
 
 class Player(Sprite):
@@ -74,6 +83,10 @@ class Player(Sprite):
         self.PHASE_DEBUG_PRINT = False
 
         scalar = cf_spritesheets['image_scalar']
+        self.ROTATION_STEP = float(cf_spritesheets['rotation_step'])
+        ''' angle, in degrees, between each cached rotation of an image '''
+        self.N_ROTATIONS = max(1, round(360.0 / self.ROTATION_STEP))
+
         cf_idle: dict = cf_spritesheets['idle']
         cf_shield: dict = cf_spritesheets['shield']
         cf_destroyed: dict = cf_spritesheets['destroyed']
@@ -335,20 +348,33 @@ class Player(Sprite):
 
         self.set_velocity_with_gravity(1.0)
 
-    def update_image(self):
-        ''' update self.image, transforming it to the current angle. Recreate self .rect, .mask. '''
-
-        # get a new image by rotating the original image
-        self.image = transform.rotate(self.curr_image, -self.angle)
+    def get_rotated_image(self, angle_index: int) -> tuple[Surface, Mask, tuple[int, int]]:
+        ''' get the current image rotated to angle_index, rotating and caching it if not cached '''
+        KEY = (self.curr_image, self.ROTATION_STEP, angle_index)
+        cached = PLAYER_ROTATIONS.get(KEY)
+        if (cached == None):
+            PLAYER_ROTATIONS_COUNTER[1] += 1
+            IMG = transform.rotate(self.curr_image, -(angle_index * self.ROTATION_STEP))
+            # get new mask for collision checking purposes
+            #   > "A new mask needs to be recreated each time a sprite's image is changed  
+            #   > (e.g. if a new image is used or the existing image is rotated)."
+            #   https://www.pygame.org/docs/ref/sprite.html#pygame.sprite.collide_mask  
+            cached = (IMG, mask.from_surface(IMG), IMG.get_size())
+            PLAYER_ROTATIONS[KEY] = cached
+        else:
+            PLAYER_ROTATIONS_COUNTER[0] += 1
+        return cached
 
-        # get new mask for collision checking purposes
-        #   > "A new mask needs to be recreated each time a sprite's image is changed  
-        #   > (e.g. if a new image is used or the existing image is rotated)."
-        #   https://www.pygame.org/docs/ref/sprite.html#pygame.sprite.collide_mask  
-        self.mask = mask.from_surface(self.image)
+    def update_image(self):
+        ''' update self.image, transforming it to the current angle. Recreate self .rect, .mask.
+            * the angle is snapped to the nearest ROTATION_STEP, allowing rotations to be cached
+        '''
+        angle_index = round(self.angle / self.ROTATION_STEP) % self.N_ROTATIONS
+        self.image, self.mask, size = self.get_rotated_image(angle_index)
 
         # set rect to the new images rect bounds. used for blitting through group draw
-        self.rect = self.image.get_rect(center=self.position)
+        self.rect = Rect((0, 0), size)
+        self.rect.center = self.position
 
     def update(self):
         # note: map handles collision cooldown frames
@@ -1,78 +1,310 @@
-from typing import Callable
-from pygame import Surface, transform, mask
-from pygame.math import Vector2 as Vec2, lerp, clamp
-from pygame import Surface, SRCALPHA, transform, Rect, image
-from pygame.sprite import Sprite, Group, collide_mask, groupcollide
-from .PG_common import load_sprites_tuple
-from math import cos, sin, pi, radians
+import numpy as np
+from pygame import Surface, Rect, transform, mask
+from pygame.mask import Mask
+from pygame.math import Vector2 as Vec2
+from pygame.sprite import Sprite, Group
+from .PG_common import load_sprites_tuple, register_asset_cache, get_cache_counter
 
 
-class PG_Projectile(Sprite):
-    ''' projectile with a single image '''
-    def __init__(self,
-            group: Group,
-            global_projectile_group: Group,
-            damage: float,
-            image: Surface,
-            position: Vec2,
-            velocity: Vec2,
-        ):
-        Sprite.__init__(self, group, global_projectile_group)
-        self.group = group
-        self.damage = damage
+PROJECTILE_FRAMES: dict[tuple[str, int, float, float], tuple[tuple[Surface, ...], list]] = register_asset_cache('projectile frames', {})
+''' unrotated source frames and lazily filled angle buckets, keyed by (path, n_images, scalar, rotation_step) '''
+PROJECTILE_FRAMES_COUNTER = get_cache_counter('projectile frames')
+''' counts lookups of angle buckets '''
 
-        self.position = position.copy()
-        self.velocity = velocity.copy()
-        self.image = image
-        self.rect = self.image.get_rect(center=self.position)
-        self.mask = mask.from_surface(self.image)
 
-    def update(self):
-        self.mask = mask.from_surface(self.image)
-        self.position += self.velocity
-        self.rect.center = self.position
+def get_rotated_projectile_frames(path: str, n_images: int, scalar: float, rotation_step: float,
+                                  angle: float) -> tuple[tuple[Surface, ...], int, tuple[Mask, ...], tuple[float, ...]]:
+    ''' get the spritesheet frames scaled and rotated to the angle bucket closest to angle.
+        * returns the same format as load_sprites_tuple, with tuples of the matching masks and mask reaches appended.
+            See get_mask_reach
+        * the spritesheet is loaded once, and each bucket is rotated once. Shared between all spawners.
+    '''
+    KEY = (path, n_images, scalar, rotation_step)
+    cached = PROJECTILE_FRAMES.get(KEY)
+    if (cached == None):
+        SOURCE_FRAMES = load_sprites_tuple(path, n_images, 1.0, None)[0]
+        cached = (SOURCE_FRAMES, [None] * max(1, round(360.0 / rotation_step)))
+        PROJECTILE_FRAMES[KEY] = cached
 
+    SOURCE_FRAMES, buckets = cached
+    angle_index = round(angle / rotation_step) % len(buckets)
+    bucket = buckets[angle_index]
+    if (bucket == None):
+        PROJECTILE_FRAMES_COUNTER[1] += 1
+        bucket_angle = (angle_index * rotation_step)
+        IMAGES = tuple(transform.rotozoom(IMG, bucket_angle, scalar) for IMG in SOURCE_FRAMES)
+        MASKS = tuple(mask.from_surface(IMG) for IMG in IMAGES)
+        bucket = (IMAGES, int(n_images - 1), MASKS, tuple(get_mask_reach(MASK) for MASK in MASKS))
+        buckets[angle_index] = bucket
+    else:
+        PROJECTILE_FRAMES_COUNTER[0] += 1
+    return bucket
 
-class PG_Projectile_Cycle(PG_Projectile):
-    ''' projectile that cycles between spritesheet images '''
-    def __init__(self,
-            group: Group,
-            global_projectile_group: Group,
-            damage: float,
-            IMAGES: tuple[tuple[Surface, ...], int],
-            position: Vec2,
-            velocity: Vec2,
-            cycle_frequency: int
-        ):
-        super().__init__(group, global_projectile_group, damage, IMAGES[0][0], position, velocity)
-        self.curr_image_index = 0
-        self.IMAGES = IMAGES[0]
-        self.N_IMAGES = IMAGES[1]
-        self.cycle_frequency = cycle_frequency
-        self.updates_until_cycle = cycle_frequency
-
-    def cycle_active_image(self):
-        if (self.curr_image_index >= self.N_IMAGES):
-            self.curr_image_index = 0
-        else:
-            self.curr_image_index += 1
-        self.image = self.IMAGES[self.curr_image_index]
+def get_mask_reach(image_mask: Mask) -> float:
+    ''' distance from the mask center to its farthest set pixel.
+        * projectiles are elongated along their velocity, so this is the distance to the tip
+    '''
+    OUTLINE = image_mask.outline()
+    if not (OUTLINE):
+        return 0.0
+    CENTER = Vec2(image_mask.get_size()) / 2
+    return max(CENTER.distance_to(point) for point in OUTLINE)
+
+
+class PG_Projectile_Field:
+    ''' Vectorized storage and simulation of every projectile on a map.
+        Each projectile is a row in a set of NumPy arrays, rather than a sprite.
+        * the arrays are a bounded pool, allocated once. Dead rows are recycled in place by new shots,
+            so the pool arrays are never reallocated. Compacting on kills uses small temporary arrays
+        * update advances all projectiles in one step, and culls those outside bounds in bulk
+        * draw blits all projectiles through a single Surface.blits call
+        * images and masks are registered once per spritesheet frame tuple, rows store an index to them.
+            images and masks are shared between rows, and must not be modified
+        * killing rows compacts the arrays, so row indices are only valid until the next kill/update
+
+        Parameters
+        ---
+        bounds: Rect
+            projectiles with a center outside bounds are culled on update
+        capacity: int
+            pool size, i.e. max. projectiles alive at once. Shots added to a full pool are dropped
+    '''
+
+    def __init__(self, bounds: Rect, capacity: int):
+        if (capacity < 1):
+            raise ValueError(f'projectile pool capacity must be positive, got {capacity}')
+        self.bounds = bounds.copy()
+        self.capacity = int(capacity)
+        self.n = int(0)
+        ''' number of active rows. rows [0, n) are active '''
+        self.high_water_mark = int(0)
+        ''' max. active rows at once since creation '''
+        self.n_dropped = int(0)
+        ''' shots dropped due to a full pool since creation '''
+        self.n_mask_tests = int(0)
+        ''' mask overlap checks by collide_rect_mask. Read and reset by the map profiler '''
+
+        self._allocate_arrays(self.capacity)
+
+        # registered images. per-image sizes are kept as arrays for vectorized lookups
+        self.IMAGES: list[Surface] = []
+        self.MASKS: list[Mask] = []
+        self.image_sizes = np.zeros((0, 2), dtype=np.int32)
+        self.IMAGE_REACH: list[float] = []
+        ''' distance from the center to the sampled tip point of each image '''
+        self.registered_frames: dict[int, tuple[int, tuple]] = {}
+        ''' id(frames) => (base image index, frames). The frames are kept to keep the id valid '''
+
+        self.drawn_rects: list[Rect] = []
+        ''' areas projectiles were drawn at by the last draw call '''
+
+    def _allocate_arrays(self, capacity: int):
+        self.position = np.zeros((capacity, 2), dtype=np.float64)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float64)
+        self.damage = np.zeros(capacity, dtype=np.float64)
+        self.img_base = np.zeros(capacity, dtype=np.int32)
+        ''' index of the first registered image of the projectiles frames '''
+        self.img_count = np.ones(capacity, dtype=np.int32)
+        ''' number of frames to cycle through '''
+        self.cycle_period = np.zeros(capacity, dtype=np.int32)
+        ''' updates per frame when cycling. 0 => never cycle '''
+        self.age = np.zeros(capacity, dtype=np.int32)
+        ''' updates since spawn '''
+        self.alive = np.zeros(capacity, dtype=np.bool_)
+        self.tip_offset = np.zeros((capacity, 2), dtype=np.float64)
+        ''' offset from the center to the tip, for point-sampled collision '''
+
+    def _compact(self, keep: np.ndarray):
+        ''' keep only the active rows where keep is True, preserving order '''
+        n_keep = int(np.count_nonzero(keep))
+        if (n_keep == self.n):
+            return
+        for arr in (self.position, self.velocity, self.tip_offset, self.damage, self.img_base,
+                    self.img_count, self.cycle_period, self.age):
+            arr[:n_keep] = arr[:self.n][keep]
+        self.alive[:n_keep] = True
+        self.alive[n_keep:self.n] = False
+        self.n = n_keep
+
+    def register_frames(self, frames: tuple[tuple[Surface, ...], int, tuple[Mask, ...], tuple[float, ...]]) -> int:
+        ''' register a tuple of frames as given by get_rotated_projectile_frames.
+            * returns the image index of the first frame. Registering the same tuple again is a lookup.
+        '''
+        registered = self.registered_frames.get(id(frames))
+        if (registered != None):
+            return registered[0]
+
+        base = len(self.IMAGES)
+        self.IMAGES.extend(frames[0])
+        self.MASKS.extend(frames[2])
+        sizes = np.array([IMG.get_size() for IMG in frames[0]], dtype=np.int32)
+        self.image_sizes = np.concatenate((self.image_sizes, sizes))
+        # computed once per bucket, rather than once per field
+        self.IMAGE_REACH.extend(frames[3])
+        self.registered_frames[id(frames)] = (base, frames)
+        return base
+
+    def add(self, position: Vec2, velocity: Vec2, damage: float,
+            img_base: int, img_count: int, cycle_frequency: int) -> bool:
+        ''' add a projectile by recycling the first dead row. position is the projectile center.
+            * cycle_frequency follows the projectile config; 0 => a single image
+            * returns False, and drops the shot, if the pool is full
+        '''
+        i = self.n
+        if (i == self.capacity):
+            self.n_dropped += 1
+            return False
+
+        POS = self.position[i]
+        POS[0] = position[0]
+        POS[1] = position[1]
+        VELO = self.velocity[i]
+        VELO[0] = velocity[0]
+        VELO[1] = velocity[1]
+        # velocity is constant, so the tip offset is too
+        speed = Vec2(velocity).length()
+        reach = (self.IMAGE_REACH[img_base] / speed) if (speed) else 0.0
+        TIP = self.tip_offset[i]
+        TIP[0] = velocity[0] * reach
+        TIP[1] = velocity[1] * reach
+        self.damage[i] = damage
+        self.img_base[i] = img_base
+        self.img_count[i] = img_count
+        # a cycling projectile swaps image after cycle_frequency updates without swapping
+        self.cycle_period[i] = (cycle_frequency + 1) if (cycle_frequency) else 0
+        self.age[i] = 0
+        self.alive[i] = True
+        self.n += 1
+        if (self.n > self.high_water_mark):
+            self.high_water_mark = self.n
+        return True
+
+    def get_image_indices(self) -> np.ndarray:
+        ''' current registered image index of each active row '''
+        n = self.n
+        period = self.cycle_period[:n]
+        frame = np.where(period > 0, (self.age[:n] // np.maximum(period, 1)) % self.img_count[:n], 0)
+        return self.img_base[:n] + frame
+
+    def get_topleft(self, image_indices: np.ndarray) -> np.ndarray:
+        ''' integer top left position of each active row, given its image indices '''
+        return (self.position[:self.n] - (self.image_sizes[image_indices] / 2)).astype(np.int32)
 
     def update(self):
-        if (self.updates_until_cycle == 0):
-            self.updates_until_cycle = self.cycle_frequency
-            self.cycle_active_image()
-        else:
-            self.updates_until_cycle -= 1
+        ''' advance all projectiles by their velocity, then cull those outside of bounds '''
+        n = self.n
+        if (n == 0):
+            return
+        self.position[:n] += self.velocity[:n]
+        self.age[:n] += 1
+
+        X = self.position[:n, 0]
+        Y = self.position[:n, 1]
+        B = self.bounds
+        in_bounds = (X >= B.left) & (X < B.right) & (Y >= B.top) & (Y < B.bottom)
+        if not (in_bounds.all()):
+            self._compact(in_bounds)
+
+    def draw(self, surface: Surface) -> list[Rect]:
+        ''' blit all projectiles in a single call. Returns and stores the drawn areas. '''
+        if (self.n == 0):
+            self.drawn_rects = []
+            return self.drawn_rects
+
+        img_indices = self.get_image_indices()
+        TOPLEFT = self.get_topleft(img_indices).tolist()
+        IMAGES = self.IMAGES
+        self.drawn_rects = surface.blits(
+            [(IMAGES[i], pos) for i, pos in zip(img_indices.tolist(), TOPLEFT)]
+        )
+        return self.drawn_rects
+
+    def collide_rect_mask(self, target_mask: Mask, target_rect: Rect) -> list[int]:
+        ''' get the rows whose masks overlap the given mask, positioned at target_rect '''
+        if (self.n == 0):
+            return []
+        img_indices = self.get_image_indices()
+        TOPLEFT = self.get_topleft(img_indices)
+        SIZE = self.image_sizes[img_indices]
+
+        # rect check prior to mask check
+        X = TOPLEFT[:, 0]
+        Y = TOPLEFT[:, 1]
+        R = target_rect
+        candidates = np.flatnonzero(
+            (X < R.right) & ((X + SIZE[:, 0]) > R.left) & (Y < R.bottom) & ((Y + SIZE[:, 1]) > R.top)
+        )
 
-        super().update()
+        self.n_mask_tests += len(candidates)
+        hits = []
+        for i in candidates.tolist():
+            offset = (int(X[i] - R.x), int(Y[i] - R.y))
+            if (target_mask.overlap(self.MASKS[img_indices[i]], offset)):
+                hits.append(i)
+        return hits
+
+    def collide_occupancy(self, occupancy: np.ndarray) -> np.ndarray:
+        ''' point-sample fast path for terrain collision.
+            get the rows whose center or tip point is set in the occupancy bitmap.
+            * occupancy: bool array of shape (w, h) covering the field bounds, indexed [x, y]
+            * no masks are involved; intended for small projectiles against large, opaque terrain
+        '''
+        n = self.n
+        if (n == 0):
+            return np.empty(0, dtype=np.intp)
+
+        # sample centers and tips in a single gather
+        POINTS = np.empty((2 * n, 2), dtype=np.float64)
+        POINTS[:n] = self.position[:n]
+        np.add(self.position[:n], self.tip_offset[:n], out=POINTS[n:])
+        POINTS -= self.bounds.topleft
+        XY = POINTS.astype(np.intp)
+        # centers are within bounds after update, but tips may not be
+        np.clip(XY, 0, (np.array(occupancy.shape) - 1), out=XY)
+
+        HITS = occupancy[XY[:, 0], XY[:, 1]]
+        return np.flatnonzero(HITS[:n] | HITS[n:])
+
+    def get_damage(self, rows: list[int]) -> float:
+        return float(self.damage[rows].sum())
+
+    def kill(self, rows: list[int] | np.ndarray):
+        ''' remove the given rows. Row indices shift afterwards. '''
+        if (len(rows) == 0):
+            return
+        self.alive[rows] = False
+        self._compact(self.alive[:self.n].copy())
+
+    def clear(self):
+        ''' remove all projectiles '''
+        self.alive[:self.n] = False
+        self.n = int(0)
+        self.drawn_rects = []
+
+    def __len__(self):
+        return self.n
+
+    def get_pool_info(self) -> dict:
+        ''' pool usage, for tuning the map config projectile_pool_size '''
+        return {
+            'capacity': self.capacity,
+            'active': self.n,
+            'high_water_mark': self.high_water_mark,
+            'dropped': self.n_dropped
+        }
+
+    def __str__(self):
+        msg = f'PG_Projectile_Field: projectiles={self.n}, capacity={self.capacity}, '
+        msg += f'high_water_mark={self.high_water_mark}, dropped={self.n_dropped}, images={len(self.IMAGES)}'
+        return msg
 
 
 class PG_Projectile_Spawner(Sprite):
+    ''' fires projectiles from its position, adding them to the given PG_Projectile_Field '''
     def __init__(self,
             cf_projectile_spawner: dict,
             group: Group,
-            global_projectile_group: Group,
+            projectile_field: PG_Projectile_Field,
             position: Vec2 | tuple[int, int],
             P_velocity: Vec2 | tuple[int, int],
         ):
@@ -89,31 +321,24 @@ class PG_Projectile_Spawner(Sprite):
         self.P_IMAGE_SCALAR = float(cf_projectile['image_scalar'])
         self.P_DAMAGE = float(cf_projectile['damage'])
         self.P_VELOCITY = Vec2(P_velocity)
-        self.global_projectile_group = global_projectile_group
+        self.projectile_field = projectile_field
         
         self.P_spritesheet_path = str(cf_projectile['spritesheet']['path'])
         self.P_spritesheet_n_images = int(cf_projectile['spritesheet']['n_images'])
+        self.P_ROTATION_STEP = float(cf_projectile['rotation_step'])
 
-        # load + scale and rotate images
+        # get the scaled and rotated images from the shared cache, and register them with the field
         self.P_angle = Vec2(0.0, 0.0).angle_to(Vec2(self.P_VELOCITY.x, -self.P_VELOCITY.y))
-        IMG_SOURCE = load_sprites_tuple(
-            self.P_spritesheet_path,
-            self.P_spritesheet_n_images,
-            self.P_IMAGE_SCALAR,
-            self.P_angle
-        )
+        self.P_angle_bucket: int | None = None
+        ''' rotation_step bucket of the frames in use. Rotating within a bucket keeps the frames '''
+        self.set_projectile_frames()
 
-        self.spawn_projectile_func: Callable
+        # single image projectiles only ever use the first frame
         if (self.P_IMG_CYCLE_FREQUENCY == 0):
-            self.spawn_projectile_func = self.spawn_projectile
-            self.P_IMG_SOURCE = IMG_SOURCE[0][0]
-            self.ORIGINAL_SURF = Surface((self.P_IMG_SOURCE.get_width(), self.P_IMG_SOURCE.get_height()), flags=SRCALPHA)
-            self.ORIGINAL_SURF.blit(self.P_IMG_SOURCE, self.ORIGINAL_SURF.get_rect())
+            self.P_N_FRAMES = int(1)
         else:
-            self.spawn_projectile_func = self.spawn_cycle_projectile
-            self.P_IMG_SOURCE = IMG_SOURCE
+            self.P_N_FRAMES = self.P_spritesheet_n_images
 
-        self.projectiles = Group()
         self.updates_until_fire = 0
         self.updates_until_cycle = 0
         self.updates_until_wake_up = None
@@ -122,61 +347,55 @@ class PG_Projectile_Spawner(Sprite):
             self.updates_until_wake_up = int(self.SLEEP_DURATION)
             self.projectiles_until_sleep = int(self.N_PROJECTILES_BEFORE_SLEEP)
 
+    def set_projectile_frames(self):
+        ''' set the image index of new projectiles to the frames for the current angle '''
+        # rotating turrets call this every update, but only cross into a new bucket every few
+        ANGLE_BUCKET = round(self.P_angle / self.P_ROTATION_STEP)
+        if (ANGLE_BUCKET == self.P_angle_bucket):
+            return
+        self.P_angle_bucket = ANGLE_BUCKET
+        FRAMES = get_rotated_projectile_frames(
+            self.P_spritesheet_path,
+            self.P_spritesheet_n_images,
+            self.P_IMAGE_SCALAR,
+            self.P_ROTATION_STEP,
+            self.P_angle
+        )
+        self.P_IMG_BASE = self.projectile_field.register_frames(FRAMES)
+
     def rotate_projectile_angle(self, new_velo: Vec2):
         ''' rotate the direction of NEW projectiles. fired ones remain the same '''
         self.P_VELOCITY = Vec2(new_velo)
         self.P_angle = Vec2(0.0, 0.0).angle_to(Vec2(self.P_VELOCITY.x, -self.P_VELOCITY.y))
-
-        if (self.P_IMG_CYCLE_FREQUENCY == 0):
-            self.P_IMG_SOURCE = transform.rotate(self.ORIGINAL_SURF, self.P_angle)
-        else:
-            IMG_SOURCE = load_sprites_tuple(
-                self.P_spritesheet_path,
-                self.P_spritesheet_n_images,
-                self.P_IMAGE_SCALAR,
-                self.P_angle
-            )
-            self.P_IMG_SOURCE = IMG_SOURCE
+        self.set_projectile_frames()
 
     def rotate_by_degrees(self, delta_angle):
         new_velo = self.P_VELOCITY.rotate(delta_angle)
         self.rotate_projectile_angle(new_velo)
 
-    def spawn_cycle_projectile(self):
-        PG_Projectile_Cycle(
-            self.projectiles,
-            self.global_projectile_group,
-            self.P_DAMAGE,
-            self.P_IMG_SOURCE,
-            self.position, 
-            self.P_VELOCITY, 
-            self.P_IMG_CYCLE_FREQUENCY
-        )
-        self.updates_until_fire = self.RATE_OF_FIRE
-
     def spawn_projectile(self):
-        PG_Projectile(
-            self.projectiles,
-            self.global_projectile_group,
-            self.P_DAMAGE,
-            self.P_IMG_SOURCE,
+        self.projectile_field.add(
             self.position,
-            self.P_VELOCITY
+            self.P_VELOCITY,
+            self.P_DAMAGE,
+            self.P_IMG_BASE,
+            self.P_N_FRAMES,
+            self.P_IMG_CYCLE_FREQUENCY
         )
         self.updates_until_fire = self.RATE_OF_FIRE
 
-    def update(self, surface: Surface, delta_angle: float):
+    def update(self, delta_angle: float):
         if (delta_angle):
             self.rotate_by_degrees(delta_angle)
 
         if (self.updates_until_fire == 0):
             if (self.SLEEP_DURATION == None):
-                self.spawn_projectile_func()
+                self.spawn_projectile()
             else:
                 if (self.updates_until_wake_up > 0):
                     self.updates_until_wake_up -= 1
                 else:
-                    self.spawn_projectile_func()
+                    self.spawn_projectile()
                     self.projectiles_until_sleep -= 1
                     if (self.projectiles_until_sleep == 0):
                         self.updates_until_wake_up = int(self.SLEEP_DURATION)
@@ -184,6 +403,3 @@ class PG_Projectile_Spawner(Sprite):
         else:
             self.updates_until_fire -= 1
 
-        self.projectiles.draw(surface)
-        self.projectiles.update()
-
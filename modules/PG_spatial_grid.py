@@ -0,0 +1,86 @@
+from pygame import Rect
+from pygame.sprite import Sprite
+
+
+class PG_Spatial_Grid:
+    ''' Uniform grid spatial index, used as a broad phase for collision checks.
+        * sprites are bucketed into every cell their rect overlaps
+        * meant for sprites that never move after insertion, i.e. terrain.
+            moving sprites should be checked directly instead.
+        * query only returns candidates. rect/mask checks are left to the caller.
+
+        Parameters
+        ---
+        bounds: Rect
+            area covered by the grid. rects outside the bounds are clamped to the edge cells
+        cell_size: int
+            width and height of each cell, in pixels
+    '''
+
+    def __init__(self, bounds: Rect, cell_size: int):
+        self.bounds = bounds.copy()
+        self.CELL_SIZE = int(cell_size)
+
+        # ceil division, so the last row/col covers any remainder
+        self.N_COLS = int(-(-self.bounds.w // self.CELL_SIZE))
+        self.N_ROWS = int(-(-self.bounds.h // self.CELL_SIZE))
+        self.MAX_COL = int(self.N_COLS - 1)
+        self.MAX_ROW = int(self.N_ROWS - 1)
+
+        self.cells: list[list[Sprite]] = [[] for _ in range(self.N_COLS * self.N_ROWS)]
+        ''' flat list of cells, indexed by (row * N_COLS + col) '''
+        self.n_sprites = int(0)
+
+    def _cell_range(self, rect: Rect) -> tuple[int, int, int, int]:
+        ''' returns (min_col, max_col, min_row, max_row) of the cells overlapped by rect '''
+        left = (rect.left - self.bounds.left) // self.CELL_SIZE
+        right = (rect.right - 1 - self.bounds.left) // self.CELL_SIZE
+        top = (rect.top - self.bounds.top) // self.CELL_SIZE
+        bottom = (rect.bottom - 1 - self.bounds.top) // self.CELL_SIZE
+
+        # clamp to the grid, placing anything outside the bounds in the edge cells
+        return (
+            min(max(left, 0), self.MAX_COL),
+            min(max(right, 0), self.MAX_COL),
+            min(max(top, 0), self.MAX_ROW),
+            min(max(bottom, 0), self.MAX_ROW)
+        )
+
+    def insert(self, sprite: Sprite):
+        ''' add the sprite to every cell its rect overlaps '''
+        min_col, max_col, min_row, max_row = self._cell_range(sprite.rect)
+        for row in range(min_row, max_row + 1):
+            row_offset = row * self.N_COLS
+            for col in range(min_col, max_col + 1):
+                self.cells[row_offset + col].append(sprite)
+        self.n_sprites += 1
+
+    def insert_all(self, sprites):
+        for sprite in sprites:
+            self.insert(sprite)
+
+    def query(self, rect: Rect) -> list[Sprite] | set[Sprite]:
+        ''' get all sprites sharing a cell with the given rect.
+            * returns the cell list itself if rect is within a single cell. do not modify the result.
+        '''
+        min_col, max_col, min_row, max_row = self._cell_range(rect)
+
+        if (min_col == max_col) and (min_row == max_row):
+            # typical case for small sprites, no need to merge cells
+            return self.cells[min_row * self.N_COLS + min_col]
+
+        # sprites may span several cells; use a set to avoid duplicates
+        found: set[Sprite] = set()
+        for row in range(min_row, max_row + 1):
+            row_offset = row * self.N_COLS
+            for col in range(min_col, max_col + 1):
+                found.update(self.cells[row_offset + col])
+        return found
+
+    def clear(self):
+        for cell in self.cells:
+            cell.clear()
+        self.n_sprites = int(0)
+
+    def __str__(self):
+        return f'PG_Spatial_Grid: cells={self.N_COLS}x{self.N_ROWS}, cell_size={self.CELL_SIZE}, sprites={self.n_sprites}'
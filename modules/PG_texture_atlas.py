@@ -0,0 +1,158 @@
+''' Disk backed atlas of pre-decoded images, to skip PNG decoding and transforms on startup and map load.
+
+    The atlas is a directory of two files:
+    * atlas.bin: the final, scaled and rotated frames of every baked asset, as raw RGBA pixel buffers
+    * atlas.json: the index. Per asset, its key (see PG_common.get_asset_key) and the offset and size of each frame,
+        along with the modification time and size of every source file at the time of baking
+
+    The data file is memory mapped, and frames are created with pygame.image.frombuffer, without copying.
+    Assets whose source file changed since baking are ignored, and decoded as usual.
+    Bake with tools/bake_atlas.py. Loaded by the app, through PG_common.set_texture_atlas
+'''
+
+import json
+import mmap
+from os import makedirs, stat, replace as os_replace
+from os.path import join as os_path_join, isfile
+
+from pygame import Surface, image
+
+from .PG_common import decode_frames, get_asset_key
+
+
+ATLAS_VERSION = int(1)
+''' increment when the atlas format changes. Invalidates all baked atlases. '''
+
+ATLAS_INDEX_FILE = 'atlas.json'
+ATLAS_DATA_FILE = 'atlas.bin'
+PIXEL_FORMAT = 'RGBA'
+BYTES_PER_PIXEL = int(4)
+
+
+def get_source_stamp(path: str) -> list[int]:
+    ''' [modification time (ns), size] of a source file. A changed stamp invalidates the assets baked from it '''
+    STAT = stat(path)
+    return [int(STAT.st_mtime_ns), int(STAT.st_size)]
+
+
+class PG_Texture_Atlas:
+    ''' Read-only view of a baked atlas. See the module docstring.
+        * the data file is mapped copy-on-write, so writes to a frame never reach the file.
+            frames are shared through the asset cache, and must not be modified regardless
+        * the mapping stays open for the lifetime of the object, as the frames reference it
+
+        Parameters
+        ---
+        atlas_dir: directory holding the atlas files. Raises OSError or ValueError if missing or invalid
+    '''
+
+    def __init__(self, atlas_dir: str):
+        self.atlas_dir = atlas_dir
+        with open(os_path_join(atlas_dir, ATLAS_INDEX_FILE), 'r') as f:
+            INDEX: dict = json.load(f)
+        if (INDEX.get('version') != ATLAS_VERSION) or (INDEX.get('pixel_format') != PIXEL_FORMAT):
+            raise ValueError(f'atlas in "{atlas_dir}" was baked by a different atlas version')
+
+        self.data_size = int(INDEX['data_size'])
+        self.DATA: mmap.mmap | None = None
+        with open(os_path_join(atlas_dir, ATLAS_DATA_FILE), 'rb') as f:
+            if (self.data_size > 0):
+                # the mapping outlives the file object
+                self.DATA = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if (self.DATA != None) and (len(self.DATA) != self.data_size):
+            raise ValueError(f'atlas data in "{atlas_dir}" does not match its index')
+
+        # only keep assets whose source file is unchanged since baking
+        VALID_SOURCES = set()
+        for path, baked_stamp in INDEX['sources'].items():
+            if (isfile(path)) and (get_source_stamp(path) == baked_stamp):
+                VALID_SOURCES.add(path)
+
+        self.entries: dict[tuple, list[list[int]]] = {}
+        ''' asset key => [[offset, width, height], ...] per frame '''
+        self.n_stale = 0
+        for asset in INDEX['assets']:
+            KEY = get_asset_key(*asset['key'])
+            if (KEY[0] in VALID_SOURCES):
+                self.entries[KEY] = asset['frames']
+            else:
+                self.n_stale += 1
+
+    def get_frames(self, key: tuple) -> tuple[Surface, ...] | None:
+        ''' frames of the asset with the given key, viewing the mapped data. None if not in the atlas '''
+        FRAMES = self.entries.get(key)
+        if (FRAMES == None):
+            return None
+        VIEW = memoryview(self.DATA)
+        images = []
+        for offset, width, height in FRAMES:
+            END = offset + (width * height * BYTES_PER_PIXEL)
+            images.append(image.frombuffer(VIEW[offset:END], (width, height), PIXEL_FORMAT))
+        return tuple(images)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        msg = f'PG_Texture_Atlas: dir="{self.atlas_dir}", assets={len(self.entries)}, stale={self.n_stale}, '
+        msg += f'size={(self.data_size / 1024):.1f} KiB'
+        return msg
+
+
+def load_texture_atlas(atlas_dir: str | None) -> PG_Texture_Atlas | None:
+    ''' get the atlas baked to atlas_dir, if any. Missing, unreadable or outdated atlases give None '''
+    if (atlas_dir == None) or not (isfile(os_path_join(atlas_dir, ATLAS_INDEX_FILE))):
+        return None
+    try:
+        return PG_Texture_Atlas(atlas_dir)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def bake_texture_atlas(atlas_dir: str, keys: list[tuple]) -> dict:
+    ''' decode the assets of the given keys (see PG_common.get_asset_key), and store their frames as an atlas.
+        * replaces any atlas in atlas_dir. Written to temp files first, so readers never see partial files
+        * needs no display
+        * returns a summary of the baked atlas
+    '''
+    makedirs(atlas_dir, exist_ok=True)
+    INDEX_PATH = os_path_join(atlas_dir, ATLAS_INDEX_FILE)
+    DATA_PATH = os_path_join(atlas_dir, ATLAS_DATA_FILE)
+
+    assets = []
+    sources: dict[str, list[int]] = {}
+    offset = 0
+    n_frames = 0
+    with open(f'{DATA_PATH}.tmp', 'wb') as f:
+        for KEY in sorted(set(get_asset_key(*key) for key in keys), key=repr):
+            path, n_images, scalar, angle = KEY
+            sources[path] = get_source_stamp(path)
+            frames = []
+            for IMG in decode_frames(path, n_images, scalar, angle):
+                PIXELS = image.tostring(IMG, PIXEL_FORMAT)
+                f.write(PIXELS)
+                frames.append([offset, IMG.get_width(), IMG.get_height()])
+                offset += len(PIXELS)
+            assets.append({'key': list(KEY), 'frames': frames})
+            n_frames += len(frames)
+
+    INDEX = {
+        'version': ATLAS_VERSION,
+        'pixel_format': PIXEL_FORMAT,
+        'data_size': offset,
+        'sources': sources,
+        'assets': assets,
+    }
+    with open(f'{INDEX_PATH}.tmp', 'w') as f:
+        json.dump(INDEX, f)
+    # the index is replaced last, so that its assets are never read before the data is complete
+    os_replace(f'{DATA_PATH}.tmp', DATA_PATH)
+    os_replace(f'{INDEX_PATH}.tmp', INDEX_PATH)
+
+    return {
+        'atlas_dir': atlas_dir,
+        'assets': len(assets),
+        'frames': n_frames,
+        'sources': len(sources),
+        'data_bytes': offset,
+    }
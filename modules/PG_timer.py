@@ -1,4 +1,5 @@
 from typing import Callable
+from time import perf_counter, sleep as os_sleep
 from pygame import time, event
 from pygame.sprite import Sprite, GroupSingle
 from pygame.event import Event
@@ -24,16 +25,28 @@ class PG_Timer(Timer):
         self.cf_timer = cf_timer
 
         self.FPS_LIMIT = int(self.cf_global['fps_limit'])
-        self.busy_loop = self.cf_timer['accurate_timing']
+        self.FRAME_TIME = float(1.0 / self.FPS_LIMIT)
+        ''' target seconds per frame '''
+        self.timing_mode: bool | str = self.cf_timer['accurate_timing']
         self.clock = time.Clock()
         self.first_init_done: bool = False
         self.custom_events = []
 
+        # hybrid timing: sleep until SLEEP_MARGIN before the deadline, then spin.
+        # measuring blocks for 10+ ms, so it is only done once hybrid timing is used
+        self.SLEEP_MARGIN: float | None = None
+        self.next_frame_time = float(0)
+
         # create a function pointer instead of checking conditions every frame
-        if (self.busy_loop):
+        if (self.timing_mode == 'hybrid'):
+            self.SLEEP_MARGIN = self.measure_sleep_margin()
+            self.tick_func: Callable = self.clock_tick_hybrid
+        elif (self.timing_mode == True):
             self.tick_func: Callable = self.clock_tick_busy
-        else:
+        elif (self.timing_mode == False):
             self.tick_func: Callable = self.clock_tick
+        else:
+            raise ValueError(f'CF_TIMER[\'accurate_timing\'] must be True, False or \'hybrid\', got {self.timing_mode}')
         
         self.container_group = GroupSingle()
 
@@ -157,6 +170,25 @@ class PG_Timer(Timer):
         ''' sets tick function to regular '''
         self.tick_func = self.clock_tick
 
+    def activate_hybrid_tick(self):
+        ''' sets tick function to sleep, then busy loop. Close to busy loop accuracy at a fraction of the CPU '''
+        if (self.SLEEP_MARGIN == None):
+            self.SLEEP_MARGIN = self.measure_sleep_margin()
+        self.next_frame_time = float(0)
+        self.tick_func = self.clock_tick_hybrid
+
+    def measure_sleep_margin(self, n_samples: int = 10) -> float:
+        ''' measure how much the OS oversleeps a short sleep. Returns seconds to leave for spinning.
+            * the worst sample is used, plus a small guard, capped to the frame time
+        '''
+        REQUESTED = 0.001
+        worst = float(0)
+        for _ in range(n_samples):
+            start = perf_counter()
+            os_sleep(REQUESTED)
+            worst = max(worst, (perf_counter() - start - REQUESTED))
+        return min((worst + 0.0002), self.FRAME_TIME)
+
     def get_fps_int(self):
         ''' get fps as an integer '''
         return int(self.clock.get_fps())
@@ -175,6 +207,26 @@ class PG_Timer(Timer):
         '''
         self.clock.tick_busy_loop(self.FPS_LIMIT)
 
+    def clock_tick_hybrid(self):
+        ''' limit time to next frame by sleeping for most of the remaining frame time,
+            then busy looping for the last SLEEP_MARGIN. Accuracy of clock_tick_busy, without spinning a whole frame.
+        '''
+        DEADLINE = self.next_frame_time
+        remaining = (DEADLINE - perf_counter())
+        if (remaining > self.SLEEP_MARGIN):
+            os_sleep(remaining - self.SLEEP_MARGIN)
+        while (perf_counter() < DEADLINE):
+            pass
+
+        now = perf_counter()
+        # keep a steady cadence, but don't try to catch up after falling more than a frame behind
+        self.next_frame_time = (DEADLINE + self.FRAME_TIME)
+        if (self.next_frame_time < now):
+            self.next_frame_time = (now + self.FRAME_TIME)
+
+        # no limit, the clock is only ticked to keep track of time and fps
+        self.clock.tick()
+
     def draw_ui(self, surface):
         ''' updates and draws FPS text, time text, etc., if set to be displayed. '''
         self.container_group.update(surface)
@@ -1,24 +1,51 @@
 from typing import Callable
 from pygame import Surface, transform, mask
+from pygame.mask import Mask
 from pygame.math import Vector2 as Vec2, lerp, clamp
 from pygame import Surface, SRCALPHA, transform, Rect, image
 from pygame.sprite import Sprite, Group, GroupSingle, collide_mask, groupcollide
-from .PG_common import load_image
-from .PG_projectiles import PG_Projectile_Spawner
+from .PG_common import load_image, register_asset_cache, get_cache_counter
+from .PG_projectiles import PG_Projectile_Spawner, PG_Projectile_Field
 
 from math import cos, sin, pi
 
+
+ROTATION_RINGS: dict[tuple[str, float, float], tuple[tuple[Surface, Mask], ...]] = register_asset_cache('turret rotation rings', {})
+''' pre-rendered turret rotations, keyed by (path, image_scalar, rotation_step). See get_rotation_ring. '''
+ROTATION_RINGS_COUNTER = get_cache_counter('turret rotation rings')
+
+
+def get_rotation_ring(cf_turret: dict, original_image: Surface) -> tuple[tuple[Surface, Mask], ...]:
+    ''' get a tuple of (image, mask) for every rotation_step in [0, 360) degrees.
+        * created on first call, then shared between all turrets using the same image and step
+    '''
+    KEY = (str(cf_turret['spritesheet']['path']), float(cf_turret['image_scalar']), float(cf_turret['rotation_step']))
+    ring = ROTATION_RINGS.get(KEY)
+    if (ring == None):
+        ROTATION_RINGS_COUNTER[1] += 1
+        step = KEY[2]
+        rotations = []
+        for i in range(max(1, round(360.0 / step))):
+            IMG = transform.rotate(original_image, -(i * step))
+            rotations.append((IMG, mask.from_surface(IMG)))
+        ring = tuple(rotations)
+        ROTATION_RINGS[KEY] = ring
+    else:
+        ROTATION_RINGS_COUNTER[0] += 1
+    return ring
+
+
 class PG_Missile_Turret(Sprite):
     def __init__(self,
             cf_turret: dict,
             group: Group,
-            global_projectile_group: Group,
+            projectile_field: PG_Projectile_Field,
             position: Vec2 | tuple[int, int],
             angle: float
         ):
         Sprite.__init__(self, group)
 
-        self.global_projectile_group = global_projectile_group
+        self.projectile_field = projectile_field
         self.position = position
         self.angle = angle
         self.image_scalar = float(cf_turret['image_scalar'])
@@ -35,7 +62,7 @@ class PG_Missile_Turret(Sprite):
         self.SPAWNER = PG_Projectile_Spawner(
             self.cf_projectile_spawner,
             self.projectile_spawner_group,
-            self.global_projectile_group,
+            self.projectile_field,
             self.position,
             p_velo
         )
@@ -54,30 +81,36 @@ class PG_Missile_Turret(Sprite):
         self.rect = self.image.get_rect(center=self.position)
         self.mask = mask.from_surface(self.image)
 
+        if (self.ROTATION_RATE):
+            self.ROTATION_STEP = float(cf_turret['rotation_step'])
+            self.ROTATION_RING = get_rotation_ring(cf_turret, self.ORIGINAL_IMAGE)
+            ''' (image, mask) for each ROTATION_STEP. shared with other turrets of the same config '''
+            self.N_ROTATIONS = len(self.ROTATION_RING)
+
     def init(self, player: Sprite):
         for spawner in self.projectile_spawner_group.sprites():
             spawner.init(player)
 
     def update_image(self):
-        ''' update self.image, transforming it to the current angle. Recreate self .rect, .mask. '''
-        self.image = transform.rotate(self.ORIGINAL_IMAGE, -self.angle)
-        self.mask = mask.from_surface(self.image)
+        ''' update self.image and .mask to the pre-rendered rotation closest to the current angle. Recreate .rect '''
+        angle_index = round(self.angle / self.ROTATION_STEP) % self.N_ROTATIONS
+        self.image, self.mask = self.ROTATION_RING[angle_index]
         self.rect = self.image.get_rect(center=self.position)
 
-    def update(self, surface: Surface):
+    def update(self):
         if (self.ROTATION_RATE):
             if (self.CHECK_IF_ROTATE):
                 wake_time = self.SPAWNER.updates_until_wake_up
 
                 if ((wake_time < self.PRE_SHOT_DELAY) or (wake_time > self.POST_SHOT_DELAY_RANGE)):
-                    self.projectile_spawner_group.update(surface, float(0))
+                    self.projectile_spawner_group.update(float(0))
                 else:
                     self.angle += self.ROTATION_RATE
-                    self.projectile_spawner_group.update(surface, self.ROTATION_RATE)
+                    self.projectile_spawner_group.update(self.ROTATION_RATE)
             else:
                 self.angle += self.ROTATION_RATE
-                self.projectile_spawner_group.update(surface, self.ROTATION_RATE)
+                self.projectile_spawner_group.update(self.ROTATION_RATE)
 
             self.update_image()
         else:
-            self.projectile_spawner_group.update(surface, float(0))
+            self.projectile_spawner_group.update(float(0))
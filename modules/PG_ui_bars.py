@@ -1,11 +1,13 @@
 from typing import Callable
 
 ## import needed pygame modules
-from pygame import Surface, Rect, Color, transform, image
+from pygame import Surface, Rect, Color, transform
 from pygame.math import lerp
 from pygame.sprite import Sprite
 from pygame.draw import rect as draw_rect
 
+from .PG_common import load_image
+
 
 class UI_Bar(Sprite):
     def __init__(self,
@@ -164,7 +166,7 @@ class UI_Icon_Bar_Horizontal(UI_Bar):
         self.icon_bg = cf_icon_bar['icon_bg']
 
         self.icon_size = (self.rect.h, self.rect.h)
-        ICON_IMG = image.load(self.icon_path).convert_alpha()
+        ICON_IMG = load_image(self.icon_path, 1.0, None)
 
         if (self.icon_bg):
             # create background/border for icon
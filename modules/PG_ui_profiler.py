@@ -0,0 +1,100 @@
+from typing import Callable
+
+## import needed pygame modules
+from pygame import Surface, Color, SRCALPHA
+from pygame.sprite import Sprite
+from pygame.font import Font
+
+from .PG_ui_bars import UI_Bar
+
+
+class UI_Profiler_Overlay(Sprite):
+    ''' debug overlay of live profiler values, as rows of labelled horizontal bars.
+        Intended as a child of a UI_Sprite_Container, i.e. the TEXT_CONTAINER of PG_Timer.
+
+        Parameters
+        ---
+        cf_overlay: see 'profiler_overlay' in config/cf_timer.py
+        rows: list of (label, value_getter, max_val, value_format)
+            * value_getter: takes no parameters, returns the current value as a float, or None if unknown
+            * max_val: value of a full bar. None => the highest value seen so far
+            * value_format: format string for the value, i.e. '{:.2f} ms'
+        refresh_func: called once before the rows are read, i.e. to compute shared statistics. May be None
+        ---
+        * values are read, and the overlay re-rendered, once every refresh_frames frames.
+            the image is kept in between, so the cost of the overlay does not scale with the frame rate
+    '''
+
+    def __init__(self,
+            cf_overlay: dict,
+            cf_global: dict,
+            rows: list[tuple[str, Callable[[], float | None], float | None, str]],
+            refresh_func: Callable | None,
+            position: tuple[int, int]
+        ):
+        Sprite.__init__(self)
+        self.cf_overlay = cf_overlay
+        self.cf_global = cf_global
+        self.ref_id = cf_overlay['ref_id']
+        self.ROWS = rows
+        self.REFRESH_FUNC = refresh_func
+
+        self.REFRESH_FRAMES = int(cf_overlay['refresh_frames'])
+        self.ROW_HEIGHT = int(cf_overlay['row_height'])
+        self.LABEL_WIDTH = int(cf_overlay['label_width'])
+
+        cf_font = cf_overlay['font']
+        self.font = Font(str(cf_font['path']), int(cf_font['size']))
+        self.font_antialias: bool = cf_font['antialias']
+        self.font_color = Color(cf_font['color'])
+
+        # a single bar, redrawn and blitted for each row
+        self.BAR = UI_Bar(cf_overlay['cf_bar'], cf_global, None, (0, 0), cf_overlay['bar_size'])
+        self.BAR_OFFSET_Y = int((self.ROW_HEIGHT - self.BAR.rect.h) / 2)
+
+        WIDTH = (self.LABEL_WIDTH + self.BAR.rect.w)
+        HEIGHT = (len(self.ROWS) * self.ROW_HEIGHT)
+        self.image = Surface((WIDTH, HEIGHT), flags=SRCALPHA)
+        self.rect = self.image.get_rect()
+        self.rect.topleft = position
+
+        self.peaks: list[float] = [0.0] * len(self.ROWS)
+        ''' highest value seen per row, for rows without a max_val '''
+        self.frames_until_refresh = int(0)
+
+    def update(self):
+        ''' re-render every REFRESH_FRAMES frames '''
+        if (self.frames_until_refresh > 0):
+            self.frames_until_refresh -= 1
+            return
+        self.frames_until_refresh = (self.REFRESH_FRAMES - 1)
+        self.render()
+
+    def render(self):
+        ''' read every row, and redraw the overlay image '''
+        if (self.REFRESH_FUNC):
+            self.REFRESH_FUNC()
+
+        self.image.fill((0, 0, 0, 0))
+        for i, (label, value_getter, max_val, value_format) in enumerate(self.ROWS):
+            VALUE = value_getter()
+            if (VALUE == None):
+                weight = 0.0
+                text = f'{label} -'
+            else:
+                if (max_val == None):
+                    self.peaks[i] = max(self.peaks[i], VALUE)
+                    max_val = self.peaks[i]
+                weight = min(1.0, max(0.0, (VALUE / max_val))) if (max_val) else 0.0
+                text = f'{label} {value_format.format(VALUE)}'
+
+            Y = (i * self.ROW_HEIGHT)
+            TEXT_IMG = self.font.render(text, self.font_antialias, self.font_color)
+            self.image.blit(TEXT_IMG, (0, Y))
+            self.BAR.draw_horizontal_bar(weight)
+            self.image.blit(self.BAR.image, (self.LABEL_WIDTH, (Y + self.BAR_OFFSET_Y)))
+
+    def __str__(self):
+        msg = f'[{super().__str__()} : '
+        msg += f'rect="{self.rect}", rows={len(self.ROWS)}, ref_id={self.ref_id}]'
+        return msg
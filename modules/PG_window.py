@@ -40,6 +40,8 @@ class PG_Window:
         self.width = int(cf_window['width'])
         self.height = int(cf_window['height'])
         self.caption = str(cf_window['caption'])
+        self.dirty_rects: bool = cf_window['dirty_rects']
+        ''' whether maps should use dirty rect rendering '''
 
         if (self.fullscreen):
             self.surface = display.set_mode((self.width, self.height), vsync=self._vsync, flags=FULLSCREEN)
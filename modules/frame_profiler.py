@@ -0,0 +1,112 @@
+''' Per-phase frame timing in fixed-size ring buffers.
+
+    A frame is split into named phases. The caller adds the nanoseconds spent in each phase to the
+    current frame, then ends the frame, which stores it in the ring buffer and starts the next.
+    Phases that run more than once per frame, such as the ticks of a fixed timestep, add up.
+    Per-frame counts, i.e. of collision checks, are kept alongside the phases in the same way.
+
+    * storage is allocated once. The oldest frame is overwritten once the buffer is full
+    * statistics are over the frames in the buffer: a rolling window of the last n_frames frames
+    * has no notion of when to measure. PG_Map swaps to its profiled frame functions while enabled,
+        so that nothing is measured, and nothing is paid, while disabled
+'''
+
+import numpy as np
+
+
+class Frame_Profiler:
+    ''' ring buffer of per-phase frame times. See the module docstring.
+
+        Parameters
+        ---
+        phases: names of the phases, in the order they run. Phases are added by index
+        n_frames: frames kept in the ring buffer
+        counters: names of the per-frame counts. Counts are added by index
+    '''
+
+    def __init__(self, phases: tuple[str, ...], n_frames: int, counters: tuple[str, ...] = ()):
+        self.PHASES = tuple(phases)
+        self.COUNTERS = tuple(counters)
+        self.N_FRAMES = max(1, int(n_frames))
+        self.samples = np.zeros((self.N_FRAMES, len(self.PHASES)), dtype=np.int64)
+        ''' [frame, phase] => nanoseconds '''
+        self.count_samples = np.zeros((self.N_FRAMES, len(self.COUNTERS)), dtype=np.int64)
+        ''' [frame, counter] => count '''
+        self.frame: list[int] = [0] * len(self.PHASES)
+        ''' nanoseconds per phase of the current frame. A list, as adding to NumPy scalars is slower '''
+        self.frame_counts: list[int] = [0] * len(self.COUNTERS)
+        ''' counts of the current frame '''
+        self.index = int(0)
+        ''' row the next frame is stored in '''
+        self.n_stored = int(0)
+        self.n_total = int(0)
+        ''' frames ended since the last clear, including those overwritten '''
+
+    def end_frame(self):
+        ''' store the current frame, and start the next '''
+        self.samples[self.index] = self.frame
+        self.count_samples[self.index] = self.frame_counts
+        self.frame = [0] * len(self.PHASES)
+        self.frame_counts = [0] * len(self.COUNTERS)
+        self.index = (self.index + 1) % self.N_FRAMES
+        if (self.n_stored < self.N_FRAMES):
+            self.n_stored += 1
+        self.n_total += 1
+
+    def clear(self):
+        self.frame = [0] * len(self.PHASES)
+        self.frame_counts = [0] * len(self.COUNTERS)
+        self.index = int(0)
+        self.n_stored = int(0)
+        self.n_total = int(0)
+
+    def get_samples(self) -> np.ndarray:
+        ''' [frame, phase] nanoseconds of the stored frames, oldest first '''
+        if (self.n_stored < self.N_FRAMES):
+            return self.samples[:self.n_stored]
+        return np.roll(self.samples, -self.index, axis=0)
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        ''' rolling mean/p95/max of each phase, in milliseconds, over the stored frames.
+            * includes 'frame': the sum of all phases per frame
+            * empty if no frame is stored
+        '''
+        if (self.n_stored == 0):
+            return {}
+        SAMPLES = self.samples[:self.n_stored]
+        FRAMES = SAMPLES.sum(axis=1)
+        MEANS = SAMPLES.mean(axis=0)
+        P95S = np.percentile(SAMPLES, 95, axis=0)
+        MAXES = SAMPLES.max(axis=0)
+
+        stats = {}
+        for i, PHASE in enumerate(self.PHASES):
+            stats[PHASE] = {'mean': MEANS[i] / 1e6, 'p95': P95S[i] / 1e6, 'max': MAXES[i] / 1e6}
+        stats['frame'] = {'mean': FRAMES.mean() / 1e6, 'p95': np.percentile(FRAMES, 95) / 1e6, 'max': FRAMES.max() / 1e6}
+        # plain floats, so that the stats serialize as JSON
+        return {PHASE: {key: float(value) for key, value in STATS.items()} for PHASE, STATS in stats.items()}
+
+    def get_counter_stats(self) -> dict[str, dict[str, float]]:
+        ''' rolling mean/p95/max of each counter per frame, over the stored frames. Empty if no frame is stored '''
+        if (self.n_stored == 0) or not (self.COUNTERS):
+            return {}
+        SAMPLES = self.count_samples[:self.n_stored]
+        MEANS = SAMPLES.mean(axis=0)
+        P95S = np.percentile(SAMPLES, 95, axis=0)
+        MAXES = SAMPLES.max(axis=0)
+        return {
+            COUNTER: {'mean': float(MEANS[i]), 'p95': float(P95S[i]), 'max': float(MAXES[i])}
+            for i, COUNTER in enumerate(self.COUNTERS)
+        }
+
+    def format_stats(self) -> str:
+        STATS = self.get_stats()
+        lines = [f'  {"phase":<12} {"mean":>8} {"p95":>8} {"max":>8}  (ms, last {self.n_stored} frames)']
+        for PHASE, ROW in STATS.items():
+            lines.append(f'  {PHASE:<12} {ROW["mean"]:8.3f} {ROW["p95"]:8.3f} {ROW["max"]:8.3f}')
+        for COUNTER, ROW in self.get_counter_stats().items():
+            lines.append(f'  {COUNTER:<12} {ROW["mean"]:8.1f} {ROW["p95"]:8.1f} {ROW["max"]:8.1f}  (per frame)')
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return f'Frame_Profiler: phases={len(self.PHASES)}, frames={self.n_stored}/{self.N_FRAMES}, total={self.n_total}'
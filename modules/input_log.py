@@ -0,0 +1,159 @@
+''' Compact binary log of the inputs of a map session, for deterministic replay.
+
+    A map session is decided by its seed, its configs and the inputs it handled, at the tick each was handled.
+    The log holds exactly that:
+    * header: magic, version, map seed, map size, fps limit, a digest of the configs, and the map and player names
+    * body: one record per input, as the ticks since the previous record (unsigned LEB128 varint),
+        followed by a single Map_Input byte. Ticks without input cost nothing
+    * the log ends with an END record, at the final tick. A log without one was cut short, and replays up to its last input
+
+    The interval events fired by wall-clock timers are logged as inputs as well, so a replay
+    needs no timers. Written by PG_Map.start_input_log, replayed by tools/replay_session.py.
+'''
+
+import struct
+from enum import IntEnum
+from hashlib import sha1
+
+
+INPUT_LOG_VERSION = int(1)
+''' increment when the log format, or the meaning of a Map_Input, changes. Older logs are refused. '''
+
+INPUT_LOG_MAGIC = b'PGIL'
+INPUT_LOG_EXTENSION = '.pgil'
+
+HEADER = struct.Struct('<4sHqHHH20s')
+''' magic, version, seed, map width, map height, fps limit, config digest '''
+
+
+class Map_Input(IntEnum):
+    ''' everything that changes the state of a map outside of simulate_tick. See PG_Map.apply_input '''
+    PLAYER_IMG_CYCLE = 0
+    UPDATE_TERRAIN = 1
+    STEER_UP_PRESS = 2
+    STEER_DOWN_PRESS = 3
+    STEER_LEFT_PRESS = 4
+    STEER_RIGHT_PRESS = 5
+    THRUST_PRESS = 6
+    STEER_UP_RELEASE = 7
+    STEER_DOWN_RELEASE = 8
+    STEER_LEFT_RELEASE = 9
+    STEER_RIGHT_RELEASE = 10
+    THRUST_RELEASE = 11
+    DEATH_FRAME = 12
+    ''' a frame of the post-map death animation, which animates the coins and player without a tick '''
+    RESET = 13
+    END = 14
+    ''' last record of a complete log. Applies nothing '''
+
+
+def get_config_digest(*configs: dict) -> bytes:
+    ''' digest of the given configs. A replay with a different digest is likely to desync '''
+    return sha1(repr(configs).encode('utf-8')).digest()
+
+
+class Input_Log_Writer:
+    ''' writes an input log. See the module docstring.
+
+        Parameters
+        ---
+        path: file to write. Replaced if it exists
+        seed, map_size, fps: of the recorded map
+        config_digest: see get_config_digest
+        map_name, player_name: the 'name' of the cf_map and cf_player, to find them on replay
+    '''
+
+    def __init__(self, path: str, seed: int, map_size: tuple[int, int], fps: int, config_digest: bytes,
+                 map_name: str, player_name: str):
+        self.path = path
+        self.prev_tick = int(0)
+        self.n_inputs = int(0)
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(INPUT_LOG_MAGIC, INPUT_LOG_VERSION, int(seed), int(map_size[0]), int(map_size[1]),
+                                    int(fps), config_digest))
+        for name in (map_name, player_name):
+            NAME = name.encode('utf-8')
+            self.file.write(struct.pack('<H', len(NAME)))
+            self.file.write(NAME)
+
+    def write(self, tick: int, code: int):
+        ''' log an input, handled before simulating the given tick. Ticks must never decrease '''
+        delta = int(tick - self.prev_tick)
+        self.prev_tick = int(tick)
+        record = bytearray()
+        while (delta >= 0x80):
+            record.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        record.append(delta)
+        record.append(int(code))
+        self.file.write(record)
+        self.n_inputs += 1
+
+    def close(self, tick: int):
+        ''' end the log at the given tick. Safe to call more than once '''
+        if (self.file.closed):
+            return
+        self.write(tick, Map_Input.END)
+        self.file.close()
+
+    def __str__(self):
+        return f'Input_Log_Writer: path="{self.path}", inputs={self.n_inputs}, tick={self.prev_tick}'
+
+
+def read_input_log(path: str) -> tuple[dict, list[tuple[int, Map_Input]]]:
+    ''' read an input log. Raises ValueError if it is not a log of the current version.
+        returns (header, [(tick, input), ...]). See the module docstring
+    '''
+    with open(path, 'rb') as f:
+        DATA = f.read()
+    if (len(DATA) < HEADER.size):
+        raise ValueError(f'"{path}" is not an input log')
+    MAGIC, VERSION, SEED, MAP_W, MAP_H, FPS, DIGEST = HEADER.unpack_from(DATA, 0)
+    if (MAGIC != INPUT_LOG_MAGIC):
+        raise ValueError(f'"{path}" is not an input log')
+    if (VERSION != INPUT_LOG_VERSION):
+        raise ValueError(f'"{path}" is an input log of version {VERSION}, expected {INPUT_LOG_VERSION}')
+
+    pos = HEADER.size
+    names = []
+    for _ in range(2):
+        (LENGTH, ) = struct.unpack_from('<H', DATA, pos)
+        pos += 2
+        names.append(DATA[pos:(pos + LENGTH)].decode('utf-8'))
+        pos += LENGTH
+
+    inputs = []
+    tick = 0
+    complete = False
+    N = len(DATA)
+    while (pos < N):
+        delta = 0
+        shift = 0
+        while (pos < N) and (DATA[pos] & 0x80):
+            delta |= (DATA[pos] & 0x7F) << shift
+            shift += 7
+            pos += 1
+        if (pos + 1 >= N):
+            # cut short mid record
+            break
+        delta |= DATA[pos] << shift
+        tick += delta
+        CODE = Map_Input(DATA[pos + 1])
+        pos += 2
+        if (CODE == Map_Input.END):
+            complete = True
+            inputs.append((tick, CODE))
+            break
+        inputs.append((tick, CODE))
+
+    header = {
+        'seed': SEED,
+        'map_size': (MAP_W, MAP_H),
+        'fps': FPS,
+        'config_digest': DIGEST,
+        'map_name': names[0],
+        'player_name': names[1],
+        'complete': complete,
+        'bytes': len(DATA),
+    }
+    return (header, inputs)
@@ -0,0 +1,90 @@
+import json
+from os import makedirs, getpid, replace as os_replace
+from os.path import join as os_path_join, isfile
+from hashlib import sha1
+
+
+LAYOUT_VERSION = int(2)
+''' increment when the layout format, or the generation algorithms, change. Invalidates all cached layouts. '''
+
+
+class Map_Layout:
+    ''' Serializable description of a generated map layout.
+        Contains everything needed to rebuild the map sprites, without any randomness.
+        * blocks: [kind, x, y, w, h, (r, g, b, a)], in draw order.
+            kind is one of BLOCK_KINDS, selecting the cf_block used to create the block
+        * coins: [x, y] center positions
+        * turrets: [cf_index, x, y] center positions, with the index into the maps cf_turrets
+    '''
+
+    BLOCK_KINDS = ('map_outline', 'obstacle', 'obstacle_outline')
+
+    def __init__(self, seed: int, blocks: list | None = None, coins: list | None = None, turrets: list | None = None):
+        self.seed = int(seed)
+        self.blocks: list[list] = blocks if (blocks != None) else []
+        self.coins: list[list[int]] = coins if (coins != None) else []
+        self.turrets: list[list[int]] = turrets if (turrets != None) else []
+
+    def add_block(self, kind: str, rect, color):
+        self.blocks.append([kind, rect.x, rect.y, rect.w, rect.h, tuple(color)])
+
+    def add_coin(self, position: tuple[int, int]):
+        self.coins.append([int(position[0]), int(position[1])])
+
+    def add_turret(self, cf_index: int, position: tuple[int, int]):
+        self.turrets.append([int(cf_index), int(position[0]), int(position[1])])
+
+    def to_dict(self) -> dict:
+        return {
+            'version': LAYOUT_VERSION,
+            'seed': self.seed,
+            'blocks': self.blocks,
+            'coins': self.coins,
+            'turrets': self.turrets
+        }
+
+    @classmethod
+    def from_dict(cls, layout: dict):
+        ''' returns None if the layout was stored by a different LAYOUT_VERSION '''
+        if (layout.get('version') != LAYOUT_VERSION):
+            return None
+        # json stores tuples as lists
+        blocks = [[*block[:5], tuple(block[5])] for block in layout['blocks']]
+        return cls(layout['seed'], blocks, layout['coins'], layout['turrets'])
+
+    def __str__(self):
+        return f'Map_Layout: seed={self.seed}, blocks={len(self.blocks)}, coins={len(self.coins)}, turrets={len(self.turrets)}'
+
+
+def get_layout_cache_key(cf_map: dict, map_size: tuple[int, int], seed: int) -> str:
+    ''' key identifying a layout generated from the given config, map size and seed.
+        * any change to the map config gives a new key, as it may affect generation
+    '''
+    CONFIG_STR = json.dumps(cf_map, sort_keys=True, default=repr)
+    HASH = sha1(f'{LAYOUT_VERSION}|{map_size}|{CONFIG_STR}'.encode('utf-8')).hexdigest()[:16]
+    return f'{HASH}_{seed}'
+
+
+def load_cached_layout(cache_dir: str, key: str) -> Map_Layout | None:
+    ''' get the cached layout stored under key, if any '''
+    PATH = os_path_join(cache_dir, f'{key}.json')
+    if not (isfile(PATH)):
+        return None
+    try:
+        with open(PATH, 'r') as f:
+            return Map_Layout.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        # unreadable or partial cache entries are treated as missing, and regenerated
+        return None
+
+
+def save_cached_layout(cache_dir: str, key: str, layout: Map_Layout):
+    ''' store the layout under key. Written to a temp file first, so readers never see partial files.
+        * the temp file is per process, as parallel workers may generate the same seed at once
+    '''
+    makedirs(cache_dir, exist_ok=True)
+    PATH = os_path_join(cache_dir, f'{key}.json')
+    TMP_PATH = f'{PATH}.{getpid()}.tmp'
+    with open(TMP_PATH, 'w') as f:
+        json.dump(layout.to_dict(), f)
+    os_replace(TMP_PATH, PATH)
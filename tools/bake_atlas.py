@@ -0,0 +1,83 @@
+''' Bake the texture atlas: the final, scaled and rotated frames of every image a map loads, as raw pixel buffers.
+
+    Sets up every map with every player under the SDL dummy video driver, recording which images
+    are loaded through the asset cache, then decodes and stores them. See modules/PG_texture_atlas.py.
+    The app loads the atlas from 'texture_atlas_dir' in config/cf_global.py on startup.
+    Re-bake after changing image scalars or the window size. Changed source images are detected, and decoded as usual.
+
+    Usage, from the repository root:
+    >python tools/bake_atlas.py
+    >python tools/bake_atlas.py --maps map_1 --players fighter bomber --out cache/atlas
+'''
+import os
+import sys
+import json
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import perf_counter
+
+# must be set before pygame is initialized
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# assets are loaded through paths relative to the repository root
+os.chdir(REPO_ROOT)
+
+import pygame as pg
+
+from config.cf_global import CF_GLOBAL
+from config.cf_window import CF_WINDOW
+from config.cf_timer import CF_TIMER
+from config.cf_maps import CF_MAPS
+from config.cf_players import CF_PLAYERS
+
+from modules.PG_window import PG_Window
+from modules.PG_timer import PG_Timer
+from modules.PG_map import PG_Map
+from modules.PG_common import ASSETS, set_texture_atlas, release_assets
+from modules.PG_texture_atlas import bake_texture_atlas
+
+
+def get_map_asset_keys(map_keys: list[str], player_keys: list[str]) -> list[tuple]:
+    ''' keys of every asset loaded while setting up each map with each player '''
+    pg.init()
+    window = PG_Window(CF_GLOBAL, CF_WINDOW)
+    timer = PG_Timer(CF_GLOBAL, CF_TIMER)
+    # record by decoding, never from a previously baked atlas
+    set_texture_atlas(None)
+    release_assets()
+
+    for map_key in map_keys:
+        M = PG_Map(CF_GLOBAL, CF_MAPS[map_key], timer, window.map_surface)
+        M.set_up_all()
+        for player_key in player_keys:
+            M.spawn_player(CF_PLAYERS[player_key])
+
+    KEYS = list(ASSETS.keys())
+    pg.quit()
+    return KEYS
+
+
+def main():
+    parser = ArgumentParser(description='bake the texture atlas')
+    parser.add_argument('--maps', nargs='+', default=list(CF_MAPS.keys()), choices=list(CF_MAPS.keys()))
+    parser.add_argument('--players', nargs='+', default=list(CF_PLAYERS.keys()), choices=list(CF_PLAYERS.keys()))
+    parser.add_argument('--out', default=CF_GLOBAL['texture_atlas_dir'], help='atlas directory. default: from cf_global')
+    args = parser.parse_args()
+    if (args.out == None):
+        parser.error('texture_atlas_dir is not set in cf_global, and no --out was given')
+
+    T0 = perf_counter()
+    # keep map setup info prints out of the JSON result
+    with redirect_stdout(sys.stderr):
+        KEYS = get_map_asset_keys(args.maps, args.players)
+    result = bake_texture_atlas(args.out, KEYS)
+    result['total_s'] = (perf_counter() - T0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
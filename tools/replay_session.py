@@ -0,0 +1,139 @@
+''' Replay a logged map session, headless and as fast as possible.
+
+    The app logs the seed and inputs of every map session to 'input_log_dir' in config/cf_global.py.
+    A replay rebuilds the map from the seed, then simulates tick by tick, applying each input
+    at the tick it was handled. Nothing is drawn, and the clock is never waited on, so a long session
+    replays in seconds. See modules/input_log.py for the log format.
+
+    Prints a JSON summary, including the final state of the map, which is the same on every replay of a log.
+    A changed config_digest means the configs changed since recording, and the replay may differ from the session.
+
+    Usage, from the repository root:
+    >python tools/replay_session.py cache/input_logs/20260101_120000_Map_2_1234.pgil
+    >python tools/replay_session.py session.pgil --profile 30
+'''
+import os
+import sys
+import json
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import perf_counter
+
+# must be set before pygame is initialized
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# assets are loaded through paths relative to the repository root
+os.chdir(REPO_ROOT)
+
+import pygame as pg
+
+from config.cf_global import CF_GLOBAL
+from config.cf_window import CF_WINDOW
+from config.cf_timer import CF_TIMER
+from config.cf_maps import CF_MAPS
+from config.cf_players import CF_PLAYERS
+
+from modules.PG_window import PG_Window
+from modules.PG_timer import PG_Timer
+from modules.PG_map import PG_Map
+from modules.input_log import Map_Input, read_input_log, get_config_digest
+
+
+def find_config(configs: dict[str, dict], name: str) -> dict:
+    for cf in configs.values():
+        if (cf['name'] == name):
+            return cf
+    raise ValueError(f'no config named "{name}". It was renamed or removed since recording')
+
+
+def replay_inputs(M: PG_Map, inputs: list[tuple[int, Map_Input]]):
+    ''' simulate up to the tick of each input, then apply it. Raises RuntimeError if the replay desyncs '''
+    for tick, code in inputs:
+        while (M.n_ticks < tick):
+            # a map only stops simulating on success or death, and only an input restarts it
+            if not (M.looping):
+                raise RuntimeError(f'replay desynced: the map ended at tick {M.n_ticks}, before input {code.name} at tick {tick}')
+            M.simulate_tick()
+        M.apply_input(code)
+
+
+def replay_session(path: str) -> dict:
+    HEADER, INPUTS = read_input_log(path)
+    cf_map = find_config(CF_MAPS, HEADER['map_name'])
+    cf_player = find_config(CF_PLAYERS, HEADER['player_name'])
+
+    pg.init()
+    window = PG_Window(CF_GLOBAL, CF_WINDOW)
+    # reset starts a new timer segment
+    timer = PG_Timer(CF_GLOBAL, CF_TIMER)
+    if (window.map_surface.get_size() != HEADER['map_size']):
+        raise ValueError(f'map size {window.map_surface.get_size()} differs from the recorded {HEADER["map_size"]}')
+    CONFIG_CHANGED = (get_config_digest(CF_GLOBAL, cf_map, cf_player) != HEADER['config_digest'])
+
+    SETUP_START = perf_counter()
+    M = PG_Map(CF_GLOBAL, dict(cf_map, seed=HEADER['seed']), timer, window.map_surface)
+    M.set_up_all()
+    M.spawn_player(cf_player)
+    # set directly rather than through start, which would create the wall-clock event timers
+    M.looping = True
+    SETUP_TIME = (perf_counter() - SETUP_START)
+
+    REPLAY_START = perf_counter()
+    replay_inputs(M, INPUTS)
+    REPLAY_TIME = (perf_counter() - REPLAY_START)
+
+    PLAYER = M.player
+    result = {
+        'log': path,
+        'map': HEADER['map_name'],
+        'player': HEADER['player_name'],
+        'seed': HEADER['seed'],
+        'log_bytes': HEADER['bytes'],
+        'log_complete': HEADER['complete'],
+        'config_changed': CONFIG_CHANGED,
+        'inputs': len(INPUTS),
+        'ticks': M.n_ticks,
+        'game_time_s': (M.n_ticks / HEADER['fps']),
+        'setup_s': SETUP_TIME,
+        'replay_s': REPLAY_TIME,
+        'ticks_per_s': (M.n_ticks / REPLAY_TIME) if (REPLAY_TIME) else 0.0,
+        'final_state': {
+            'position': [PLAYER.position.x, PLAYER.position.y],
+            'health': PLAYER.health,
+            'fuel': PLAYER.fuel,
+            'coins': len(M.collected_coins),
+            'map_success': M.map_success,
+            'death_source': M.player_death_source,
+            'projectiles': M.projectile_field.n,
+        },
+    }
+    pg.quit()
+    return result
+
+
+def main():
+    parser = ArgumentParser(description='replay a logged map session')
+    parser.add_argument('log', help='input log, from input_log_dir')
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help='run under cProfile, printing the N functions of highest cumulative time to stderr')
+    args = parser.parse_args()
+
+    # keep map setup info prints out of the JSON result
+    with redirect_stdout(sys.stderr):
+        if (args.profile):
+            import cProfile
+            import pstats
+            profiler = cProfile.Profile()
+            result = profiler.runcall(replay_session, args.log)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(args.profile)
+        else:
+            result = replay_session(args.log)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+''' Score players and maps against each other over many headless episodes, in parallel worker processes.
+
+    Runs every (map, player) pair over the same range of seeds, driven by a seeded random pilot
+    which holds a random action for a random number of ticks. Episodes run in lockstep batches,
+    see modules/PG_map_env_batch.py. Prints a JSON summary per pair: mean return, success rate,
+    coins and survival time. Compare the summaries before and after a change to cf_players/cf_maps.
+
+    Usage, from the repository root:
+    >python tools/score_players.py --maps map_1 --players fighter bomber --seeds 0 64
+    >python tools/score_players.py --seeds 0 1000 --batch 32 --processes 4 --out scores.json
+'''
+import os
+import sys
+import json
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import perf_counter
+
+# inherited by the spawned worker processes
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# assets are loaded through paths relative to the repository root
+os.chdir(REPO_ROOT)
+
+import numpy as np
+
+from config.cf_global import CF_GLOBAL
+from config.cf_window import CF_WINDOW
+from config.cf_maps import CF_MAPS
+from config.cf_players import CF_PLAYERS
+from config.cf_env import CF_ENV
+
+from modules.PG_map_env import ACTIONS
+from modules.PG_map_env_batch import PG_Map_Env_Batch
+
+
+def run_batch(batch: PG_Map_Env_Batch, seeds: list[int], hold_ticks: tuple[int, int]) -> list[dict]:
+    ''' run one episode per env from the given seeds with the random pilot. Returns the episode results '''
+    batch.reset(seeds)
+    # the pilot is seeded by the map seed, so each seed plays out the same for every config
+    RNGS = [np.random.default_rng(seed) for seed in seeds]
+    actions = np.zeros(batch.n_envs, dtype=np.int64)
+    hold_left = np.zeros(batch.n_envs, dtype=np.int64)
+    returns = np.zeros(batch.n_envs, dtype=np.float64)
+
+    while not (batch.all_done):
+        for i in np.flatnonzero(hold_left == 0):
+            actions[i] = RNGS[i].integers(len(ACTIONS))
+            hold_left[i] = RNGS[i].integers(hold_ticks[0], hold_ticks[1] + 1)
+        hold_left -= 1
+        _, REWARD, _, _ = batch.step(actions)
+        returns += REWARD
+
+    results = batch.get_results()
+    for result, RETURN in zip(results, returns):
+        result['return'] = float(RETURN)
+    return results
+
+
+def summarize(results: list[dict]) -> dict:
+    return {
+        'episodes': len(results),
+        'mean_return': float(np.mean([r['return'] for r in results])),
+        'success_rate': float(np.mean([r['success'] for r in results])),
+        'mean_coins': float(np.mean([r['coins'] for r in results])),
+        'mean_ticks': float(np.mean([r['ticks'] for r in results])),
+        'death_rate': float(np.mean([(r['terminated'] and not r['success']) for r in results])),
+    }
+
+
+def main():
+    parser = ArgumentParser(description='score players and maps over many headless episodes')
+    parser.add_argument('--maps', nargs='+', default=list(CF_MAPS.keys()), choices=list(CF_MAPS.keys()))
+    parser.add_argument('--players', nargs='+', default=list(CF_PLAYERS.keys()), choices=list(CF_PLAYERS.keys()))
+    parser.add_argument('--seeds', type=int, nargs=2, default=[0, 32], metavar=('FIRST', 'STOP'),
+                        help='run each pair on the seeds in range(FIRST, STOP)')
+    parser.add_argument('--batch', type=int, default=16, help='envs stepped in lockstep, split evenly between the pairs. default: 16')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes. default: one per CPU')
+    parser.add_argument('--hold', type=int, nargs=2, default=[10, 60], metavar=('MIN', 'MAX'),
+                        help='ticks the pilot holds each action')
+    parser.add_argument('--max-steps', type=int, default=CF_ENV['max_steps'], help='episode length limit in ticks')
+    parser.add_argument('--out', default=None, help='write the JSON result to this file, rather than stdout')
+    args = parser.parse_args()
+
+    cf_env = dict(CF_ENV, max_steps=args.max_steps)
+    PAIRS = [(map_key, player_key) for map_key in args.maps for player_key in args.players]
+    SEEDS = list(range(*args.seeds))
+    # each pair gets a fixed set of env slots, which run its seeds in rounds.
+    # workers are bound to the configs of their envs, so the batch is created once
+    SLOTS = max(1, min(len(SEEDS), args.batch // len(PAIRS)))
+    SLOT_PAIRS = [pair for pair in PAIRS for _ in range(SLOTS)]
+    N_ROUNDS = -(-len(SEEDS) // SLOTS)
+
+    T0 = perf_counter()
+    results: dict[tuple[str, str], list[dict]] = {pair: [] for pair in PAIRS}
+    total_ticks = 0
+    # keep map setup info prints out of the JSON result
+    with redirect_stdout(sys.stderr):
+        with PG_Map_Env_Batch(CF_GLOBAL, CF_WINDOW, cf_env,
+                              [CF_MAPS[pair[0]] for pair in SLOT_PAIRS], [CF_PLAYERS[pair[1]] for pair in SLOT_PAIRS],
+                              [SEEDS[0]] * len(SLOT_PAIRS), args.processes) as batch:
+            for n_round in range(N_ROUNDS):
+                # the last round repeats seeds to fill the slots, and drops their results
+                SLOT_SEEDS = [SEEDS[(n_round * SLOTS + n) % len(SEEDS)] for n in range(SLOTS)]
+                N_NEW = min(SLOTS, len(SEEDS) - n_round * SLOTS)
+                ROUND_RESULTS = run_batch(batch, SLOT_SEEDS * len(PAIRS), tuple(args.hold))
+                for n, (pair, result) in enumerate(zip(SLOT_PAIRS, ROUND_RESULTS)):
+                    if (n % SLOTS < N_NEW):
+                        results[pair].append(result)
+                        total_ticks += result['ticks']
+                print(f'round {n_round + 1}/{N_ROUNDS}: {batch}', file=sys.stderr)
+    total_time = (perf_counter() - T0)
+
+    result = {
+        'seeds': args.seeds,
+        'hold': args.hold,
+        'max_steps': args.max_steps,
+        'total_s': total_time,
+        'ticks_per_s': (total_ticks / total_time) if (total_time) else 0.0,
+        'scores': [
+            dict({'map': map_key, 'player': player_key}, **summarize(results[(map_key, player_key)]))
+            for map_key, player_key in PAIRS
+        ],
+    }
+    RESULT_JSON = json.dumps(result, indent=2)
+    if (args.out):
+        with open(args.out, 'w') as f:
+            f.write(RESULT_JSON)
+    else:
+        print(RESULT_JSON)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+''' Score map seeds for coin reachability, in parallel worker processes.
+
+    Generates the layout of every seed in a range exactly as the game would, then checks whether
+    every coin is reachable from the player spawn. See modules/PG_map_validator.py for the method.
+    Prints a JSON summary, including the valid seeds, which can be set as 'seed' in config/cf_maps.py.
+
+    Usage, from the repository root:
+    >python tools/validate_seeds.py --map map_2 --player fighter --seeds 0 500
+    >python tools/validate_seeds.py --map map_1 --seeds 0 100 --processes 4 --all --out seeds.json
+'''
+import os
+import sys
+import json
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import perf_counter
+
+# inherited by the spawned worker processes
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# assets are loaded through paths relative to the repository root
+os.chdir(REPO_ROOT)
+
+from config.cf_global import CF_GLOBAL
+from config.cf_window import CF_WINDOW
+from config.cf_maps import CF_MAPS
+from config.cf_players import CF_PLAYERS
+
+from modules.PG_map_validator import score_seeds, VALIDATION_CELL_SIZE
+
+
+def main():
+    parser = ArgumentParser(description='score map seeds for coin reachability')
+    parser.add_argument('--map', default='map_2', choices=list(CF_MAPS.keys()))
+    parser.add_argument('--player', default='fighter', choices=list(CF_PLAYERS.keys()))
+    parser.add_argument('--seeds', type=int, nargs=2, default=[0, 100], metavar=('FIRST', 'STOP'),
+                        help='score seeds in range(FIRST, STOP)')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes. default: one per CPU')
+    parser.add_argument('--cell-size', type=int, default=VALIDATION_CELL_SIZE, help='validation grid cell size (px)')
+    parser.add_argument('--all', action='store_true', help='include the score of every seed, not only the summary')
+    parser.add_argument('--out', default=None, help='write the JSON result to this file, rather than stdout')
+    args = parser.parse_args()
+
+    MAP_SIZE = (int(CF_WINDOW['map_rect_info']['w']), int(CF_WINDOW['map_rect_info']['h']))
+    SEEDS = range(args.seeds[0], args.seeds[1])
+
+    T0 = perf_counter()
+    # keep generation info prints out of the JSON result
+    with redirect_stdout(sys.stderr):
+        scores = score_seeds(CF_GLOBAL, CF_MAPS[args.map], CF_PLAYERS[args.player], MAP_SIZE,
+                             SEEDS, args.processes, args.cell_size)
+    total_time = (perf_counter() - T0)
+
+    valid_seeds = [score['seed'] for score in scores if (score['valid'])]
+    result = {
+        'map': args.map,
+        'player': args.player,
+        'cell_size': args.cell_size,
+        'n_seeds': len(scores),
+        'n_valid': len(valid_seeds),
+        'total_s': total_time,
+        'seeds_per_s': (len(scores) / total_time) if (total_time) else 0.0,
+        'valid_seeds': valid_seeds,
+    }
+    if (args.all):
+        result['scores'] = scores
+
+    RESULT_JSON = json.dumps(result, indent=2)
+    if (args.out):
+        with open(args.out, 'w') as f:
+            f.write(RESULT_JSON)
+    else:
+        print(RESULT_JSON)
+
+
+if __name__ == '__main__':
+    main()